@@ -2,6 +2,9 @@
 # This file manages global variables between all LiCal modules.
 # ------------------------------------------------------------------------------
 
+import os
+
+
 class LiCalVersion:
     def __init__(self, major, minor, micro):
         self.major = major
@@ -36,6 +39,19 @@ H_RMSE_THRESH = 12
 # Sample threshold for writing reports and generating statistics
 SAMPLE_NUM_THRESHOLD = 13000
 
+# Number of nearest neighbours used to fit a plane to each test point
+NEIGHBOURHOOD_SIZE = 25
+
+# Number of test points fitted at once when calculating residuals
+# (each test point holds a NEIGHBOURHOOD_SIZE x 3 array in memory)
+RESIDUAL_BATCH_SIZE = 100_000
+
+# Persistent cache of each swath's convex hull and single-return points,
+# reused between LiCal runs. The least recently used
+# swaths are evicted once the cache grows past SWATH_CACHE_SIZE bytes.
+SWATH_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".lical", "swath_cache")
+SWATH_CACHE_SIZE = 50 * 1024 ** 3
+
 
 class AnsiColors:
     black = u"\u001b[30m"
@@ -5,7 +5,6 @@
 # TODO:
 # - clean up script: functionize where possible!
 # - make better output for insufficient overlap case
-# - chi table not populating with correct values
 # - update chi test (i.e., change binning method, etc.)
 # !     - See chisquareTest_func_nj.py for a sandbox of trying to solve
 # !         the problems in chisquare_test()
@@ -19,6 +18,8 @@ import csv
 import sys
 import os
 import shutil
+import hashlib
+import concurrent.futures
 from unicodedata import decimal
 # from unittest import result
 import tqdm
@@ -45,7 +46,6 @@ from reportlab.platypus import (
 )
 from reportlab.lib import colors
 from PyPDF2 import PdfFileMerger, PdfFileReader
-import scipy.stats as stats
 # from scipy import spatial
 
 import numpy as np
@@ -57,9 +57,12 @@ from scipy.spatial import ConvexHull, cKDTree
 from pathlib import Path
 
 from itertools import combinations, chain
-import struct
+
+from rsge_toolbox.lidar.LasHeader import parse_header, parse_headers
+from rsge_toolbox.util.executor_tools import bounded_submit
 
 import config
+import residual_stats
 
 import warnings
 warnings.filterwarnings(
@@ -108,10 +111,18 @@ def run_batch_lical(
     v_rmse_thresh,
     h_rmse_thresh,
     recurse=True,
-    queue_item=None
+    queue_item=None,
+    workers=None
 ):
     """
     Function called by LiCal GUI.
+
+    Swath pairs whose headers or convex hulls don't overlap are dropped
+    up front. Each remaining swath is decoded once into the persistent
+    swath cache (config.SWATH_CACHE_DIR), then the pairs are evaluated
+    concurrently in a process pool, and reported in order as they finish.
+    At most 2 x workers pairs are submitted to the pool at once, so the
+    results waiting to be reported are bounded.
     """
     start_time = datetime.datetime.now()
 
@@ -126,7 +137,9 @@ def run_batch_lical(
         laz_files = inpath.glob('*.laz')
         lidar_files = chain(las_files, laz_files)
 
-    combos = list(combinations(lidar_files, 2))
+    lidar_files = list(lidar_files)
+    cache_dir = _swath_cache_dir()
+    workers = workers or os.cpu_count()
 
     chisquareResults = []
 
@@ -140,29 +153,52 @@ def run_batch_lical(
         f"\nLiCal {intro_message}started {print_friendly_time(start_time)}"
     )
 
-    for count, pair in enumerate(combos):
-        print(
-            f"{config.AnsiColors.white}"
-            f"{dashline}"
-            f"Swath pair {count + 1} of {len(combos)}:\n",
-            flush=True
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        combos = overlapping_swath_pairs(
+            lidar_files,
+            cache_dir,
+            executor
         )
-        try:
-            chisquareResults.append(
-                compare_swath_pair(
-                    pair[0],
-                    pair[1],
-                    outdir,
-                    start_time,
-                    company_name,
-                    sample_size,
-                    v_rmse_thresh,
-                    h_rmse_thresh
-                )
+
+        futures = bounded_submit(
+            lambda pair: executor.submit(
+                evaluate_swath_pair,
+                pair[0],
+                pair[1],
+                sample_size,
+                v_rmse_thresh,
+                h_rmse_thresh,
+                cache_dir=cache_dir,
+                show_progress=False
+            ),
+            combos,
+            2 * workers
+        )
+
+        # Reports are appended to the full report in pair order
+        for count, (pair, future) in enumerate(zip(combos, futures)):
+            print(
+                f"{config.AnsiColors.white}"
+                f"{dashline}"
+                f"Swath pair {count + 1} of {len(combos)}:\n",
+                flush=True
             )
-        except Exception as e:
-            print(e)
-            continue
+            try:
+                chisquareResults.append(
+                    report_swath_pair(
+                        future.result(),
+                        pair[0],
+                        pair[1],
+                        outdir,
+                        start_time,
+                        company_name,
+                        v_rmse_thresh,
+                        h_rmse_thresh
+                    )
+                )
+            except Exception as e:
+                print(e)
+                continue
 
     if chisquareResults:
         make_chi_table(
@@ -180,6 +216,11 @@ def run_batch_lical(
         outdir
     )
 
+    evict_swath_cache(
+        cache_dir,
+        config.SWATH_CACHE_SIZE
+    )
+
     # Find run duration and truncate at 10-millisecond decimal place
     lical_runtime = print_friendly_duration(
         datetime.datetime.now() - start_time
@@ -236,12 +277,51 @@ def compare_swath_pair(
     Compare two lidar files for vertical alignment
     and save results to the provided output directory (outdir).
     """
+    test_results = evaluate_swath_pair(
+        fp1,
+        fp2,
+        sample_size,
+        v_rmse_thresh,
+        h_rmse_thresh
+    )
+
+    return report_swath_pair(
+        test_results,
+        fp1,
+        fp2,
+        outdir,
+        start_time,
+        company_name,
+        v_rmse_thresh,
+        h_rmse_thresh
+    )
+
+
+def evaluate_swath_pair(
+    fp1,
+    fp2,
+    sample_size,
+    v_rmse_thresh,
+    h_rmse_thresh,
+    cache_dir=None,
+    show_progress=True
+):
+    """
+    Calculate and analyze the residuals between two lidar files.
+
+    Doesn't write anything, so pairs may be evaluated in parallel.
+
+    Returns:
+        A dictionary of test results, including the chi-square test
+    """
     calc_residual_start = datetime.datetime.now()
 
     flat_residuals, slope_residuals, all_residuals, N = calculate_residuals(
         fp1,
         fp2,
-        sample_size
+        sample_size,
+        cache_dir=cache_dir,
+        show_progress=show_progress
     )
 
     calc_residual_runtime = print_friendly_duration(
@@ -268,9 +348,28 @@ def compare_swath_pair(
         h_rmse_thresh
     )
 
-    chisquareResults = chisquareTest(test_results)
+    test_results['chi-square'] = chisquareTest(test_results)
 
-    test_results['chi-square'] = chisquareResults
+    return test_results
+
+
+def report_swath_pair(
+    test_results,
+    fp1,
+    fp2,
+    outdir,
+    start_time,
+    company_name,
+    v_rmse_thresh,
+    h_rmse_thresh
+):
+    """
+    Save the results of a swath pair to the provided output directory (outdir).
+
+    Returns:
+        The pair's chi-square results, for the chi-square table
+    """
+    chisquareResults = test_results['chi-square']
 
     output_results(
         test_results,
@@ -295,69 +394,16 @@ def compare_swath_pair(
 
 def chisquareTest(test_results):
     # ! See chisquareTest_func_nj.py for a sandbox of trying to make this function work properly
-    values = test_results['all_residuals']
-    values = np.array(values)
-    numOfSamples = len(values)
-    mean = values.mean()
-    stdev = values.std(ddof=1)
-    # print(f'{mean=}')
-    # print(f'{stdev=}')
-    valRange = max(values) - min(values)
-    # print(f'{valRange=}')
-    initWidth = round(valRange / (1 + 3.22 * (math.log10(len(values)))), 10)
-    # print(f'{initWidth=}')
-    initBins = round(valRange / initWidth)
-    # print(f'{initBins=}')
-    binWidth = valRange / initBins
-    # print(f'{binWidth=}')
-    numOfBins = round(valRange / binWidth)
-    # print(f'{numOfBins=}')
-    bounds = []
-    normalProbability = []
-    predictedFreq = []
-    observedFreq = []
-    chiSquare = []
-    bounds.append(min(values))
-    for i in range(numOfBins):
-        bounds.append(round(bounds[i] + binWidth, 10))
-        normalProbability.append(
-            stats.norm.cdf(
-                bounds[i + 1],
-                mean,
-                stdev
-            ) - stats.norm.cdf(
-                bounds[i],
-                mean,
-                stdev
-            )
-        )
-        predictedFreq.append(normalProbability[i] * numOfSamples)
-        if i == numOfBins - 1:
-            observedFreq.append(sum(num >= bounds[i] and num <= bounds[i + 1] for num in values))
-        else:
-            observedFreq.append(sum(num >= bounds[i] and num < bounds[i + 1] for num in values))
-        chiSquare.append(
-            (predictedFreq[i] - observedFreq[i]) ** 2 / predictedFreq[i]
-        )
-
-    chiSum = sum(chiSquare)
-    pValue = stats.chi2.sf(chiSum, numOfBins - 1)
-
-    return [
-        chiSum,
-        numOfBins - 1,
-        max(values),
-        min(values),
-        valRange,
-        pValue
-    ]
+    return residual_stats.chi_square_test(test_results['all_residuals'])
 
 
 def calculate_residuals(
     fp1,
     fp2,
     sample_size,
-    verbose=False
+    verbose=False,
+    cache_dir=None,
+    show_progress=True
 ):
     """
     Calculate a set of data quality measurements between point clouds.
@@ -373,38 +419,36 @@ def calculate_residuals(
         fp1 : File path to the first .las/.laz file
         fp2 : File path to the second .las/.laz file
         verbose : Flag to provide additional information
+        cache_dir : Swath cache directory (see cache_swath)
+        show_progress : Flag to show the spinner and progress bar
     Returns:
         flat_residuals : An array of residuals from flat regions
         slope_residuals : An array of residuals from sloped regions
         N : An array of normal vectors corresponding to each measurement
             in slope_residuals ONLY, ie, N[i] <=> slope_residuals[i]
     """
-    points1, points2 = get_lidar_points(fp1, fp2, verbose=False)
+    points1, points2 = get_lidar_points(fp1, fp2, verbose=False, cache_dir=cache_dir)
 
     halo_spinner = Halo(
         text="Sorting points...",
-        text_color="cyan"
+        text_color="cyan",
+        enabled=show_progress
     )
     halo_spinner.start()
 
     # Randomly permute our lidar points
     # las files often contain subset of points that are in a line,
     # so this helps our k-d tree nice and balanced.
-    np.random.shuffle(points1)
     np.random.shuffle(points2)
 
     # Manual error simulation goes here if wanted
 
+    np.random.shuffle(points1)
     nn_tree = cKDTree(points1)
 
-
     # Reshape the tree data in order for pykdtree to work. Not needed with cKDTree
     # tree_data = nn_tree.data.reshape((nn_tree.n, nn_tree.ndim))
 
-    N = []
-    flat_residuals = []
-    slope_residuals = []
-    all_residuals = []
     test_indices = random.sample(
         range(len(points2)),
         int(len(points2) / (100 / sample_size))
@@ -427,67 +471,42 @@ def calculate_residuals(
         flush=True
     )
 
-    # Loop through the test points
-    for test_index in tqdm.tqdm(test_indices):
-        test_point = points2[test_index]
-
-        # Reshape the test point in order for pykdtree to work. Not needed with cKDTree
-        # _test_point = test_point.reshape(1,-1)
-
-        nn = 25
-        # Search for the k nearest neighbors of test_point
-        nn_distances, nn_indices = nn_tree.query(test_point, k=nn)
-
-        neighborhood = np.array([nn_tree.data[i] for i in nn_indices])
-        # Reshape the nerighborhood points in order for pykdtree to work. Not needed with cKDTree
-        # neighborhood = neighborhood.reshape((nn,3))
-
-        # Center the test point and neighborhood around the origin
-        mean_vector = np.mean(neighborhood, axis=0)
-        neighborhood -= mean_vector
-        test_point -= mean_vector
-
-        # Performing the principal component analysis
-        surface_cov = np.cov(np.transpose(neighborhood))  # Covariance Matrix
-        eigenvalues, eigenvectors = np.linalg.eig(surface_cov)  # Eigenstuff
-        eigen_dict = {eigenvalues[i]: eigenvectors[:, i] for i in range(0, 3)}
-
-        if verbose:
-            print("\nEigendictionary:")
-            for entry in eigen_dict:
-                print(f"{entry} : {eigen_dict[entry]}")
-            print()
-
-        # The eigenvector belonging to the smallest eigenvalue
-        # is the normal vector of our best fit plane
-        normal = eigen_dict[min(eigen_dict)]
-
-        if surface_is_planar(eigenvalues, verbose=verbose):
-            dist = point_to_plane_distance(test_point, normal)
-
-            # Filter out obvious outliers (>1meter). It'd be nice to just rely
-            # on remove_outliers(), but we need this for oddly-shaped swaths.
-            if abs(dist) <= 100:
-                angle = np.arccos(normal[2]) * (180 / math.pi)
-                if angle > 90:
-                    angle -= 180
-
-                if verbose:
-                    print(f"Neighborhood angle: {angle}")
-                # append all to one list for chi-test
-                # Bin the residual based on its region's slope
-                if abs(angle) <= 5:
-                    flat_residuals.append(dist)
-                    if verbose:
-                        print(f"{dist} recorded to Flat")
-                elif abs(angle) >= 10:
-                    slope_residuals.append(dist)
-                    N.append(normal)
-                    if verbose:
-                        print(f"{dist} recorded to Sloped")
-                all_residuals.append(dist)
-        if verbose:
-            plot_3d(neighborhood, normal, test_point)
+    test_points = points2[test_indices]
+
+    # Search for the k nearest neighbors of all test points at once
+    nn = config.NEIGHBOURHOOD_SIZE
+    nn_distances, nn_indices = nn_tree.query(test_points, k=nn, workers=-1)
+
+    # Fit the test points in batches, to bound the memory
+    # used by the (batch x nn x 3) neighbourhood array
+    batch_size = config.RESIDUAL_BATCH_SIZE
+    batches = [
+        fit_neighbourhoods(
+            nn_tree.data,
+            test_points[i:i + batch_size],
+            nn_indices[i:i + batch_size],
+            verbose=verbose
+        )
+        for i in tqdm.tqdm(range(0, len(test_points), batch_size), disable=not show_progress)
+    ]
+    dist, angle, normals, is_valid = (
+        np.concatenate(arrays) for arrays in zip(*batches)
+    )
+
+    # Bin the residuals based on their region's slope
+    is_flat = is_valid & (angle <= 5)
+    is_slope = is_valid & (angle >= 10)
+
+    flat_residuals = dist[is_flat]
+    slope_residuals = dist[is_slope]
+    all_residuals = dist[is_valid]
+    N = normals[is_slope]
+
+    if verbose:
+        print(
+            f"{np.count_nonzero(is_valid)} of {len(test_points)} test points on planar surfaces: "
+            f"{len(flat_residuals)} recorded to Flat, {len(slope_residuals)} recorded to Sloped"
+        )
 
     if (
         len(flat_residuals) < config.SAMPLE_NUM_THRESHOLD
@@ -498,13 +517,65 @@ def calculate_residuals(
     halo_spinner.stop()
 
     return (
-        np.array(flat_residuals),
-        np.array(slope_residuals),
-        np.array(all_residuals),
-        np.array(N)
+        flat_residuals,
+        slope_residuals,
+        all_residuals,
+        N
     )
 
 
+def fit_neighbourhoods(tree_data, test_points, nn_indices, verbose=False):
+    """
+    Fit a plane to the neighbourhood of each test point, and measure
+    the test point's distance to it.
+
+    Each neighbourhood is centered around the origin, and a plane is
+    fit to it using principle component analysis: the eigenvector
+    belonging to the smallest eigenvalue of the neighbourhood's
+    covariance matrix is the normal vector of the best fit plane.
+    All neighbourhoods are fit at once, as a stack of matrices.
+
+    Args:
+        tree_data : (m x 3) array of the points the neighbours were found in
+        test_points : (n x 3) array of test points
+        nn_indices : (n x k) array of indices of each test point's neighbours
+        verbose : Flag to provide additional information
+    Returns:
+        dist : Point-to-plane distance of each test point
+        angle : Slope angle of each plane in degrees, from 0 (flat) to 90
+        normals : (n x 3) array of the normal vector of each plane
+        is_valid : Mask of test points on a planar surface, within 1 meter
+            of it (i.e., usable residual measurements)
+    """
+    # Gather the neighbourhoods, then center them and their test points
+    neighbourhoods = tree_data[nn_indices]
+    mean_vectors = neighbourhoods.mean(axis=1)
+    neighbourhoods -= mean_vectors[:, np.newaxis, :]
+    centered_points = test_points - mean_vectors
+
+    # Performing the principal component analysis
+    surface_cov = np.einsum(
+        "nki,nkj->nij",
+        neighbourhoods,
+        neighbourhoods
+    ) / (neighbourhoods.shape[1] - 1)  # Covariance Matrices
+    eigenvalues, eigenvectors = np.linalg.eigh(surface_cov)  # Eigenstuff (ascending)
+
+    # The normal points up, so residuals are positive
+    # where the test point lies above the surface
+    normals = eigenvectors[:, :, 0]
+    normals[normals[:, 2] < 0] *= -1
+
+    dist = point_to_plane_distance(centered_points, normals)
+    angle = np.degrees(np.arccos(np.clip(normals[:, 2], -1, 1)))
+
+    # Filter out obvious outliers (>1meter). It'd be nice to just rely
+    # on remove_outliers(), but we need this for oddly-shaped swaths.
+    is_valid = surface_is_planar(eigenvalues, verbose=verbose) & (np.abs(dist) <= 100)
+
+    return dist, angle, normals, is_valid
+
+
 def surface_is_planar(eigenvalues, verbose=False):
     """
     Check if some eigenvalues describe a reasonably planar surface.
@@ -514,28 +585,28 @@ def surface_is_planar(eigenvalues, verbose=False):
     of Lidar Data", doi: 10.14358/PERS.84.3.117
 
     Args:
-        eigenvalues : A set of principle component eigenvalues
+        eigenvalues : A set of principle component eigenvalues, or an
+            (n x 3) array of sets
         verbose : Flag to provide additional information
     Returns:
-        A boolean value, True <=> the surface is reasonably planar
+        A boolean value (or an array of them), True <=> the surface
+        is reasonably planar
     """
-    eigenvalues.sort()
+    eigenvalues = np.sort(eigenvalues, axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio1 = eigenvalues[..., 1] / eigenvalues[..., 2]
+        ratio2 = eigenvalues[..., 0] / np.sum(eigenvalues, axis=-1)
+
+    # These ratio thresholds are modified slightly from the ASPRS version
+    is_planar = (ratio1 > 0) & (ratio2 < 0.004)
 
-    ratio1 = eigenvalues[1] / eigenvalues[2]
-    ratio2 = eigenvalues[0] / sum(eigenvalues)
     if verbose:
         print(f"L2 / L1 = {ratio1}")
         print(f"L3 / (L1 + L2 + L3) = {ratio2}")
+        print(f"PASSED planarity test: {np.count_nonzero(is_planar)} of {np.size(is_planar)}\n")
 
-    # These ratio thresholds are modified slightly from the ASPRS version
-    if ratio1 > 0 and ratio2 < 0.004:
-        if verbose:
-            print("PASSED planarity test\n")
-        return True
-    else:
-        if verbose:
-            print("FAILED planarity test\n")
-        return False
+    return is_planar
 
 
 def point_to_plane_distance(point, norm):
@@ -549,14 +620,17 @@ def point_to_plane_distance(point, norm):
     only allow positive distances, use: k = abs(...)
 
     Args:
-        point : A vector [x,y,z] that describes the point
-        norm : The normal vector [x,y,z] that describes the plane
+        point : A vector [x,y,z] that describes the point, or an
+            (n x 3) array of them
+        norm : The normal vector [x,y,z] that describes the plane, or
+            an (n x 3) array of them
     Returns:
-        An orthogonal point-to-plane distance measurement
+        An orthogonal point-to-plane distance measurement (or an
+        array of them)
     """
 
-    k = (norm[0] * point[0]) + (norm[1] * point[1]) + (norm[2] * point[2])
-    rescale = math.sqrt(np.dot(norm, norm))
+    k = np.sum(norm * point, axis=-1)
+    rescale = np.linalg.norm(norm, axis=-1)
 
     point_to_plane_dist = k / rescale
 
@@ -588,7 +662,7 @@ def remove_outliers(data, partner=None):
         return filtered_data
 
 
-def get_convex_hull(filename, points_array):
+def get_convex_hull(swath_key, points_array):
     """
     Check the polygon_cache dict to see if
     this file has already been loaded and
@@ -596,21 +670,25 @@ def get_convex_hull(filename, points_array):
 
     If not, create the convex hull
     and add it to the polygon_cache dict.
+
+    The dict is keyed by _swath_cache_key, so files with the same
+    name in different folders (or a file modified since) never
+    share a hull.
     """
-    if filename in polygon_cache:
-        hull = polygon_cache[filename]
+    if swath_key in polygon_cache:
+        hull = polygon_cache[swath_key]
     else:
         # Remove z dimension from array
         # and sample every 1000th point
         # making a convex hull
         points_for_hull = points_array[::10000]
         hull = create_hull_polygon(points_for_hull[:, :2])
-        polygon_cache[filename] = hull
+        polygon_cache[swath_key] = hull
 
     return hull
 
 
-def get_lidar_points(fp1, fp2, verbose=False):
+def get_lidar_points(fp1, fp2, verbose=False, cache_dir=None):
     """
     Grab the point coordinate data from 2 lidar files.
 
@@ -628,6 +706,8 @@ def get_lidar_points(fp1, fp2, verbose=False):
     Args:
         fp1 : A filepath to the first lidar file to read and filter
         fp2 : A filepath to the second lidar file to read and filter
+        cache_dir : Swath cache directory; if given, points are
+            loaded from (or decoded into) the cache, see cache_swath
 
     Returns:
         Two (n x 3) numpy arrays of point coordinates in centimeters
@@ -647,8 +727,8 @@ def get_lidar_points(fp1, fp2, verbose=False):
     # if they overlap.
     # Should save some time, especially if decompression needs to be done.
 
-    filename1 = os.path.basename(fp1)
-    filename2 = os.path.basename(fp2)
+    swath_key1 = _swath_cache_key(fp1)
+    swath_key2 = _swath_cache_key(fp2)
 
     # Create bounding boxes from the header of each lidar file
     header1 = parse_header(fp1)
@@ -674,54 +754,35 @@ def get_lidar_points(fp1, fp2, verbose=False):
     # If the two lidar swaths intersect:
     if ((ab.xmax - ab.xmin > 0) and (ab.ymax - ab.ymin > 0)):
 
-        if filename1 in polygon_cache and filename2 in polygon_cache:
-            hull1 = polygon_cache[filename1]
-            hull2 = polygon_cache[filename2]
+        if swath_key1 in polygon_cache and swath_key2 in polygon_cache:
+            hull1 = polygon_cache[swath_key1]
+            hull2 = polygon_cache[swath_key2]
 
             if not hull1.intersects(hull2):
                 # If swaths don't intersect, raise an error
                 # and move on to the next pair of files
                 raise ValueError("The lidar swaths do not overlap.")
 
-        try:
+        if cache_dir is None:
             with Halo(
                 text="Reading/decompressing lidar files...",
                 text_color="cyan"
             ):
-                infile1 = laspy.read(fp1, laz_backend=laspy.LazBackend.LazrsParallel)
-                infile2 = laspy.read(fp2, laz_backend=laspy.LazBackend.LazrsParallel)
+                filtered_points1, hull1 = read_swath(fp1)
+                filtered_points2, hull2 = read_swath(fp2)
 
             print(
                 f"{config.AnsiColors.cyan}"
                 f"Files decompressed/read!"
                 f"{config.AnsiColors.reset}"
             )
-        except Exception:
-            raise FileNotFoundError(
-                "Error opening one or both of the lidar files. "
-                "Please check that both file paths are correct."
-            )
-
-        # Read the raw (X,Y,Z) values for each point in both clouds
-        points1 = np.column_stack((infile1.x, infile1.y, infile1.z))
-        points2 = np.column_stack((infile2.x, infile2.y, infile2.z))
-
-        # Check polygon_cache dict to see if we've loaded this file
-        # and stored its convex hull.
-        # If not, create one and store it.
-        hull1 = get_convex_hull(filename1, points1)
-        hull2 = get_convex_hull(filename2, points2)
+        else:
+            filtered_points1, hull1 = load_swath(fp1, cache_dir)
+            filtered_points2, hull2 = load_swath(fp2, cache_dir)
 
         # Check if swaths overlap
         if hull1.intersects(hull2):
 
-            # Get only the single returns from each file
-            return_filter1 = infile1.num_returns == 1
-            return_filter2 = infile2.num_returns == 1
-
-            filtered_points1 = points1[return_filter1]
-            filtered_points2 = points2[return_filter2]
-
             # If hulls overlap, find intersecting polygon
             intersect = find_polygon_intersection(hull1, hull2)
 
@@ -747,6 +808,180 @@ def get_lidar_points(fp1, fp2, verbose=False):
     return points_inside1 * 100, points_inside2 * 100
 
 
+def read_swath(fp):
+    """
+    Read a lidar file's single-return points and convex hull.
+
+    Args:
+        fp : A filepath to the lidar file to read
+    Returns:
+        An (n x 3) numpy array of single-return point coordinates,
+        and a Shapely polygon of the convex hull of all points
+    """
+    try:
+        infile = laspy.read(fp, laz_backend=laspy.LazBackend.LazrsParallel)
+    except Exception:
+        raise FileNotFoundError(
+            f"Error opening the lidar file {fp}. "
+            "Please check that the file path is correct."
+        )
+
+    # Read the raw (X,Y,Z) values for each point in the cloud
+    points = np.column_stack((infile.x, infile.y, infile.z))
+
+    # Check polygon_cache dict to see if we've loaded this file
+    # and stored its convex hull.
+    # If not, create one and store it.
+    hull = get_convex_hull(_swath_cache_key(fp), points)
+
+    # Get only the single returns from the file
+    return points[infile.num_returns == 1], hull
+
+
+def cache_swath(fp, cache_dir):
+    """
+    Decode a lidar file once into the swath cache.
+
+    Stores the single-return points and the convex hull vertices of
+    the file as .npy files, so a swath used in several pairs, or in
+    several runs, is only read and decompressed once.
+    Does nothing but mark the swath as used if already cached.
+
+    Args:
+        fp : A filepath to the lidar file to cache
+        cache_dir : Swath cache directory
+    Returns:
+        The paths of the cached points and hull .npy files
+    """
+    points_npy, hull_npy = _swath_cache_paths(fp, cache_dir)
+
+    if os.path.isfile(points_npy) and os.path.isfile(hull_npy):
+        _touch_cache_files(points_npy, hull_npy)
+    else:
+        points, hull = read_swath(fp)
+        _write_cache_file(points_npy, lambda f: np.save(f, points))
+        _write_cache_file(
+            hull_npy,
+            lambda f: np.save(f, np.array(hull.exterior.coords))
+        )
+
+    return points_npy, hull_npy
+
+
+def load_swath(fp, cache_dir):
+    """
+    Load a lidar file's single-return points and convex hull from the
+    swath cache, caching the file first if needed.
+
+    Args:
+        fp : A filepath to the lidar file
+        cache_dir : Swath cache directory
+    Returns:
+        A read-only, memory-mapped (n x 3) numpy array of single-return
+        point coordinates, and a Shapely polygon of the convex hull
+    """
+    points_npy, hull_npy = cache_swath(fp, cache_dir)
+
+    return np.load(points_npy, mmap_mode="r"), Polygon(np.load(hull_npy))
+
+
+def evict_swath_cache(cache_dir, max_size):
+    """
+    Delete the least recently used swaths from the swath cache
+    until its total size is at most max_size bytes.
+
+    Only call this while no swaths are being cached or loaded.
+
+    Args:
+        cache_dir : Swath cache directory
+        max_size : Maximum total size of the cache in bytes
+    Returns:
+        The number of swaths evicted
+    """
+    swaths = {}
+    for entry in os.scandir(cache_dir):
+        if not entry.is_file():
+            continue
+        stat = entry.stat()
+        key = entry.name.split(".")[0]
+        size, last_used, files = swaths.get(key, (0, 0, []))
+        swaths[key] = (
+            size + stat.st_size,
+            max(last_used, stat.st_mtime),
+            files + [entry.path]
+        )
+
+    cache_size = sum(size for size, _, _ in swaths.values())
+    evicted = 0
+    for size, _, files in sorted(swaths.values(), key=lambda swath: swath[1]):
+        if cache_size <= max_size:
+            break
+        for file in files:
+            os.remove(file)
+        cache_size -= size
+        evicted += 1
+
+    return evicted
+
+
+def overlapping_swath_pairs(lidar_files, cache_dir, executor):
+    """
+    Find the pairs of lidar files that overlap.
+
+    Pairs whose header bounding boxes don't overlap are dropped before
+    any points are read. The files left in a pair are then cached (in
+    parallel), and pairs whose convex hulls don't intersect are dropped.
+
+    Args:
+        lidar_files : List of filepaths to lidar files
+        cache_dir : Swath cache directory
+        executor : concurrent.futures executor used to cache the files
+    Returns:
+        List of overlapping pairs of filepaths
+    """
+    headers = parse_headers(lidar_files)
+    boxes = {
+        fp: BoundingBox(xmin, xmax, ymin, ymax)
+        for fp, xmin, xmax, ymin, ymax in zip(
+            lidar_files,
+            headers['xmin'],
+            headers['xmax'],
+            headers['ymin'],
+            headers['ymax']
+        )
+    }
+    combos = list(combinations(lidar_files, 2))
+    pairs = [
+        pair for pair in combos
+        if boxes[pair[0]].intersects(boxes[pair[1]])
+    ]
+
+    swaths = list(dict.fromkeys(chain.from_iterable(pairs)))
+    futures = [executor.submit(cache_swath, fp, cache_dir) for fp in swaths]
+
+    hulls = {}
+    for fp, future in zip(swaths, futures):
+        try:
+            hulls[fp] = Polygon(np.load(future.result()[1]))
+        except Exception as e:
+            print(f"{os.path.basename(fp)}: {e}")
+
+    pairs = [
+        pair for pair in pairs
+        if pair[0] in hulls and pair[1] in hulls
+        and hulls[pair[0]].intersects(hulls[pair[1]])
+    ]
+
+    print(
+        f"{config.AnsiColors.cyan}"
+        f"{len(pairs)} of {len(combos)} swath pairs overlap"
+        f"{config.AnsiColors.reset}",
+        flush=True
+    )
+
+    return pairs
+
+
 def no_overlap_message():
     no_overlap_message = (
         "\n\tThis pair of lidar swaths do not overlap; "
@@ -922,6 +1157,9 @@ def analyze_residuals(
     D_r = slope_residuals - (N_z * np.mean(slope_residuals))
     delta_h = np.linalg.lstsq(N_xy, D_r, rcond=None)
 
+    flat_stats = residual_stats.summarize(flat_residuals)
+    slope_stats = residual_stats.summarize(slope_residuals)
+
     results = {
         'flat_residuals': flat_residuals,
         'slope_residuals': slope_residuals,
@@ -929,26 +1167,16 @@ def analyze_residuals(
         'offset_vector': delta_h[0],
         'ov_length': math.sqrt(delta_h[0][0] ** 2 + delta_h[0][1] ** 2),
         'ov_rmsd': math.sqrt(delta_h[1][0] / len(slope_residuals)),
-        'flat_mean': np.mean(flat_residuals),
-        'flat_median': np.median(flat_residuals),
-        'flat_std': np.std(flat_residuals),
-        'flat_95p': (
-            np.percentile(flat_residuals, 97.5)
-            - np.percentile(flat_residuals, 2.5)
-        ) / 2,
-        'flat_rmse': math.sqrt(
-            np.sum(flat_residuals**2) / len(flat_residuals)
-        ),
-        'slope_mean': np.mean(slope_residuals),
-        'slope_rmse': math.sqrt(
-            np.sum(slope_residuals ** 2) / len(slope_residuals)
-        ),
-        'slope_median': np.median(slope_residuals),
-        'slope_std': np.std(slope_residuals),
-        'slope_95p': (
-            np.percentile(slope_residuals, 97.5)
-            - np.percentile(slope_residuals, 2.5)
-        ) / 2,
+        'flat_mean': flat_stats['mean'],
+        'flat_median': flat_stats['median'],
+        'flat_std': flat_stats['std'],
+        'flat_95p': flat_stats['95p'],
+        'flat_rmse': flat_stats['rmse'],
+        'slope_mean': slope_stats['mean'],
+        'slope_rmse': slope_stats['rmse'],
+        'slope_median': slope_stats['median'],
+        'slope_std': slope_stats['std'],
+        'slope_95p': slope_stats['95p'],
         'errors': [],
         'Test_results': []
     }
@@ -1386,22 +1614,16 @@ def save_results(results, save_info):
     )
 
     pvalue = results['chi-square'][5]
-    percents = [0.01, 0.05, 0.1, 0.2]
     y = 210
-    for i in percents:
-        intPercent = int(i * 100)
-        if pvalue > i:
-            report.drawString(
-                75,
-                y,
-                f"Accept {intPercent}%?:  Yes"
-            )
-        else:
-            report.drawString(
-                75,
-                y,
-                f"Accept {intPercent}%?:  No"
-            )
+    for alpha, accepted in zip(
+        residual_stats.CHI_SQUARE_ALPHAS,
+        residual_stats.alpha_checks(pvalue)
+    ):
+        report.drawString(
+            75,
+            y,
+            f"Accept {int(alpha * 100)}%?:  {'Yes' if accepted else 'No'}"
+        )
         y -= 15
 
     # -----------------------------------------------------------------
@@ -1555,6 +1777,47 @@ def _temp_dir(outdir):
     return temp_dir
 
 
+def _swath_cache_dir():
+    swath_cache_dir = config.SWATH_CACHE_DIR
+    if not os.path.isdir(swath_cache_dir):
+        os.makedirs(swath_cache_dir)
+    return swath_cache_dir
+
+
+def _swath_cache_key(fp):
+    # Keyed by the full path, so files with the same name in different
+    # folders never share an entry. A modified file gets a new key, so
+    # its stale entries are never read again and are eventually evicted
+    stat = os.stat(fp)
+    return hashlib.md5(
+        f"{Path(fp).resolve()}|{stat.st_size}|{stat.st_mtime_ns}".encode()
+    ).hexdigest()
+
+
+def _swath_cache_paths(fp, cache_dir):
+    key = _swath_cache_key(fp)
+    swath_cache_paths = (
+        os.path.join(cache_dir, f"{key}.points.npy"),
+        os.path.join(cache_dir, f"{key}.hull.npy")
+    )
+    return swath_cache_paths
+
+
+def _write_cache_file(path, write):
+    # Write to a temporary file first, so a partly written
+    # file is never mistaken for a cached one
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _touch_cache_files(*paths):
+    # Mark cached files as recently used, for evict_swath_cache
+    for path in paths:
+        os.utime(path)
+
+
 def _flat_hist_png():
     flat_hist_png = "flat_hist.png"
     return flat_hist_png
@@ -1603,26 +1866,13 @@ def make_chi_table(
     outdir
 ):
     for pair_result in chisquareResults:
-        pair_result[1] = round(pair_result[1], 4)
-        pair_result[3] = round(pair_result[1], 4)
-        pair_result[4] = round(pair_result[1], 4)
-        pair_result[5] = round(pair_result[1], 4)
-        if pair_result[6] > 0.01:
-            pair_result.append('Accept')
-        else:
-            pair_result.append('Reject')
-        if pair_result[6] > 0.05:
-            pair_result.append('Accept')
-        else:
-            pair_result.append('Reject')
-        if pair_result[6] > 0.1:
-            pair_result.append('Accept')
-        else:
-            pair_result.append('Reject')
-        if pair_result[6] > 0.2:
-            pair_result.append('Accept')
-        else:
-            pair_result.append('Reject')
+        # [swaths, chi-square sum, dof, max, min, range, p-value]
+        for i in (1, 3, 4, 5):
+            pair_result[i] = round(pair_result[i], 4)
+        pair_result.extend(
+            'Accept' if accepted else 'Reject'
+            for accepted in residual_stats.alpha_checks(pair_result[6])
+        )
     chisquareResults.insert(
         0,
         [
@@ -1784,72 +2034,12 @@ class BoundingBox:
         """Convert the bounding box to a 2d list format."""
         return [[self.xmin, self.xmax], [self.ymin, self.ymax]]
 
-
-def parse_header(filename, verbose=False):
-    """
-    Parse a las/laz file's header into a workable struct format.
-    """
-    headerstruct = (
-        ('filesig', 4, 'c', 4),
-        ('filesourceid', 2, 'H', 1),
-        ('reserved', 2, 'H', 1),
-        ('guid1', 4, 'L', 1),
-        ('guid2', 2, 'H', 1),
-        ('guid3', 2, 'H', 1),
-        ('guid4', 8, 'B', 8),
-        ('vermajor', 1, 'B', 1),
-        ('verminor', 1, 'B', 1),
-        ('sysid', 32, 'c', 32),
-        ('gensoftware', 32, 'c', 32),
-        ('fileday', 2, 'H', 1),
-        ('fileyear', 2, 'H', 1),
-        ('headersize', 2, 'H', 1),
-        ('offset', 4, 'L', 1),
-        ('numvlrecords', 4, 'L', 1),
-        ('pointformat', 1, 'B', 1),
-        ('pointreclen', 2, 'H', 1),
-        ('numptrecords', 4, 'L', 1),
-        ('numptbyreturn', 20, 'L', 5),
-        ('xscale', 8, 'd', 1),
-        ('yscale', 8, 'd', 1),
-        ('zscale', 8, 'd', 1),
-        ('xoffset', 8, 'd', 1),
-        ('yoffset', 8, 'd', 1),
-        ('zoffset', 8, 'd', 1),
-        ('xmax', 8, 'd', 1),
-        ('xmin', 8, 'd', 1),
-        ('ymax', 8, 'd', 1),
-        ('ymin', 8, 'd', 1),
-        ('zmax', 8, 'd', 1),
-        ('zmin', 8, 'd', 1),
-        ('waveform', 8, 'Q', 1),
-        ('firstEVLR', 8, 'Q', 1),
-        ('numEVLR', 4, 'L', 1),
-        ('exnumbptrec', 8, 'Q', 1),
-        ('exnumbyreturn', 120, 'Q', 15)
-    )
-
-    header = {'infile': filename}
-
-    with open(filename, 'rb') as fh:
-        for i in headerstruct:
-            if i[2] == 'c':
-                value = fh.read(i[1])
-            elif i[3] > 1:
-                value = struct.unpack(f"={str(i[3])}{i[2]}", fh.read(i[1]))
-            else:
-                value = struct.unpack(f"={i[2]}", fh.read(i[1]))[0]
-            if verbose:
-                print(f"{i[0]}\t", f"{i[2]}\t", value)
-
-            header[i[0]] = value
-
-    # if laz file, subtract 128 from the point data format
-    # (laz compression adds 128 to the point format)
-    if header['infile'].suffix == '.laz':
-        header['pointformat'] = header['pointformat'] - 128
-
-    return header
+    def intersects(self, other):
+        """Check if the bounding box overlaps another bounding box."""
+        return (
+            (min(self.xmax, other.xmax) - max(self.xmin, other.xmin) > 0)
+            and (min(self.ymax, other.ymax) - max(self.ymin, other.ymin) > 0)
+        )
 
 
 def _delete_temp_png_files(outdir):
@@ -8,6 +8,7 @@ import base64
 import os
 
 from itertools import chain
+from multiprocessing import freeze_support
 from pathlib import Path
 from tkinter import ttk, filedialog, messagebox
 from tkinter import *
@@ -883,4 +884,5 @@ def main():
 
 
 if __name__ == '__main__':
+    freeze_support()
     main()
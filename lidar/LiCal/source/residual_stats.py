@@ -0,0 +1,131 @@
+# ------------------------------------------------------------------------------
+# Residual statistics for LiCal
+# Vectorized summary statistics and chi-square test of swath residuals.
+# ------------------------------------------------------------------------------
+
+import math
+
+import numpy as np
+import scipy.stats as stats
+
+# Significance levels the chi-square test is checked against
+CHI_SQUARE_ALPHAS = [0.01, 0.05, 0.1, 0.2]
+
+
+def summarize(residuals):
+    """
+    Calculate the summary statistics of a set of residuals.
+
+    Args:
+        residuals : A 1-d numpy array of residuals
+    Returns:
+        A dictionary with the mean, median, std, 95p and rmse
+        of the residuals
+    """
+    p_low, p_high = np.percentile(residuals, [2.5, 97.5])
+
+    return {
+        'mean': np.mean(residuals),
+        'median': np.median(residuals),
+        'std': np.std(residuals),
+        '95p': (p_high - p_low) / 2,
+        'rmse': math.sqrt(np.sum(residuals ** 2) / len(residuals))
+    }
+
+
+def bin_bounds(values):
+    """
+    Find the chi-square bin bounds of a set of values.
+
+    The number of bins follows Sturges' rule, and the bins span the
+    range of the values. Bounds are rounded to 10 decimal places.
+
+    Args:
+        values : A 1-d numpy array of values
+    Returns:
+        A 1-d numpy array of the (number of bins + 1) bin bounds
+    """
+    valRange = values.max() - values.min()
+    initWidth = round(valRange / (1 + 3.22 * (math.log10(len(values)))), 10)
+    initBins = round(valRange / initWidth)
+    binWidth = valRange / initBins
+    numOfBins = round(valRange / binWidth)
+
+    # Each bound is rounded from the previous one, so they're accumulated
+    # one at a time (there are only a few dozen of them)
+    bounds = [values.min()]
+    for i in range(numOfBins):
+        bounds.append(round(bounds[i] + binWidth, 10))
+
+    return np.array(bounds)
+
+
+def observed_frequencies(values, bounds):
+    """
+    Count the values in each bin.
+
+    Bins are half-open, [lower, upper), except for the last bin,
+    which also includes its upper bound.
+
+    Args:
+        values : A 1-d numpy array of values
+        bounds : A 1-d numpy array of increasing bin bounds
+    Returns:
+        A 1-d numpy array of the number of values in each bin
+    """
+    sorted_values = np.sort(values)
+    edges = np.searchsorted(sorted_values, bounds, side='left')
+    edges[-1] = np.searchsorted(sorted_values, bounds[-1], side='right')
+
+    return np.diff(edges)
+
+
+def chi_square_test(values):
+    """
+    Test if a set of values is normally distributed,
+    with Pearson's chi-square goodness of fit test.
+
+    Args:
+        values : A 1-d array of values, eg, residuals
+    Returns:
+        A list of the chi-square sum, degrees of freedom,
+        max, min, range, and p-value
+    """
+    values = np.asarray(values)
+    numOfSamples = len(values)
+    mean = values.mean()
+    stdev = values.std(ddof=1)
+
+    bounds = bin_bounds(values)
+    numOfBins = len(bounds) - 1
+
+    normalProbability = np.diff(stats.norm.cdf(bounds, mean, stdev))
+    predictedFreq = normalProbability * numOfSamples
+    observedFreq = observed_frequencies(values, bounds)
+    chiSquare = (predictedFreq - observedFreq) ** 2 / predictedFreq
+
+    # Summed in order, like the original per-bin loop
+    chiSum = sum(chiSquare)
+    pValue = stats.chi2.sf(chiSum, numOfBins - 1)
+
+    return [
+        chiSum,
+        numOfBins - 1,
+        values.max(),
+        values.min(),
+        values.max() - values.min(),
+        pValue
+    ]
+
+
+def alpha_checks(pValue, alphas=CHI_SQUARE_ALPHAS):
+    """
+    Check if the chi-square test is accepted at each significance level.
+
+    Args:
+        pValue : The p-value of the chi-square test
+        alphas : The significance levels to check
+    Returns:
+        A list of booleans, True where the test is accepted
+    """
+    return (pValue > np.array(alphas)).tolist()
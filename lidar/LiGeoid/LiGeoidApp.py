@@ -4,12 +4,11 @@
 # heights(CGVD2013) using NrCANS's latest geoid model  
 # info: Lidar@gov.bc.ca
 
-from osgeo import gdal
+import copy
 import laspy
-from pyproj import Proj
-from pandas import DataFrame
-import numpy as np
-from scipy import ndimage
+import pyproj
+from laspy.vlrs.known import WktCoordinateSystemVlr
+from laspy.vlrs.vlrlist import VLRList
 import matplotlib.pyplot as plt
 from tkinter import filedialog as fd
 import os
@@ -20,12 +19,10 @@ import disclaimer as dc
 import easygui as eg
 import webbrowser
 import lasattr
+from rsge_toolbox.lidar.GeoidSeparation import GeoidGrid, GeoidSeparation, PointOffset, INTERPOLATION_ORDER
 
 
 
-#set interpolation algorythm for Geoid grid 
-interpol_alg= 'nearest'
-
 def Geoid_DB_check():
     #check if geoid DB file present
     print("OS path:",os.path)
@@ -80,133 +77,92 @@ def Import_Geoid():
 
 
 
-def DegToPixel(point_long_,up_le_long_,res_x_,point_lat_,up_le_lat_,res_y_):
-    point_pixel_x_=(point_long_-up_le_long_)/res_x_
-    point_pixel_y_=(point_lat_-up_le_lat_)/res_y_
-    return point_pixel_x_, point_pixel_y_
+def Output_header(header, epsg=6647):
+    #Build the header of the orthometric output file from the input header:
+    #horizontal-only WKT (E)VLRs are replaced by compound WKT using the vertical datum epsg,
+    #all other (E)VLRs are removed (same result as lasattr's replace_wkt_with_compound_wkt
+    #and remove_all_vlrs_evlrs_except_wkt, without rewriting the file)
+    out_header = copy.deepcopy(header)
+
+    def wkt_only(vlrs):
+        return [vlr for vlr in (vlrs or []) if isinstance(vlr, WktCoordinateSystemVlr) and pyproj.crs.is_wkt(vlr.string)]
+
+    wkt_vlrs = wkt_only(out_header.vlrs)
+    wkt_evlrs = wkt_only(out_header.evlrs)
+    if not wkt_vlrs and not wkt_evlrs:
+        raise ValueError("No WKT entries in las/laz file!")
+    if all(pyproj.CRS(vlr.string).is_compound for vlr in wkt_vlrs + wkt_evlrs):
+        raise ValueError("No horizontal-only WKT entries in las/laz file!")
+
+    def compound(vlrs):
+        return [
+            vlr if pyproj.CRS(vlr.string).is_compound else WktCoordinateSystemVlr(lasattr.compound_wkt(vlr.string, epsg))
+            for vlr in vlrs
+        ]
 
-def UTM_to_LatLon(las_x,las_y,las_z,zone,zone_id):
-    #create Numpy array for coordinate transformation from UTM to Geographic   
-    df = DataFrame(np.c_[las_x,las_y], columns=['Meters West', 'Meters North'])
-    myProj = Proj("+proj=utm +zone="+str(zone)+" +north +ellps=GRS80 +datum=NAD83 +units=m +no_defs")
-    # Convvert UTM to Geographic coordinates
-    lon_, lat_ = myProj(df['Meters West'].values, df['Meters North'].values, inverse=True)
-    return  lon_,lat_ 
+    out_header.vlrs = VLRList(compound(wkt_vlrs))
+    if out_header.evlrs is not None:
+        out_header.evlrs = VLRList(compound(wkt_evlrs))
+
+    #mark the file as modified, as lasattr's write_output does
+    out_header.generating_software = lasattr.lasattr_software_name
+    out_header.system_identifier = "MODIFICATION"
+
+    return out_header
 
 
 def main(x_OFF,y_OFF,z_OFF,Geoid_file,Input_file,Output_file,ver,ant_ht):
 
     # ============================= Main program ===================================
-    # Read Geoid file & retrieve spatial grid information from the geoidfile 
-    ds = gdal.Open(Geoid_file)
-    gt=ds.GetGeoTransform()
-    proj=ds.GetProjection()
-    scale_=ds.GetRasterBand(1).GetScale()
-    
-    #Import raster dataset as an array with geoid undulation values in the z direction 
-    band = ds.GetRasterBand(1) # elevation band 
-    array=band.ReadAsArray() *scale_ #apply scale factor to Geoid grid XY int values 
-    #Read points in  Lat long and convert into grid system (numpy) 
-    num_pixel_x = ds.RasterXSize
-    num_pixel_y = ds.RasterYSize
-
-    #retrieve grid reference infos: 
-    res_x = gt[1] #resolution longitude
-    res_y= gt[5] # resolution latitude
-    up_le_long=gt[0]   # upper left grid corner longitue (deg)
-    up_le_lat=gt[3]    # upper left grid corner latitude (deg)
-
-    #read lidar points, select lidar pt class and write to output file
-    
-    las = laspy.read(Input_file)
+    # Read Geoid file (cached as a memory-mapped array after the first run)
+    grid = GeoidGrid(Geoid_file)
+
+    #read lidar header
+    with laspy.open(Input_file) as reader:
+        header = reader.header
     print("Input file: ",Input_file)
     print("Geoid     : ",Geoid_file)
-    print(f"Point format:       {las.header.point_format}")
-    print(f"Number of points:   {las.header.point_count}")
-    print(f"Version:   {las.header.major_version}.{las.header.minor_version}")
-    print(f"Scale factor:   {las.header.scale}")
-    print(f"Min coordinate exents:   {las.header.min}")
-    print(f"Max coordinate exents:   {las.header.max}")
-    print(f"LiDAR Point classes detected:   {list(dict.fromkeys(list(las.classification)))}")     
+    print(f"Point format:       {header.point_format}")
+    print(f"Number of points:   {header.point_count}")
+    print(f"Version:   {header.major_version}.{header.minor_version}")
+    print(f"Scale factor:   {header.scale}")
+    print(f"Min coordinate exents:   {header.min}")
+    print(f"Max coordinate exents:   {header.max}")
 
     #check for lidar version 1.4
-    ver= str(las.header.major_version) +"." + str(las.header.minor_version)
+    ver= str(header.major_version) +"." + str(header.minor_version)
     print ("Version  check =",ver)
 
-    #apply offsets to lidar points if required
-    if float(x_OFF) !=0.0:
-        las.x=las.x+float(x_OFF)
-        print ("Applied X-Offset:",float(x_OFF))
-
-    #apply offsets to lidar points if required
-    if float(y_OFF) != 0.0:
-        las.y=las.y+float(y_OFF)
-        print ("Applied Y-Offset:",float(y_OFF))
-    
-    #apply offsets to lidar points if required
-    if float(z_OFF) !=0.0:
-        las.z=las.z+float(z_OFF)
-        print ("Applied Z-Offset:",float(z_OFF))
-
-    # apply antenna height offset (reference is ground) if required
-    if float(ant_ht) !=0.0:
-        las.z=las.z-float(ant_ht)
+    #offsets and antenna height are applied to each chunk of points, if required
+    offset = PointOffset(x=float(x_OFF), y=float(y_OFF), z=float(z_OFF))
+    if offset.x != 0.0:
+        print ("Applied X-Offset:",offset.x)
+    if offset.y != 0.0:
+        print ("Applied Y-Offset:",offset.y)
+    if offset.z != 0.0:
+        print ("Applied Z-Offset:",offset.z)
+    if float(ant_ht) != 0.0:
         print ("Applied Antenna height :",float(ant_ht))
 
-    #apply classification filter if necessarry
-    if LiDAR_class > -1:
-        las.points = las.points[las.classification == LiDAR_class] # only use specific class
+    #build the final header up front (compound WKT, only WKT VLRs kept), so the points are written once
+    out_header = Output_header(header)
 
-    #transform UTMtoLatLong to pixel(array) coordinates 
+    #derive geoid undulation N for each point (UTM -> lat/long -> grid) and compute orthometric heights,
+    #streaming chunks of points straight into the output file
     ZONE,ZONE_ID,VERT_FLAG= vlrs_check.check_UTM (Input_file,ver) # read zone from VLRS, check if UTM ZONE exists. -1 -1 if not
-    point_long, point_lat = UTM_to_LatLon(las.x,las.y,las.z,ZONE,ZONE_ID)
-    point_pixel_x, point_pixel_y = DegToPixel(point_long,up_le_long,res_x,point_lat,up_le_lat,res_y)
-    # rearrange lidar points in numpy array
-    LiDAR_points = np.array([point_pixel_y,point_pixel_x])
-    #derive geoidundulation N from scattered lidar elevations
-    N= ndimage.map_coordinates(array, LiDAR_points, order=3, mode=interpol_alg)
-    
-    #compute average geoid undulation
-    av_N=np.average(N)
-    min_N=np.min(N)
-    max_N=np.max(N)
-    print("Min Geoidundulation :",min_N,"m")
-    print("Max Geoidundulation :",max_N,"m")
-    print("Average Geoidundulation :",av_N,"m")
-
-    #compute Orthometric heights & update las elevations  
-    H_Ortho = np.array((las.z -N))
-    las.z=H_Ortho
-
-    #write classified data into temporary Las file
-    temp_file=str(Output_file)+".las"
-    las.write(temp_file)
-    
-    #update LAS header 
-    my_lasattr_obj = lasattr.LasAttr(temp_file)
-    my_lasattr_obj.replace_wkt_with_compound_wkt()
-    my_lasattr_obj.remove_all_vlrs_evlrs_except_wkt()
-    my_lasattr_obj.write_output(Output_file)
-
-    #delete temp file
-    os.remove(temp_file)
-    
+    geoid = GeoidSeparation(grid, ZONE, order=INTERPOLATION_ORDER.BICUBIC)
+    stats = geoid.transform_file(
+        Input_file, Output_file, header=out_header, offset=offset, ant_ht=float(ant_ht), class_num=LiDAR_class
+    )
+
+    print("Min Geoidundulation :",stats["n_min"],"m")
+    print("Max Geoidundulation :",stats["n_max"],"m")
+    print("Average Geoidundulation :",stats["n_mean"],"m")
+
     #Print output metadata on screen
     print("\nOutput file: ",Output_file)
-    las_out = laspy.read(Output_file)
-    #print(f"Point format:       {las_out.header.point_format}")
-    #print(f"Number of points:   {las_out.header.point_count}")
-    #print(f"Version:   {las_out.header.major_version}.{las_out.header.minor_version}")
-    #print(f"Scale factor:   {las_out.header.scale}")
-   # print(f"Min coordinate exents:   {las_out.header.min}")
-    #print(f"Max coordinate exents:   {las_out.header.max}")
-    print(f"LiDAR Point classes saved:   {list(dict.fromkeys(list(las.classification)))}")
+    print(f"LiDAR Point classes saved:   {stats['classes']}")
     print (f"Geoid: {Geoid_file}")
-    #print ("Applied X_OFFSET_m: ",x_OFF)
-    #print ("Applied Y_OFFSET_m: ",y_OFF)
-    #print ("Applied Z_OFFSET_m: ",z_OFF)
-    #print ("Updating LAS header...\n")
-    #print("New Output file created: ",Output_file)
     print("\n========================== Finished  ===============================")
 
 # =========== Check  DB file & Geoid file ====================
@@ -113,8 +113,8 @@
 
 from datetime import datetime
 import os
+import io
 import pyproj
-import shutil
 import struct
 import sys
 
@@ -134,6 +134,22 @@ lasattr_software_name = "LasAttr Beta, GeoBC"
 _dashline = "-" * 80
 
 
+# ------------------------------------------------------------------------------
+# BUFFER SIZE FOR COPYING POINT DATA WHEN WRITING FILES
+# Point data and EVLRs are copied in pieces of this many bytes,
+# so writing a file never reads all of its point data into memory.
+# ------------------------------------------------------------------------------
+
+_copy_buffer_size = 1024 * 1024
+
+# WKT version of compound WKT strings written by compound_wkt()
+_compound_wkt_version = pyproj.enums.WktVersion.WKT1_GDAL
+
+# Compound WKT strings already made by compound_wkt(),
+# keyed by (horizontal WKT string, vertical datum epsg)
+_compound_wkt_blobs = {}
+
+
 # ------------------------------------------------------------------------------
 # CHECK PYTHON VERSION
 # ------------------------------------------------------------------------------
@@ -569,6 +585,108 @@ def _bytes_to_string_strip_trailing_nulls(byte_string):
     return decoded_string_trailing_nulls_removed
 
 
+def compound_wkt(wkt_string, epsg=6647):
+    """
+    Make a compound (horizontal-and-vertical) WKT string
+    from a non-compound (horizontal-only) WKT string,
+    using the input epsg value for the vertical datum.
+
+    Default vertical datum is EPSG 6647, for CGVD2013.
+    https://epsg.io/6647
+
+    Each compound WKT string is kept in _compound_wkt_blobs,
+    so it's only made once per process (e.g., once for all of the
+    files in a delivery that share the same horizontal WKT).
+    """
+    blob_key = (wkt_string, epsg)
+    if blob_key in _compound_wkt_blobs:
+        return _compound_wkt_blobs[blob_key]
+
+    orig_crs_obj = pyproj.CRS(wkt_string)
+
+    # Define the name of the new CRS as it will be written
+    # at the beginning of the WKT string
+    if epsg == 6647:
+        epsg_text = "CGVD2013 height"
+    else:
+        epsg_text = f"EPSG {str(epsg)} height"
+    new_crs_name = f"{orig_crs_obj.name} + {epsg_text}"
+
+    # Create a new, compound CRS object using the original horizontal
+    # WKT string and the EPSG code provided as a parameter to this method
+    # (default value is 6647, CGVD2013)
+    new_crs = pyproj.crs.CompoundCRS(
+        new_crs_name,
+        components=[wkt_string, epsg]
+    )
+
+    # Create the new WKT string for the new compound CRS
+    # Note that the default WKT version for to_wkt() is WKT2_2019
+    # See: https://pyproj4.github.io/pyproj/dev/api/crs/crs.html#id2
+    # (search for CRS.to_wkt on the above page)
+    # Possible WKT versions:
+    # https://pyproj4.github.io/pyproj/dev/api/crs/crs.html#id2
+    new_wkt = new_crs.to_wkt(version=_compound_wkt_version)
+
+    _compound_wkt_blobs[blob_key] = new_wkt
+
+    return new_wkt
+
+
+def _copy_data(
+    infile,
+    outfile,
+    src,
+    dst,
+    length
+):
+    """
+    Copy a number of bytes (length) from one file (infile),
+    starting at byte src, to another file (outfile),
+    starting at byte dst.
+
+    os.copy_file_range is used where it is available, so the data
+    is copied by the operating system without passing through python
+    (on copy-on-write file systems it may not be copied at all).
+    Otherwise, or if the file system doesn't support it, the data is
+    copied in pieces of _copy_buffer_size bytes.
+
+    Leaves the outfile cursor at the end of the copied data.
+    """
+    copied = 0
+
+    if hasattr(os, "copy_file_range"):
+        # copy_file_range writes to the file descriptor directly,
+        # so anything buffered in outfile must be written first
+        outfile.flush()
+        try:
+            while copied < length:
+                num_bytes = os.copy_file_range(
+                    infile.fileno(),
+                    outfile.fileno(),
+                    length - copied,
+                    src + copied,
+                    dst + copied
+                )
+                if num_bytes == 0:
+                    break
+                copied += num_bytes
+        except OSError:
+            # Not supported between these files;
+            # copy the rest with the buffered loop below
+            pass
+
+    infile.seek(src + copied)
+    outfile.seek(dst + copied)
+
+    while copied < length:
+        buffer = infile.read(min(_copy_buffer_size, length - copied))
+        if not buffer:
+            break
+        outfile.write(buffer)
+        copied += len(buffer)
+
+
 def _crs_obj_from_prefix_and_index(lasattr_instance, prefix, index):
     """
     Given a LasAttr attribute prefix (either "vlr" or "evlr"),
@@ -752,6 +870,30 @@ def _guid_warning_gate(guid_attribute_key):
     print(_dashline)
 
 
+def _header_and_vlr_bytes(lasattr_instance):
+    """
+    Pack the public header and VLRs of a LasAttr
+    object instance into a bytes string, ready to be
+    written at the beginning of a las/laz file.
+    """
+    header_and_vlrs = io.BytesIO()
+
+    _write_public_header(lasattr_instance, header_and_vlrs)
+
+    # Set cursor to the beginning of VLRs (for las 1.4, this will
+    # always be 375 and we're already in the right position,
+    # but other versions may be different.
+    header_size = getattr(
+        lasattr_instance,
+        list(public_header_dict)[13]
+    )
+    header_and_vlrs.seek(header_size)
+
+    _write_vlrs(lasattr_instance, header_and_vlrs)
+
+    return header_and_vlrs.getvalue()
+
+
 def _initialize_evlr_attributes(
     lasattr_instance,
     infile
@@ -1237,6 +1379,46 @@ def _log_vlr_evlr_value(lasattr_instance, prefix, index):
     return log_vlr_evlr_value
 
 
+def _move_data_in_place(
+    lasfile,
+    src,
+    dst,
+    length
+):
+    """
+    Move a number of bytes (length) within an open file (lasfile),
+    from byte src to byte dst, in pieces of _copy_buffer_size bytes.
+
+    The pieces are moved starting from the end of the data when
+    it moves towards the end of the file, and from the beginning
+    when it moves towards the start, so no data is overwritten
+    before it has been moved.
+
+    Leaves the cursor at the end of the moved data.
+    """
+    if dst < src:
+        moved = 0
+        while moved < length:
+            num_bytes = min(_copy_buffer_size, length - moved)
+            lasfile.seek(src + moved)
+            buffer = lasfile.read(num_bytes)
+            lasfile.seek(dst + moved)
+            lasfile.write(buffer)
+            moved += num_bytes
+
+    elif dst > src:
+        remaining = length
+        while remaining > 0:
+            num_bytes = min(_copy_buffer_size, remaining)
+            remaining -= num_bytes
+            lasfile.seek(src + remaining)
+            buffer = lasfile.read(num_bytes)
+            lasfile.seek(dst + remaining)
+            lasfile.write(buffer)
+
+    lasfile.seek(dst + length)
+
+
 def _now_strings():
     """
     Returns two versions of the current minute, formatted thus:
@@ -1268,12 +1450,15 @@ def _parse_vlrs_evlrs_with_wkt(lasattr_instance):
     return vlr_wkt, evlr_wkt
 
 
-def _prep_output_file(
+def _prep_output_path(
     lasattr_instance,
     output_laslaz_path
 ):
     """
-    If not overwriting in place, copy input file to output location.
+    Check the output file path, adding the file extension
+    of the input file if required.
+
+    Returns the output file path (string).
     """
     input_laslaz_path = getattr(
         lasattr_instance,
@@ -1286,7 +1471,7 @@ def _prep_output_file(
     if not output_laslaz_path.endswith(input_file_ext):
         output_laslaz_path += input_file_ext
 
-    if input_laslaz_path == output_laslaz_path:
+    if os.path.abspath(input_laslaz_path) == os.path.abspath(output_laslaz_path):
         print("Original file will be overwritten!")
 
         # WARNING GATE FOR TERMINAL-SCRIPT-RUNNING ONLY:
@@ -1302,12 +1487,7 @@ def _prep_output_file(
         #             f"\n{_dashline}"
         #         )
 
-    else:
-        # Copy the original las/laz file to the output location
-        shutil.copyfile(
-            input_laslaz_path,
-            output_laslaz_path
-        )
+    return output_laslaz_path
 
 
 def _set_logpath(lasattr_instance, log_filename, log_folder, now_string_filename):
@@ -2326,34 +2506,10 @@ class LasAttr:
             prefix = not_compound_wkt[0]
             k = not_compound_wkt[1]
 
-            # Make a pyproj CRS object out of the non-compound WKT string
-            orig_crs_obj, wkt_string = _crs_obj_from_prefix_and_index(self, prefix, k)
-
-            # Define the name of the new CRS as it will be written
-            # at the beginning of the WKT string
-            if epsg == 6647:
-                epsg_text = "CGVD2013 height"
-            else:
-                epsg_text = f"EPSG {str(epsg)} height"
-            new_crs_name = f"{orig_crs_obj.name} + {epsg_text}"
-
-            # Create a new, compound CRS object using the original horizontal
-            # WKT string and the EPSG code provided as a parameter to this method
-            # (default value is 6647, CGVD2013)
-            new_crs = pyproj.crs.CompoundCRS(
-                new_crs_name,
-                components=[wkt_string, epsg]
-            )
-
-            # Create the new WKT string for the new compound CRS
-            # Note that the default WKT version for to_wkt() is WKT2_2019
-            # See: https://pyproj4.github.io/pyproj/dev/api/crs/crs.html#id2
-            # (search for CRS.to_wkt on the above page)
-            # Possible WKT versions:
-            # https://pyproj4.github.io/pyproj/dev/api/crs/crs.html#id2
-            version = pyproj.enums.WktVersion.WKT1_GDAL
-            new_wkt = new_crs.to_wkt(version=version)
-            print("WKT default in Lasatr: ", version)
+            # Make a compound WKT string out of the non-compound WKT string
+            _, wkt_string = _crs_obj_from_prefix_and_index(self, prefix, k)
+            new_wkt = compound_wkt(wkt_string, epsg)
+            print("WKT default in Lasatr: ", _compound_wkt_version)
 
             # Find the appropriate value attribute name
             if prefix == _vlr_attr_prefix:
@@ -2401,54 +2557,66 @@ class LasAttr:
                 "MODIFICATION"
             )
 
-        # Copy the original file to the output location,
-        # ready to be overwritten.
-        _prep_output_file(
+        input_laslaz_path = getattr(
             self,
-            output_laslaz_path
+            list(other_attributes_dict)[0]
         )
 
-        # Over-write the data in the output file with the LasAttr object attributes
-        with open(output_laslaz_path, "r+b") as outfile:
-            # FOR TESTING ONLY - time how long it takes to write a file
-            # print(f"{_dashline}\nStarting write process...")
-            # start_write = datetime.now()
+        output_laslaz_path = _prep_output_path(
+            self,
+            output_laslaz_path
+        )
 
-            # FOR TESTING ONLY - print the original file size
-            # outfile.seek(0)
-            # print(f"Length of original file: {len(outfile.read())}")
+        # The point data and any original EVLRs start here in the original
+        # file, and follow directly after the new VLRs in the new file
+        # (if the length of the VLRs changed, this data is re-positioned)
+        original_offset_to_point_data = getattr(
+            self,
+            list(other_attributes_dict)[1]
+        )
 
-            # Read all of the original point data and any EVLRs
-            # before overwriting anything
-            original_offset_to_point_data = getattr(
-                self,
-                list(other_attributes_dict)[1]
-            )
-            outfile.seek(original_offset_to_point_data)
-            original_point_data_onward = outfile.read()
+        # The new public header and VLRs are only a few kilobytes,
+        # so they're packed in memory and written in one go.
+        header_and_vlrs = _header_and_vlr_bytes(self)
+        new_offset_to_point_data = len(header_and_vlrs)
 
-            # Set cursor to the beginning of the file
-            outfile.seek(0)
+        overwrite_in_place = (
+            os.path.abspath(input_laslaz_path) == os.path.abspath(output_laslaz_path)
+        )
 
-            # Overwrite public header attributes in las/laz file
-            _write_public_header(self, outfile)
+        with open(output_laslaz_path, "r+b" if overwrite_in_place else "w+b") as outfile:
+            if overwrite_in_place:
+                # If the VLRs are the same length as the original VLRs,
+                # only the header and VLR bytes are re-written; otherwise,
+                # the point data is moved to directly after the new VLRs.
+                data_length = os.fstat(outfile.fileno()).st_size - original_offset_to_point_data
+                _move_data_in_place(
+                    outfile,
+                    original_offset_to_point_data,
+                    new_offset_to_point_data,
+                    data_length
+                )
+            else:
+                # Copy the point data (and any original EVLRs)
+                # to directly after the new VLRs
+                with open(input_laslaz_path, "rb") as infile:
+                    data_length = os.fstat(infile.fileno()).st_size - original_offset_to_point_data
+                    _copy_data(
+                        infile,
+                        outfile,
+                        original_offset_to_point_data,
+                        new_offset_to_point_data,
+                        data_length
+                    )
 
-            # Set cursor to the beginning of VLRs (for las 1.4, this will
-            # always be 375 and we're already in the right position,
-            # but other versions may be different.
-            header_size = getattr(
-                self,
-                list(public_header_dict)[13]
-            )
-            outfile.seek(header_size)
+            # Cursor is at the end of the point data (and any original EVLRs)
+            end_of_data = outfile.tell()
 
-            # Overwrite vlr header and value attributes in las/laz file
-            _write_vlrs(self, outfile)
+            # Overwrite public header and vlr attributes in las/laz file
+            outfile.seek(0)
+            outfile.write(header_and_vlrs)
 
-            # Re-write the point data and any original EVLRs after the new VLRs
-            # (if the length of the VLRs changed, this data is re-positioned
-            # in the new file directly after the VLRs)
-            outfile.write(original_point_data_onward)
+            outfile.seek(end_of_data)
 
             # Get the las version as a float value
             las_version = _las_version_float(self)
@@ -2464,15 +2632,6 @@ class LasAttr:
             # that are remnants from the original file.
             outfile.truncate()
 
-            # FOR TESTING ONLY - print the new file size
-            # outfile.seek(0)
-            # print(f"Length of newly overwritten file: {len(outfile.read())}")
-
-            # FOR TESTING ONLY - time how long it takes to write a file
-            # end_write = datetime.now()
-            # write_time = end_write - start_write
-            # print(f"Time to write file: {write_time}")
-
 
 # ------------------------------------------------------------------------------
 # CHECK THE GLOBAL VARIABLES IN THIS MODULE ARE OKAY
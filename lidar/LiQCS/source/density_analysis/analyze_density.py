@@ -4,6 +4,9 @@
 # Public imports
 import os
 import pickle
+import hashlib
+import concurrent.futures
+from functools import partial
 import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
@@ -25,15 +28,22 @@ try:
     # liqcs_gui.py
     import density_analysis.density_analysis_config as density_analysis_config
     import density_analysis.density_analysis_report as density_analysis_report
+    from density_analysis.density_statistics import DensityStatistics
 except Exception:
     # Use this version of importing (in the except clause) when running from
     # density_analysis subfolder scripts (e.g., density_analysis_main.py)
     import density_analysis_config
     import density_analysis_report
+    from density_statistics import DensityStatistics
 
 verbose1 = True
 verbose2 = False
 
+# Longest side, in cells, of the classified raster overview on the report.
+# Larger rasters are decimated (nearest cell) to this size before being plotted;
+# the overview is only a few inches wide on the report page.
+classified_raster_preview_max_cells = 1000
+
 
 # ------------------------------------------------------------------------------
 # Functions relating to test conditions...
@@ -364,10 +374,95 @@ def classify_rasterio_array(class_obj, classification_array, colourmap_list):
     return classification_array, colourmap_list
 
 
+def classified_raster_preview(density_array):
+    """
+    Decimate a density array (nearest cell) so its longest side is
+    at most classified_raster_preview_max_cells.
+
+    Args:
+        density_array (array):
+            - Array that follows rasterio shape conventions.
+                (band_value(s), x, y)
+
+    Returns:
+        (array):
+            - The decimated array (a view of density_array),
+                or density_array if it's small enough already.
+    """
+    step = math.ceil(max(density_array.shape[-2:]) / classified_raster_preview_max_cells)
+    if step <= 1:
+        return density_array
+    return density_array[..., ::step, ::step]
+
+
 def plot_classified_raster(
     density_array,
     minimum_density_requirement,
     very_low_density_threshold
+):
+    """
+    Plot the classified raster overview (see classified_raster_svg()).
+
+    Returns:
+        classified_raster_rlg (ReportLab Graphic object):
+            - Classified raster plot as an RLG Python object (vector graphic),
+                ready to be added to a ReportLab pdf.
+    """
+    return _svg_to_reportlab_graphic(
+        classified_raster_svg(
+            density_array,
+            minimum_density_requirement,
+            very_low_density_threshold
+        )
+    )
+
+
+def classified_raster_svg(
+    density_array,
+    minimum_density_requirement,
+    very_low_density_threshold,
+    figure_cache=None
+):
+    """
+    Render the classified raster overview of a downsampled preview
+    of the density array, or read it from the figure cache if it
+    has been rendered before from the same inputs.
+
+    Args:
+        density_array (array):
+            - Array that follows rasterio shape conventions.
+                (band_value(s), x, y)
+        minimum_density_requirement (int or float):
+            - Minimum density requirement in pts/m².
+        very_low_density_threshold (int or float):
+            - The density below which density is considered very low.
+        figure_cache (FigureCache) (Optional, default None):
+            - Cache of the rendered figures (default: don't cache).
+
+    Returns:
+        (bytes):
+            - The classified raster plot in SVG format.
+    """
+    preview_array = classified_raster_preview(density_array)
+    return _cached_svg(
+        figure_cache,
+        _figure_cache_key(
+            "classified_raster",
+            preview_array,
+            minimum_density_requirement,
+            very_low_density_threshold
+        ),
+        _render_classified_raster_svg,
+        preview_array,
+        minimum_density_requirement,
+        very_low_density_threshold
+    )
+
+
+def _render_classified_raster_svg(
+    density_array,
+    minimum_density_requirement,
+    very_low_density_threshold
 ):
     """
     Generate a map-like image (plot -- not really a map, because
@@ -391,9 +486,8 @@ def plot_classified_raster(
                 whether due to poor masking or some other reason.
 
     Returns:
-        classified_raster_rlg (ReportLab Graphic object):
-            - Classified raster plot as an RLG Python object (vector graphic),
-                ready to be added to a ReportLab pdf.
+        (bytes):
+            - Classified raster plot in SVG format (vector graphic).
     """
     # Initialize colourmap list
     # Populate this list only with colours that have raster cells that
@@ -488,12 +582,15 @@ def plot_classified_raster(
     # where they fit. All these challenges avoided by keeping the axes 'off'.
     ax.axis('off')
 
-    # Save the figure as a reportlab graphics (RLG) object,
-    # which is a vector graphic, and looks much crisper than
-    # a .png file, which appears pixelated on the report.
-    classified_raster_rlg = _matplotlib_fig_to_reportlab_graphic(fig)
+    # Save the figure as an SVG, which is a vector graphic,
+    # and looks much crisper than a .png file,
+    # which appears pixelated on the report.
+    classified_raster_svg_ = _matplotlib_fig_to_svg(fig)
+
+    # Close the figure to avoid using too much memory
+    plt.close(fig)
 
-    return classified_raster_rlg
+    return classified_raster_svg_
 
 
 # ------------------------------------------------------------------------------
@@ -506,15 +603,20 @@ def calculate_statistics(
     minimum_density_requirement,
     very_low_density_threshold,
     density_raster_path=None,
-    i=None
+    i=None,
+    density_statistics=None,
+    verbose=True
 ):
     """
     Compute a variety of descriptive statistics for an array
     of density values.
 
     Args:
-        density_array (array):
-            - Array of density values (any shape).
+        density_array (array or DensityStatistics):
+            - Array of density values (any shape), or the
+                accumulated statistics of many arrays (e.g., the
+                combined rasters), in which case the median is
+                estimated from the accumulated histogram.
         num_rasters_to_analyze (int):
             - The total number of density rasters being analyzed.
         minimum_density_requirement (int or float):
@@ -524,6 +626,14 @@ def calculate_statistics(
             - Path to original input raster.
             - Defaults to None.
         i (int, optional): _description_. Defaults to None.
+        density_statistics (DensityStatistics, optional):
+            - Statistics of density_array, if already accumulated.
+            - Defaults to None.
+        verbose (bool, optional):
+            - Print the statistics (see print_statistics()).
+                Worker processes leave this to the main process,
+                so rasters are printed in order.
+            - Defaults to True.
 
     Returns:
         calculation_results_dict (dict):
@@ -538,26 +648,28 @@ def calculate_statistics(
                     3 (dict) (optional): Dictionary of range of acceptable
                         values for statistic.
     """
-    # ! temporary for testing
-    # print(density_array)
-    # density_array = density_array[::10000]
-    # print(density_array)
-
-    # Assess number of cells with no data
-    num_raster_cells = np.size(density_array)
-    num_nan_cells = np.count_nonzero(np.isnan(density_array))
-    num_raster_cells_with_values = num_raster_cells - num_nan_cells
-    num_non_zero_values = np.count_nonzero(density_array) - num_nan_cells
-    num_zero_values = num_raster_cells_with_values - num_non_zero_values
-    try:
-        percent_zeroes = num_zero_values / num_raster_cells_with_values * 100
-    except ZeroDivisionError:
-        percent_zeroes = np.nan
+    if isinstance(density_array, DensityStatistics):
+        density_statistics = density_array
+        median_density = density_statistics.median()
+    else:
+        if density_statistics is None:
+            density_statistics = DensityStatistics.from_array(
+                density_array,
+                minimum_density_requirement,
+                very_low_density_threshold
+            )
+        median_density = np.nanmedian(density_array)
+
+    mean_density = density_statistics.mean_density()
+    standard_deviation_density = density_statistics.standard_deviation()
+
+    # Assess number of cells with values
+    # (cells with no data and zeroes are printed by print_statistics())
+    num_raster_cells_with_values = density_statistics.count
+    num_zero_values = density_statistics.num_zero
 
     # Minimum points per square metre requirement
-    num_cells_above_min_density = np.count_nonzero(
-        density_array >= minimum_density_requirement
-    )
+    num_cells_above_min_density = density_statistics.num_above_min
     try:
         percent_cells_above_min_density = (
             num_cells_above_min_density / num_raster_cells_with_values * 100
@@ -571,7 +683,7 @@ def calculate_statistics(
 
     # Cells below very low density threshold
     num_cells_very_low_density = (
-        np.count_nonzero(density_array < very_low_density_threshold)
+        density_statistics.num_below_very_low
         + num_zero_values
     )
     try:
@@ -600,45 +712,6 @@ def calculate_statistics(
         percent_pass_if_very_low_excluded = np.nan
         percent_fail_if_very_low_excluded = np.nan
 
-    # Print out some statistics
-    if verbose1:
-        print(density_analysis_config.dashline())
-        if density_raster_path:
-            print(
-                f"Raster {i + 1} of {num_rasters_to_analyze}: "
-                f"{os.path.basename(density_raster_path)}"
-                # f"\n\nShape of raster (cell values, x, y): {density_array.shape}"
-            )
-        else:
-            print(
-                f"Combined results for {num_rasters_to_analyze} rasters:"
-                f"\n"
-            )
-    if verbose2:
-        print(
-            f"Median: {np.nanmedian(density_array)} pts/m²"
-            f"\nMean: {round(np.nanmean(density_array), 1)} pts/m²"
-            f"\nStandard deviation: {round(np.nanstd(density_array), 1)} pts/m²"
-            f"\nNumber of cells in raster with values: {num_raster_cells_with_values}"
-            f"\nNumber of cells in raster with NaN values: {num_nan_cells}"
-            f"\nNumber of cells with non-zero values: {num_non_zero_values}"
-            f"\nNumber of cells wtih zero values: {num_zero_values}"
-            f"\nPercent of cells with zero density (no lidar points): "
-            f"{round(percent_zeroes, 1)} %"
-            f"\nNumber of cells with density between 0 and {very_low_density_threshold}: "
-            f"{num_cells_very_low_density}"
-            f"\nPercent of cells with density between 0 and {very_low_density_threshold}: "
-            f"{percent_very_low_density}"
-            f"\nPercent of cells that meet minimum density requirement "
-            f"(≥ {minimum_density_requirement} pts/m²): "
-            f"{round(percent_cells_above_min_density, 1)} %"
-            f"\nPercent pass if very low densities excluded: "
-            f"{round(percent_pass_if_very_low_excluded, 1)} %"
-            f"\nPercent fail if very low densities excluded: "
-            f"{round(percent_fail_if_very_low_excluded, 1)} %",
-            flush=True
-        )
-
     # Generate the calculation results dictionary.
     # Format:
     #   key (str):
@@ -658,10 +731,8 @@ def calculate_statistics(
     calculation_results_dict.update(
         {
             "Cells used in analysis": (num_raster_cells_with_values, 0, ""),
-            # "Null cells (masked, etc.)": (num_nan_cells, 0, ""),
-            # "Cells with non-zero values": (num_non_zero_values, 0, ""),
+            # "Null cells (masked, etc.)": (density_statistics.num_nan, 0, ""),
             # "Cells where density is zero": (num_zero_values, 0, ""),
-            # "Percent cells with zeroes": (percent_zeroes, 1, "%"),
             f"Cells where density is 0 to {very_low_density_threshold} pts/m²": (
                 num_cells_very_low_density,
                 0,
@@ -678,7 +749,7 @@ def calculate_statistics(
                 }
             ),
             median_density_key(): (
-                np.nanmedian(density_array),
+                median_density,
                 1,
                 "pts/m²",
                 {
@@ -689,7 +760,7 @@ def calculate_statistics(
                 }
             ),
             mean_density_key(): (
-                np.nanmean(density_array),
+                mean_density,
                 1,
                 "pts/m²",
                 {
@@ -700,7 +771,7 @@ def calculate_statistics(
                 }
             ),
             standard_deviation_key(): (
-                np.nanstd(density_array),
+                standard_deviation_density,
                 1,
                 "pts/m²",
                 {
@@ -756,15 +827,72 @@ def calculate_statistics(
         }
     )
 
+    if verbose:
+        print_statistics(
+            calculation_results_dict,
+            density_statistics,
+            num_rasters_to_analyze,
+            density_raster_path,
+            i
+        )
+
     return calculation_results_dict
 
 
-def _matplotlib_fig_to_reportlab_graphic(fig):
+def print_statistics(
+    calculation_results_dict,
+    density_statistics,
+    num_rasters_to_analyze,
+    density_raster_path=None,
+    i=None
+):
     """
-    Convert a matplotlib Figure to a
-    reportlab graphic (RLG) object.
+    Print which raster (or the combined results) the statistics are for,
+    and (if verbose2) the statistics themselves.
 
-    RLG graphics are vectors, which look crisper
+    Args:
+        calculation_results_dict (dict):
+            - Calculation results, from calculate_statistics().
+        density_statistics (DensityStatistics):
+            - Statistics the calculation results were computed from.
+        num_rasters_to_analyze (int):
+            - The total number of density rasters being analyzed.
+        density_raster_path (str, optional):
+            - Path to original input raster (None for the combined results).
+            - Defaults to None.
+        i (int, optional):
+            - Index of the raster.
+            - Defaults to None.
+    """
+    if verbose1:
+        print(density_analysis_config.dashline())
+        if density_raster_path:
+            print(
+                f"Raster {i + 1} of {num_rasters_to_analyze}: "
+                f"{os.path.basename(density_raster_path)}"
+            )
+        else:
+            print(
+                f"Combined results for {num_rasters_to_analyze} rasters:"
+                f"\n"
+            )
+    if verbose2:
+        print(
+            f"Number of cells in raster with NaN values: {density_statistics.num_nan}"
+            f"\nNumber of cells with zero values: {density_statistics.num_zero}\n"
+            + "\n".join(
+                f"{key}: {round(value[0], value[1])} {value[2]}".rstrip()
+                for key, value in calculation_results_dict.items()
+            ),
+            flush=True
+        )
+
+
+def _matplotlib_fig_to_svg(fig):
+    """
+    Save a matplotlib Figure in scalable vector graphics (SVG) format.
+
+    SVG graphics are vectors, which look crisper
     than pixelated raster (.png) graphics.
 
     Args:
@@ -774,8 +902,8 @@ def _matplotlib_fig_to_reportlab_graphic(fig):
                 ready for publishing.
 
     Returns:
-        fig_rlg (reportlab graphics (RLG) object):
-            - The plot as an RLG object.
+        (bytes):
+            - The plot in SVG format.
     """
     # Initialize bytes object
     fig_svg = BytesIO()
@@ -790,20 +918,233 @@ def _matplotlib_fig_to_reportlab_graphic(fig):
     # in scalable vector graphics (SVG) format.
     fig.savefig(fig_svg, format="SVG")
 
-    # Rewind pointer to beginning of the bytes object
-    fig_svg.seek(0)
+    return fig_svg.getvalue()
+
+
+def _svg_to_reportlab_graphic(fig_svg):
+    """
+    Convert an SVG figure to a
+    reportlab graphic (RLG) object,
+    so we can put it in a pdf using reportlab.
+
+    We'll scale the object to the desired size later,
+    just before drawing it on the reportlab canvas.
+
+    Args:
+        fig_svg (bytes):
+            - The plot in SVG format.
+
+    Returns:
+        fig_rlg (reportlab graphics (RLG) object):
+            - The plot as an RLG object.
+    """
+    return svg2rlg(BytesIO(fig_svg))
+
+
+# ------------------------------------------------------------------------------
+# Rendered figure cache
+# (see density_analysis_config.figure_cache_dir())
+# ------------------------------------------------------------------------------
+
+def _figure_cache_key(figure_name, density_array, *figure_args):
+    """
+    Hash the inputs of a figure, to name it in the figure cache.
+
+    Args:
+        figure_name (str):
+            - Name of the kind of figure (e.g., "histogram").
+        density_array (numpy array):
+            - The array of values plotted in the figure.
+        *figure_args:
+            - Every other input of the figure (anything with a stable repr()).
+
+    Returns:
+        (str):
+            - Hex digest of the figure's inputs.
+    """
+    key = hashlib.sha256()
+    key.update(
+        repr(
+            (
+                figure_name,
+                matplotlib.__version__,
+                density_array.shape,
+                density_array.dtype.str,
+                figure_args
+            )
+        ).encode()
+    )
+    key.update(np.ascontiguousarray(density_array))
+    return key.hexdigest()
+
+
+class FigureCache():
+    def __init__(self, cache_dir):
+        """
+        Rendered figures (SVG files) in the figure cache folder,
+        and the figures used by the current report.
+
+        Figures are looked up by cache key, so only the keys used by the
+        report are recorded (worker processes return the keys they used,
+        see _raster_report_figures), and prune() deletes every other figure.
+
+        Args:
+            cache_dir (str):
+                - Path to the figure cache folder.
+        """
+        self.cache_dir = cache_dir
+        self.used_keys = set()
+
+    def svg(self, cache_key, render_svg, *render_args):
+        """
+        Read a figure from the cache, or render it
+        with render_svg(*render_args) and add it to the cache.
+
+        Args:
+            cache_key (str):
+                - Hash of the figure's inputs, from _figure_cache_key().
+            render_svg (function):
+                - Function rendering the figure in SVG format (bytes).
+            *render_args:
+                - Arguments of render_svg.
+
+        Returns:
+            (bytes):
+                - The figure in SVG format.
+        """
+        self.used_keys.add(cache_key)
+
+        cache_path = os.path.join(self.cache_dir, f"{cache_key}.svg")
+        if os.path.isfile(cache_path):
+            with open(cache_path, "rb") as cached_svg:
+                return cached_svg.read()
+
+        fig_svg = render_svg(*render_args)
+
+        # Write to a temporary file first, so a partly written figure
+        # is never read by another process
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as temp_svg:
+            temp_svg.write(fig_svg)
+        os.replace(temp_path, cache_path)
+
+        return fig_svg
+
+    def prune(self):
+        """
+        Delete the files in the cache folder that aren't figures used by
+        the current report (including temporary files left behind by an
+        interrupted report), so the cache only holds one report's figures.
+        """
+        used_filenames = {f"{cache_key}.svg" for cache_key in self.used_keys}
+        for cache_filename in os.listdir(self.cache_dir):
+            if cache_filename not in used_filenames:
+                os.remove(os.path.join(self.cache_dir, cache_filename))
+
 
-    # Convert the SVG object to a
-    # reportlab graphics (RLG) object,
-    # so we can put it in a pdf using reportlab.
-    # We'll scale the object to the desired size later,
-    # just before drawing it on the reportlab canvas.
-    fig_rlg = svg2rlg(fig_svg)
+def _cached_svg(figure_cache, cache_key, render_svg, *render_args):
+    """
+    Read a figure from the figure cache (see FigureCache.svg()),
+    or render it if there is no cache.
 
-    return fig_rlg
+    Returns:
+        (bytes):
+            - The figure in SVG format.
+    """
+    if figure_cache is None:
+        return render_svg(*render_args)
+
+    return figure_cache.svg(cache_key, render_svg, *render_args)
 
 
 def make_histogram(
+    density_array,
+    calculation_results_dict,
+    histogram_title,
+    minimum_density_requirement,
+    very_low_density_threshold,
+    num_rasters_to_analyze=None,
+    figure_cache=None
+):
+    """
+    Generate a histogram of density values (see histogram_svg()),
+    ready to be added to a reportlab pdf as a vector graphic.
+
+    Returns:
+        histogram_rlg (reportlab graphics (RLG) object):
+            - Vector graphic version of the histogram,
+                ready to be added to a reportlab pdf.
+    """
+    with yaspin(
+        text="Counting frequencies to create histogram...",
+        color='green',
+        timer=True
+    ):
+        histogram_rlg = _svg_to_reportlab_graphic(
+            histogram_svg(
+                density_array,
+                calculation_results_dict,
+                histogram_title,
+                minimum_density_requirement,
+                very_low_density_threshold,
+                num_rasters_to_analyze,
+                figure_cache
+            )
+        )
+
+    return histogram_rlg
+
+
+def histogram_svg(
+    density_array,
+    calculation_results_dict,
+    histogram_title,
+    minimum_density_requirement,
+    very_low_density_threshold,
+    num_rasters_to_analyze=None,
+    figure_cache=None
+):
+    """
+    Render a histogram of density values, or read it from the figure
+    cache if it has been rendered before from the same inputs.
+
+    Args: see _render_histogram_svg(), and
+        figure_cache (FigureCache) (Optional, default None):
+            - Cache of the rendered figures (default: don't cache).
+
+    Returns:
+        (bytes):
+            - The histogram in SVG format.
+    """
+    if isinstance(density_array, DensityStatistics):
+        # The combined results' histogram is all that's plotted
+        plotted_array = density_array.histogram
+    else:
+        plotted_array = density_array
+
+    return _cached_svg(
+        figure_cache,
+        _figure_cache_key(
+            "histogram",
+            plotted_array,
+            isinstance(density_array, DensityStatistics),
+            calculation_results_dict,
+            histogram_title,
+            minimum_density_requirement,
+            very_low_density_threshold,
+            num_rasters_to_analyze
+        ),
+        _render_histogram_svg,
+        density_array,
+        calculation_results_dict,
+        histogram_title,
+        minimum_density_requirement,
+        very_low_density_threshold,
+        num_rasters_to_analyze
+    )
+
+
+def _render_histogram_svg(
     density_array,
     calculation_results_dict,
     histogram_title,
@@ -817,8 +1158,9 @@ def make_histogram(
     ready to be added to a reportlab pdf as a vector graphic.
 
     Args:
-        density_array (numpy array):
-            - Array of density values.
+        density_array (numpy array or DensityStatistics):
+            - Array of density values, or the accumulated
+                statistics of the combined rasters.
         calculation_results_dict (dict):
             - Dictionary of calculation results:
                 keys (str):
@@ -839,9 +1181,8 @@ def make_histogram(
             - The total number of density rasters being analyzed.
 
         Returns:
-            histogram_rlg (reportlab graphics (RLG) object):
-                - Vector graphic version of the histogram,
-                    ready to be added to a reportlab pdf.
+            (bytes):
+                - The histogram in SVG format (vector graphic).
     """
     # Parse out relevant values from the calculation results
     # to be used in histogram annotation
@@ -855,191 +1196,181 @@ def make_histogram(
     # Determine if the density array represents one raster,
     # or multiple rasters combined.
     # Method:
-    #   If the density array is the combined array, it has
-    #   been flattened to have a shape of (num_values, ).
-    #   The shape of the combined array is a tuple
-    #   of length 1: (num_values, )
-    #   In contrast, the individual raster arrays have
-    #   dimensions (1, num_cells_x_direction, num_cells_y_direction),
-    #   according to the rasterio conventions by which they
-    #   were generated.
-    #   The shape of the individual raster arrays are tuples
-    #   of length 3: (1, num_cells_x_direction, num_cells_y_direction).
-    #   So, we know if the length of the shape of the density array
-    #   is 1, then the result is for multiple rasters combined.
-    if len(np.shape(density_array)) == 1:
+    #   The combined results are accumulated statistics (DensityStatistics),
+    #   with a histogram of the combined values rather than the values.
+    #   The individual raster arrays are arrays of values.
+    if isinstance(density_array, DensityStatistics):
         combined_results = True
+        hist_values, hist_weights = density_array.histogram_values()
     else:
         combined_results = False
+        hist_values = density_array[~np.isnan(density_array)]  # Ignore nan values
+        hist_weights = None
 
-    with yaspin(
-        text="Counting frequencies to create histogram...",
-        color='green',
-        timer=True
-    ):
-        # Set histogram colours
-        hist_colour_below_min = (
-            density_analysis_report.ReportColours.colour_regular_below_min
-        )
-        hist_colour_above_min = (
-            density_analysis_report.ReportColours.colour_regular_above_min
-        )
-        min_density_line_colour = (
-            density_analysis_report.ReportColours.colour_regular_minimum_density_histogram_line
-        )
-        hist_colour_very_low_density = (
-            density_analysis_report.ReportColours.colour_very_low_density
-        )
+    # Set histogram colours
+    hist_colour_below_min = (
+        density_analysis_report.ReportColours.colour_regular_below_min
+    )
+    hist_colour_above_min = (
+        density_analysis_report.ReportColours.colour_regular_above_min
+    )
+    min_density_line_colour = (
+        density_analysis_report.ReportColours.colour_regular_minimum_density_histogram_line
+    )
+    hist_colour_very_low_density = (
+        density_analysis_report.ReportColours.colour_very_low_density
+    )
 
-        # Set the maximum x-value to show in the histogram.
-        # Values above this threshold will still be represented
-        # in statistics, but not shown in the histogram.
-        # max_density_to_show_in_hist = 50
-        try:
-            # Set the max density to show in histogram to be
-            # the median plus 3x the standard deviation (~3 sigma)
-            # This try will fail for cases where the median or standard
-            # deviation is np.nan, which means we've got more problems than
-            # just the histogram...  (e.g. sample file Density_Grid.tif)
-            max_density_to_show_in_hist = math.ceil(
-                calculation_results_dict[median_density_key()][0]
-                + calculation_results_dict[standard_deviation_key()][0] * 3
-            )
-        except Exception:
-            max_density_to_show_in_hist = 50
-
-        # Create the matplotlib Figure and Axes objects
-        # More info about using the matplotlib API,
-        # rather than the plotly command technique.
-        # (i.e., working with the Figure and Axes objects, rather
-        # than just calling plotly methods. Working with
-        # the Figure and Axes objects provides more formatting
-        # options than the limited plotly methods.)
-        # https://matplotlib.org/stable/api/index.html
-        fig, ax = plt.subplots()
-
-        # Create the histogram in the Axes object
-        n, bins, patches = ax.hist(
-            density_array[~np.isnan(density_array)],  # Ignore nan values
-            range(0, max_density_to_show_in_hist),  # Range of bins to show in histogram
-            density=True,  # Normalize y-axis
-            histtype='barstacked',  # Stack values from each row of raster in same bars
+    # Set the maximum x-value to show in the histogram.
+    # Values above this threshold will still be represented
+    # in statistics, but not shown in the histogram.
+    # max_density_to_show_in_hist = 50
+    try:
+        # Set the max density to show in histogram to be
+        # the median plus 3x the standard deviation (~3 sigma)
+        # This try will fail for cases where the median or standard
+        # deviation is np.nan, which means we've got more problems than
+        # just the histogram...  (e.g. sample file Density_Grid.tif)
+        max_density_to_show_in_hist = math.ceil(
+            calculation_results_dict[median_density_key()][0]
+            + calculation_results_dict[standard_deviation_key()][0] * 3
         )
+    except Exception:
+        max_density_to_show_in_hist = 50
+
+    # Create the matplotlib Figure and Axes objects
+    # More info about using the matplotlib API,
+    # rather than the plotly command technique.
+    # (i.e., working with the Figure and Axes objects, rather
+    # than just calling plotly methods. Working with
+    # the Figure and Axes objects provides more formatting
+    # options than the limited plotly methods.)
+    # https://matplotlib.org/stable/api/index.html
+    fig, ax = plt.subplots()
 
-        # Plot a gold vertical line at the minimum density value
-        ax.vlines(
-            minimum_density_requirement,
-            0,  # Line starts at x-axis
-            n.max() + 0.1,  # Make the line extend above the histogram values
-            color=min_density_line_colour  # Gold
-        )
+    # Create the histogram in the Axes object
+    n, bins, patches = ax.hist(
+        hist_values,
+        range(0, max_density_to_show_in_hist),  # Range of bins to show in histogram
+        weights=hist_weights,  # Counts of the combined results' histogram bins
+        density=True,  # Normalize y-axis
+        histtype='barstacked',  # Stack values from each row of raster in same bars
+    )
 
-        # Colour the bars below the minimum density red, bars above green
-        for patch in patches:
-            if patch.get_x() < very_low_density_threshold:
-                patch.set_facecolor(hist_colour_very_low_density)
-            elif (
-                patch.get_x() < minimum_density_requirement
-                and patch.get_x() >= very_low_density_threshold
-            ):
-                patch.set_facecolor(hist_colour_below_min)  # Red
-            else:
-                patch.set_facecolor(hist_colour_above_min)  # Green
-
-        # Add some annotation to label the minimum density requirement
-        # (could use a legend item instead, but I like this better...
-        # TODO ...unless this looks too goofy with non-8 minimum density
-        # requirements... consider changing to fit all minimum density
-        # scenarios)
-        ax.annotate(
-            f"Minimum density requirement: {minimum_density_requirement} pts/m²",
-            (minimum_density_requirement + 1, n.max() + 0.05),
-            font=_matplotlib_bold_font(),
-            weight='bold',
-            color=min_density_line_colour,  # Gold
-        )
+    # Plot a gold vertical line at the minimum density value
+    ax.vlines(
+        minimum_density_requirement,
+        0,  # Line starts at x-axis
+        n.max() + 0.1,  # Make the line extend above the histogram values
+        color=min_density_line_colour  # Gold
+    )
 
-        # Add some annotation for the percent of raster cells
-        # above the minimum density requirement
-        percent_pass_formatted = density_analysis_report.format_statistic_value(
-            percent_cells_above_min_density
-        )
-        ax.annotate(
-            f"Pass: {percent_pass_formatted}",
-            # Placement of this annotation:
-            (
-                (max_density_to_show_in_hist + 3 * minimum_density_requirement) / 4,
-                n.max() + 0.02
-            ),
-            font=_matplotlib_regular_font(),
-            color=hist_colour_above_min
-        )
+    # Colour the bars below the minimum density red, bars above green
+    for patch in patches:
+        if patch.get_x() < very_low_density_threshold:
+            patch.set_facecolor(hist_colour_very_low_density)
+        elif (
+            patch.get_x() < minimum_density_requirement
+            and patch.get_x() >= very_low_density_threshold
+        ):
+            patch.set_facecolor(hist_colour_below_min)  # Red
+        else:
+            patch.set_facecolor(hist_colour_above_min)  # Green
+
+    # Add some annotation to label the minimum density requirement
+    # (could use a legend item instead, but I like this better...
+    # TODO ...unless this looks too goofy with non-8 minimum density
+    # requirements... consider changing to fit all minimum density
+    # scenarios)
+    ax.annotate(
+        f"Minimum density requirement: {minimum_density_requirement} pts/m²",
+        (minimum_density_requirement + 1, n.max() + 0.05),
+        font=_matplotlib_bold_font(),
+        weight='bold',
+        color=min_density_line_colour,  # Gold
+    )
 
-        # Add some annotation for the percent of raster cells
-        # below the minimum density requirement
-        percent_fail_formatted = density_analysis_report.format_statistic_value(
-            percent_cells_below_min_density
-        )
-        ax.annotate(
-            f"Fail: {percent_fail_formatted}",
-            # Placement of this annotation:
-            (
-                0,  # minimum_density_requirement / 8,
-                n.max() + 0.02
-            ),
-            font=_matplotlib_regular_font(),
-            color=hist_colour_below_min  # Red
-        )
+    # Add some annotation for the percent of raster cells
+    # above the minimum density requirement
+    percent_pass_formatted = density_analysis_report.format_statistic_value(
+        percent_cells_above_min_density
+    )
+    ax.annotate(
+        f"Pass: {percent_pass_formatted}",
+        # Placement of this annotation:
+        (
+            (max_density_to_show_in_hist + 3 * minimum_density_requirement) / 4,
+            n.max() + 0.02
+        ),
+        font=_matplotlib_regular_font(),
+        color=hist_colour_above_min
+    )
 
-        # Add some annotation letting us know the histogram is
-        # cut off at a certain x-value.
-        ax.text(
-            1,  # x position
-            -0.2,  # y position
-            f"Densities above {max_density_to_show_in_hist} pts/m² "
-            "\nnot shown on histogram.",
-            ha='right',
-            fontsize=8,
-            font=_matplotlib_regular_font(),
-            # Set units of x and y positions to be normalized to max axis value
-            # (default transform is axis units, which can change depending on inputs)
-            transform=ax.transAxes
-        )
+    # Add some annotation for the percent of raster cells
+    # below the minimum density requirement
+    percent_fail_formatted = density_analysis_report.format_statistic_value(
+        percent_cells_below_min_density
+    )
+    ax.annotate(
+        f"Fail: {percent_fail_formatted}",
+        # Placement of this annotation:
+        (
+            0,  # minimum_density_requirement / 8,
+            n.max() + 0.02
+        ),
+        font=_matplotlib_regular_font(),
+        color=hist_colour_below_min  # Red
+    )
 
-        # Add titles and labels to histogram
-        if combined_results:
-            optional_plural_s = "s"
-        else:
-            optional_plural_s = ""
-        fig.suptitle(
-            f"Frequency of Density Values for Masked Lidar Density Raster{optional_plural_s}",
-            font=_matplotlib_bold_font(),
-            fontweight="bold"
-        )
-        ax.set_title(
-            f"{histogram_title}",
-            fontsize=10,
-            font=_matplotlib_regular_font()
-        )
-        ax.set_xlabel(
-            "Density [points per square metre]",
-            font=_matplotlib_regular_font()
-        )
-        ax.set_ylabel(
-            f"Frequency of density in masked raster{optional_plural_s}",
-            font=_matplotlib_regular_font()
-        )
+    # Add some annotation letting us know the histogram is
+    # cut off at a certain x-value.
+    ax.text(
+        1,  # x position
+        -0.2,  # y position
+        f"Densities above {max_density_to_show_in_hist} pts/m² "
+        "\nnot shown on histogram.",
+        ha='right',
+        fontsize=8,
+        font=_matplotlib_regular_font(),
+        # Set units of x and y positions to be normalized to max axis value
+        # (default transform is axis units, which can change depending on inputs)
+        transform=ax.transAxes
+    )
 
-        # Change the y-axis to show percents instead of fractions of 1
-        fig.gca().yaxis.set_major_formatter(PercentFormatter(1, decimals=0))
+    # Add titles and labels to histogram
+    if combined_results:
+        optional_plural_s = "s"
+    else:
+        optional_plural_s = ""
+    fig.suptitle(
+        f"Frequency of Density Values for Masked Lidar Density Raster{optional_plural_s}",
+        font=_matplotlib_bold_font(),
+        fontweight="bold"
+    )
+    ax.set_title(
+        f"{histogram_title}",
+        fontsize=10,
+        font=_matplotlib_regular_font()
+    )
+    ax.set_xlabel(
+        "Density [points per square metre]",
+        font=_matplotlib_regular_font()
+    )
+    ax.set_ylabel(
+        f"Frequency of density in masked raster{optional_plural_s}",
+        font=_matplotlib_regular_font()
+    )
 
-        # Save the figure as a reportlab graphics (RLG) object
-        histogram_rlg = _matplotlib_fig_to_reportlab_graphic(fig)
+    # Change the y-axis to show percents instead of fractions of 1
+    fig.gca().yaxis.set_major_formatter(PercentFormatter(1, decimals=0))
 
-        # Close the figure to avoid using too much memeory
-        plt.close(fig)
+    # Save the figure as an SVG
+    histogram_svg_ = _matplotlib_fig_to_svg(fig)
 
-    return histogram_rlg
+    # Close the figure to avoid using too much memeory
+    plt.close(fig)
+
+    return histogram_svg_
 
 
 # ------------------------------------------------------------------------------
@@ -1047,16 +1378,119 @@ def make_histogram(
 # Called by __main__ or main.py.
 # ------------------------------------------------------------------------------
 
+def _init_report_worker():
+    """
+    Set up a worker process of analyze_density_values.
+    """
+    # Render with the (non-interactive) svg backend,
+    # never a GUI backend, in the worker processes
+    matplotlib.use("svg")
+    filter_all_nan_slice_warning()
+
+
+def _raster_report_figures(
+    minimum_density_requirement,
+    very_low_density_threshold,
+    num_rasters_to_analyze,
+    figure_cache_dir,
+    i_and_density_value
+):
+    """
+    Compute the statistics and render the figures for the
+    report page of one raster. Runs in a worker process of
+    analyze_density_values.
+
+    Args:
+        minimum_density_requirement (int or float):
+            - Minimum density requirement in pts/m².
+        very_low_density_threshold (int or float):
+            - The density below which density is considered very low.
+        num_rasters_to_analyze (int):
+            - The total number of density rasters being analyzed.
+        figure_cache_dir (str):
+            - Path to the figure cache folder.
+        i_and_density_value (tuple):
+            - Index of the raster, and its (path, array, data type)
+                tuple from the density_values list.
+
+    Returns:
+        (tuple):
+            0 (DensityStatistics): Statistics of the raster.
+            1 (dict): Calculation results, or None if the raster is all nan.
+            2 (bytes): Classified raster plot (SVG), or None if all nan.
+            3 (bytes): Histogram (SVG), or None if all nan.
+            4 (set): Keys of the cached figures used (see FigureCache).
+    """
+    i, (density_raster_path, density_array, _) = i_and_density_value
+    figure_cache = FigureCache(figure_cache_dir)
+
+    raster_statistics = DensityStatistics.from_array(
+        density_array,
+        minimum_density_requirement,
+        very_low_density_threshold
+    )
+
+    # Check if the density array only contains nan values
+    if not raster_statistics.count:
+        return raster_statistics, None, None, None, figure_cache.used_keys
+
+    # Plot raster i classified by whether it meets
+    # the minimum density requirement
+    classified_raster_svg_ = classified_raster_svg(
+        density_array,
+        minimum_density_requirement,
+        very_low_density_threshold,
+        figure_cache
+    )
+
+    # Make some calculations on raster i
+    calculation_results_dict = calculate_statistics(
+        density_array,
+        num_rasters_to_analyze,
+        minimum_density_requirement,
+        very_low_density_threshold,
+        density_raster_path,
+        i,
+        density_statistics=raster_statistics,
+        # Printed by analyze_density_values, in order
+        verbose=False
+    )
+
+    # Make histogram for raster i
+    histogram_svg_ = histogram_svg(
+        density_array,
+        calculation_results_dict,
+        os.path.basename(density_raster_path),  # Histogram title
+        minimum_density_requirement,
+        very_low_density_threshold,
+        num_rasters_to_analyze=num_rasters_to_analyze,
+        figure_cache=figure_cache
+    )
+
+    return (
+        raster_statistics,
+        calculation_results_dict,
+        classified_raster_svg_,
+        histogram_svg_,
+        figure_cache.used_keys
+    )
+
+
 def analyze_density_values(
     density_values,
     output_dir,
-    minimum_density_requirement
+    minimum_density_requirement,
+    workers=None
 ):
     """
     Analyze the values of raster densities
     for various descriptive statistics, and
     save the results in a pdf report.
 
+    The statistics and figures of each raster are computed in a
+    process pool, and each raster's report page is written as soon
+    as its figures are ready, in order.
+
     Args:
         density_values (list of tuples, [(str, array), (str, array), ...]:
             Tuple elements:
@@ -1070,6 +1504,8 @@ def analyze_density_values(
         minimum_density_requirement (int or float):
             - Minimum density requirement for raster cells that
                 report will show as cutoff for pass/fail.
+        workers (int) (Optional, default None):
+            - Number of processes rendering figures (default: number of CPUs).
     """
     # Ignore "All-Nan slice" warnings
     filter_all_nan_slice_warning()
@@ -1095,93 +1531,102 @@ def analyze_density_values(
         )
     )
 
+    # Reuse the figures of an earlier report with the same results folder,
+    # where their inputs haven't changed
+    figure_cache = FigureCache(
+        density_analysis_config.figure_cache_dir(density_analysis_results_dir)
+    )
+
     num_rasters_to_analyze = len(density_values)
-    combined_array_values = np.array([])
 
-    raster_basenames_list = []
+    # Statistics of the values from all input rasters, accumulated
+    # raster by raster (the values themselves aren't combined in memory)
+    combined_statistics = DensityStatistics(
+        minimum_density_requirement,
+        very_low_density_threshold
+    )
 
-    for i, density_raster_path_array_and_datatype in enumerate(density_values):
-
-        # Parse out the raster path and the array
-        # from the density_values object
-        density_raster_path = density_raster_path_array_and_datatype[0]
-        density_array = density_raster_path_array_and_datatype[1]
-        original_raster_data_type = density_raster_path_array_and_datatype[2]
-
-        # Get the basename of the raster, and add it to a list,
-        # to use in various places on the report
-        raster_basename = os.path.basename(density_raster_path)
-        raster_basenames_list.append(raster_basename)
-
-        # Append the data of the array to an array that will contain
-        # data values from all input rasters.
-        # The shape of the input rasters/arrays is not preserved
-        # in the append; the combined_array_values array will have
-        # a shape of (total_data_values, ), whereas the input arrays,
-        # represented by the density_array variables, have dimensions of
-        # (1, number_cells_x_direction, number_cells_y_direction),
-        # which is the rasterio convention.
-        combined_array_values = np.append(
-            combined_array_values,
-            density_array
-        )
+    raster_basenames_list = []
 
-        # Define the path for an individual raster report
-        individual_raster_report_path = density_analysis_report.report_page_path(
-            density_analysis_results_temp_subdir_,
-            i
+    with concurrent.futures.ProcessPoolExecutor(
+        workers,
+        initializer=_init_report_worker
+    ) as executor:
+        raster_results = executor.map(
+            partial(
+                _raster_report_figures,
+                minimum_density_requirement,
+                very_low_density_threshold,
+                num_rasters_to_analyze,
+                figure_cache.cache_dir
+            ),
+            enumerate(density_values)
         )
 
-        # Check if the density array only contains nan values
-        if np.count_nonzero(~np.isnan(density_array)):
-
-            # Plot raster i classified by whether it meets
-            # the minimum density requirement
-            classified_raster_rlg = plot_classified_raster(
-                density_array,
-                minimum_density_requirement,
-                very_low_density_threshold
-            )
+        for i, (density_raster_path_array_and_datatype, raster_result) in enumerate(
+            zip(density_values, raster_results)
+        ):
 
-            # Make some calculations on raster i
-            calculation_results_dict = calculate_statistics(
-                density_array,
-                num_rasters_to_analyze,
-                minimum_density_requirement,
-                very_low_density_threshold,
-                density_raster_path,
-                i
-            )
+            # Parse out the raster path and the data type
+            # from the density_values object
+            density_raster_path = density_raster_path_array_and_datatype[0]
+            original_raster_data_type = density_raster_path_array_and_datatype[2]
 
-            # Make histogram for raster i
-            histogram_rlg = make_histogram(
-                density_array,
+            (
+                raster_statistics,
                 calculation_results_dict,
-                raster_basename,  # Histogram title
-                minimum_density_requirement,
-                very_low_density_threshold,
-                num_rasters_to_analyze=num_rasters_to_analyze
+                classified_raster_svg_,
+                histogram_svg_,
+                used_cache_keys
+            ) = raster_result
+            figure_cache.used_keys |= used_cache_keys
+
+            if calculation_results_dict:
+                print_statistics(
+                    calculation_results_dict,
+                    raster_statistics,
+                    num_rasters_to_analyze,
+                    density_raster_path,
+                    i
+                )
+
+            # Get the basename of the raster, and add it to a list,
+            # to use in various places on the report
+            raster_basename = os.path.basename(density_raster_path)
+            raster_basenames_list.append(raster_basename)
+
+            # Add the statistics of the array to the statistics
+            # of all input rasters.
+            combined_statistics.merge(raster_statistics)
+
+            # Define the path for an individual raster report
+            individual_raster_report_path = density_analysis_report.report_page_path(
+                density_analysis_results_temp_subdir_,
+                i
             )
 
-            # Add results for raster i to a pdf
-            density_analysis_report.RasterDensityReportPage(
-                individual_raster_report_path,
-                calculation_results_dict,
-                histogram_rlg,
-                num_rasters_to_analyze,
-                i=i,
-                density_raster_path=density_raster_path,
-                classified_raster_rlg=classified_raster_rlg,
-                original_raster_data_type=original_raster_data_type
-            )
+            # Check if the density array only contains nan values
+            if raster_statistics.count:
+
+                # Add results for raster i to a pdf
+                density_analysis_report.RasterDensityReportPage(
+                    individual_raster_report_path,
+                    calculation_results_dict,
+                    _svg_to_reportlab_graphic(histogram_svg_),
+                    num_rasters_to_analyze,
+                    i=i,
+                    density_raster_path=density_raster_path,
+                    classified_raster_rlg=_svg_to_reportlab_graphic(classified_raster_svg_),
+                    original_raster_data_type=original_raster_data_type
+                )
 
-        else:
-            density_analysis_report.AllNanDensityRasterPage(
-                individual_raster_report_path,
-                num_rasters_to_analyze,
-                i=i,
-                density_raster_path=density_raster_path
-            )
+            else:
+                density_analysis_report.AllNanDensityRasterPage(
+                    individual_raster_report_path,
+                    num_rasters_to_analyze,
+                    i=i,
+                    density_raster_path=density_raster_path
+                )
 
     combined_all_nan = None
 
@@ -1196,11 +1641,11 @@ def analyze_density_values(
         )
 
         # Check if all the combined arrays contain all nan values
-        if np.count_nonzero(~np.isnan(combined_array_values)):
+        if combined_statistics.count:
 
-            # Make some calculations on the combined array values
+            # Make some calculations on the combined statistics
             combined_calculation_results_dict = calculate_statistics(
-                combined_array_values,
+                combined_statistics,
                 num_rasters_to_analyze,
                 minimum_density_requirement,
                 very_low_density_threshold
@@ -1208,11 +1653,12 @@ def analyze_density_values(
 
             # Make histogram for combined array values
             combined_results_histogram_rlg = make_histogram(
-                combined_array_values,
+                combined_statistics,
                 combined_calculation_results_dict,
                 f"Results for {num_rasters_to_analyze} Combined Rasters",
                 minimum_density_requirement,
-                very_low_density_threshold
+                very_low_density_threshold,
+                figure_cache=figure_cache
             )
 
             # Add combined results to a pdf page
@@ -1249,6 +1695,9 @@ def analyze_density_values(
         combined_all_nan
     )
 
+    # Keep only this report's figures in the figure cache
+    figure_cache.prune()
+
 
 # ------------------------------------------------------------------------------
 # Run this module independently from upstream modules
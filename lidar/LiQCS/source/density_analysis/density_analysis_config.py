@@ -664,6 +664,54 @@ def temp_dir(parent_dir):
     return temp_dir
 
 
+# ------------------------------------------------------------------------------
+# Local cache of water polygons from the BCGW
+# ------------------------------------------------------------------------------
+
+def water_polygon_cache_path():
+    """
+    Path to the GeoPackage caching water polygons downloaded from the BCGW,
+    in the user's home directory so it's shared by every density analysis.
+
+    Creates the directory if it doesn't exist.
+
+    Returns:
+        (str):
+            - Path to the water polygon cache GeoPackage.
+    """
+    cache_dir = os.path.join(Path.home(), ".density_analysis_cache")
+    if not os.path.isdir(cache_dir):
+        os.mkdir(cache_dir)
+    return os.path.join(cache_dir, "water_polygons.gpkg")
+
+
+def figure_cache_dir(parent_dir):
+    """
+    Path to the hidden folder caching the report's rendered figures (SVG
+    files, named by a hash of their inputs), so figures are only rendered
+    again when their inputs change.
+
+    The cache is kept with the report it was made for, and only holds the
+    figures of the latest report (see analyze_density.FigureCache.prune()),
+    so it never grows beyond one report's figures.
+
+    Creates the folder if it doesn't exist.
+
+    Args:
+        parent_dir (str):
+            - Path to the density analysis results folder of the report.
+
+    Returns:
+        (str):
+            - Path to the figure cache folder.
+    """
+    cache_dir = os.path.join(parent_dir, ".density_analysis_figure_cache")
+    if not os.path.isdir(cache_dir):
+        os.mkdir(cache_dir)
+        ctypes.windll.kernel32.SetFileAttributesW(cache_dir, FILE_ATTRIBUTE_HIDDEN)
+    return cache_dir
+
+
 # ------------------------------------------------------------------------------
 # Dictionary keys
 # ------------------------------------------------------------------------------
@@ -0,0 +1,248 @@
+# Streaming statistics of density values, called by analyze_density.py
+#
+# Density values are added to a DensityStatistics accumulator an array
+# at a time, and accumulators are merged, so the combined statistics of any
+# number of rasters are computed without holding all of their values
+# in memory at once:
+#   - counts, sum, min and max are exact
+#   - mean and variance are exact, merged with Chan et al.'s
+#       parallel form of Welford's algorithm
+#   - the median comes from a fixed-bin histogram
+#       (to within one bin, HISTOGRAM_BIN_WIDTH pts/m²)
+#
+# Accumulators merge associatively, so per-raster results can be computed
+# in any order (e.g., in a process pool) and merged afterwards.
+#
+# Run this module to check merged statistics against numpy.
+
+# Public imports
+import numpy as np
+
+# ------------------------------------------------------------------------------
+# Histogram bins
+# ------------------------------------------------------------------------------
+
+# Bins per pts/m²; whole-number densities fall exactly on bin edges,
+# so the bins can be regrouped into the 1 pts/m² bins of the report's histograms
+HISTOGRAM_BINS_PER_UNIT = 100
+HISTOGRAM_BIN_WIDTH = 1 / HISTOGRAM_BINS_PER_UNIT
+
+# Densities at or above this value are counted in a single overflow bin
+HISTOGRAM_MAX_DENSITY = 1000
+HISTOGRAM_NUM_BINS = HISTOGRAM_MAX_DENSITY * HISTOGRAM_BINS_PER_UNIT
+
+
+class DensityStatistics:
+    def __init__(self, minimum_density_requirement, very_low_density_threshold):
+        """
+        Initialize an empty accumulator of density statistics.
+
+        Args:
+            minimum_density_requirement (int or float):
+                - Cells at or above this density are counted exactly.
+            very_low_density_threshold (int or float):
+                - Cells below this density are counted exactly.
+        """
+        self.minimum_density_requirement = minimum_density_requirement
+        self.very_low_density_threshold = very_low_density_threshold
+
+        self.num_cells = 0  # including nan cells
+        self.count = 0  # cells with values
+        self.num_zero = 0
+        self.num_above_min = 0
+        self.num_below_very_low = 0
+        self.sum = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the mean
+
+        # The last bin is the overflow bin
+        self.histogram = np.zeros(HISTOGRAM_NUM_BINS + 1, dtype=np.int64)
+
+    @classmethod
+    def from_array(cls, density_array, minimum_density_requirement, very_low_density_threshold):
+        """
+        Statistics of an array of density values (any shape, nan for no data).
+        """
+        density_statistics = cls(minimum_density_requirement, very_low_density_threshold)
+        density_statistics.add(density_array)
+        return density_statistics
+
+    def add(self, density_array):
+        """
+        Add an array of density values (any shape, nan for no data).
+
+        Args:
+            density_array (numpy array):
+                - Array of density values.
+        """
+        density_array = np.asarray(density_array)
+        values = density_array[~np.isnan(density_array)].astype(np.float64)
+
+        block = DensityStatistics(self.minimum_density_requirement, self.very_low_density_threshold)
+        block.num_cells = density_array.size
+        block.count = values.size
+
+        if values.size:
+            block.num_zero = values.size - np.count_nonzero(values)
+            block.num_above_min = np.count_nonzero(values >= self.minimum_density_requirement)
+            block.num_below_very_low = np.count_nonzero(values < self.very_low_density_threshold)
+            block.sum = values.sum()
+            block.min = values.min()
+            block.max = values.max()
+            block.mean = block.sum / values.size
+            block.m2 = np.square(values - block.mean).sum()
+
+            bins = np.floor(values * HISTOGRAM_BINS_PER_UNIT)
+            bins = np.clip(bins, 0, HISTOGRAM_NUM_BINS).astype(np.int64)
+            block.histogram = np.bincount(bins, minlength=HISTOGRAM_NUM_BINS + 1)
+
+        self.merge(block)
+
+    def merge(self, other):
+        """
+        Merge the statistics of another accumulator into this one.
+
+        Args:
+            other (DensityStatistics):
+                - Statistics with the same density thresholds.
+
+        Returns:
+            (DensityStatistics):
+                - This accumulator (so merges can be chained, or reduced).
+        """
+        count = self.count + other.count
+
+        if count:
+            # Chan et al.'s parallel variance
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+            self.mean += delta * other.count / count
+
+        self.num_cells += other.num_cells
+        self.count = count
+        self.num_zero += other.num_zero
+        self.num_above_min += other.num_above_min
+        self.num_below_very_low += other.num_below_very_low
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram += other.histogram
+
+        return self
+
+    @property
+    def num_nan(self):
+        return self.num_cells - self.count
+
+    def variance(self):
+        """
+        Population variance (as np.nanvar), or nan if there are no values.
+        """
+        return self.m2 / self.count if self.count else np.nan
+
+    def standard_deviation(self):
+        """
+        Population standard deviation (as np.nanstd), or nan if there are no values.
+        """
+        return np.sqrt(self.variance())
+
+    def mean_density(self):
+        return self.mean if self.count else np.nan
+
+    def percentile(self, q):
+        """
+        Estimate a percentile from the histogram, interpolating
+        linearly within the bin it falls in.
+
+        Args:
+            q (int or float):
+                - Percentile, 0 to 100.
+
+        Returns:
+            (float):
+                - Estimated percentile (to within one bin), or nan if there are no values.
+        """
+        if not self.count:
+            return np.nan
+
+        rank = q / 100 * self.count
+        cumulative = np.cumsum(self.histogram)
+        i = min(int(np.searchsorted(cumulative, rank)), HISTOGRAM_NUM_BINS)
+
+        if i == HISTOGRAM_NUM_BINS:
+            return max(HISTOGRAM_MAX_DENSITY, self.min)
+
+        below = cumulative[i - 1] if i else 0
+        fraction = (rank - below) / self.histogram[i] if self.histogram[i] else 0
+        estimate = (i + fraction) * HISTOGRAM_BIN_WIDTH
+
+        # The estimate can't be outside the range of the values
+        return float(np.clip(estimate, self.min, self.max))
+
+    def median(self):
+        return self.percentile(50)
+
+    def histogram_values(self):
+        """
+        Histogram bins as values and weights for matplotlib's hist(),
+        e.g. ax.hist(values, bins, weights=weights)
+
+        Returns:
+            values (numpy array):
+                - Centre of each bin (the overflow bin is left out).
+            weights (numpy array):
+                - Number of values in each bin.
+        """
+        values = (np.arange(HISTOGRAM_NUM_BINS) + 0.5) * HISTOGRAM_BIN_WIDTH
+        return values, self.histogram[:HISTOGRAM_NUM_BINS]
+
+
+def _check_against_numpy(seed=0):
+    """
+    Check that statistics merged from several arrays match numpy's
+    statistics of the same values concatenated (run this module to check).
+
+    Args:
+        seed (int) (Optional, default 0):
+            - Seed of the random density arrays.
+    """
+    rng = np.random.default_rng(seed)
+
+    arrays = [
+        rng.gamma(shape, scale, size)
+        for shape, scale, size in ((2, 4, (300, 200)), (9, 1.5, (50, 70)), (1, 30, (10, 10)))
+    ]
+    arrays[0][rng.random(arrays[0].shape) < 0.2] = np.nan
+    arrays[1][:5] = 0
+
+    merged = DensityStatistics(8, 2)
+    for array in arrays:
+        merged.merge(DensityStatistics.from_array(array, 8, 2))
+
+    values = np.concatenate([array.ravel() for array in arrays])
+    values = values[~np.isnan(values)]
+
+    assert merged.count == values.size
+    assert merged.num_nan == sum(np.isnan(array).sum() for array in arrays)
+    assert merged.num_zero == np.count_nonzero(values == 0)
+    assert merged.num_above_min == np.count_nonzero(values >= 8)
+    assert merged.num_below_very_low == np.count_nonzero(values < 2)
+    assert (merged.min, merged.max) == (values.min(), values.max())
+    assert np.isclose(merged.mean_density(), values.mean())
+    assert np.isclose(merged.variance(), values.var())
+    assert np.isclose(merged.standard_deviation(), values.std())
+
+    # Percentiles are estimated from the histogram, to within one bin of
+    # the value at their rank (where sparse values are far apart, such as in
+    # the tail, this can be further than a bin from numpy's default interpolation)
+    for q in (1, 25, 50, 75, 99):
+        value_at_rank = np.percentile(values, q, method="inverted_cdf")
+        assert abs(merged.percentile(q) - value_at_rank) <= HISTOGRAM_BIN_WIDTH, q
+    assert abs(merged.median() - np.median(values)) <= HISTOGRAM_BIN_WIDTH
+
+
+if __name__ == "__main__":
+    _check_against_numpy()
+    print("Merged density statistics match numpy.")
@@ -21,18 +21,19 @@ analysis.
 
 
 from typing import List, Tuple
+from datetime import datetime
+from functools import partial
+import concurrent.futures
 import oracledb
 import fiona
 from pyproj import Transformer, CRS, Proj
-from shapely.geometry import shape, mapping, Polygon
+from shapely.geometry import shape, mapping, Polygon, box
 from shapely import wkt
-from shapely.ops import transform
+from shapely.ops import transform, unary_union
 import os
-import shutil
-import tqdm
 import pickle
 import rasterio as rio
-from rasterio.mask import mask
+from rasterio.features import rasterize
 import numpy as np
 import warnings
 
@@ -83,6 +84,22 @@ def _pickled_water_polys():
     return pickled_water_polys
 
 
+def _local_water_source():
+    local_water_source = os.path.join(
+        TestFolders().WATER_INPUT,
+        "water_polygons_stand_in.gpkg"
+    )
+    return local_water_source
+
+
+def _local_water_cache():
+    local_water_cache = os.path.join(
+        TestFolders().WATER_INPUT,
+        "water_polygons_cache.gpkg"
+    )
+    return local_water_cache
+
+
 # ------------------------------------------------------------------------------
 # Water polygons used to mask rasters
 # (we don't want to check density of water areas)
@@ -111,6 +128,35 @@ LOCAL_WATER_LAYERS = [
     )
 ]
 
+# Local cache of the BCGW water polygons (see WaterPolygonCache):
+# a layer of polygons for each BCGW layer, and a layer of the areas downloaded.
+WATER_CACHE_EXTENTS_LAYER = "downloaded_areas"
+WATER_CACHE_POLYGON_SCHEMA = {
+    "geometry": "Polygon",
+    "properties": {"id": "str"},
+}
+WATER_CACHE_EXTENTS_SCHEMA = {
+    "geometry": "Polygon",
+    "properties": {"layer": "str", "downloaded": "str"},
+}
+
+# ------------------------------------------------------------------------------
+# Masking
+# ------------------------------------------------------------------------------
+
+ALBERS_CRS = "EPSG:3005"
+
+# Values burned into the mask of each raster
+OUTSIDE_PROJECT_AREA = 0
+IN_PROJECT_AREA = 1
+IN_WATER = 2
+
+# Masking polygons transformed to each raster CRS (see polygons_in_crs)
+_polygons_by_crs = {}
+
+# Masking polygons of the worker processes of mask_all_density_grids
+_worker_polygons = None
+
 
 # ------------------------------------------------------------------------------
 # Filter warnings
@@ -135,24 +181,245 @@ def filter_user_warnings(warning_action):
     )
 
 
+# ------------------------------------------------------------------------------
+# Water polygon sources and local cache
+# ------------------------------------------------------------------------------
+
+class BcgwWaterSource():
+    def __init__(self, bcgw_credentials):
+        """
+        Water polygons queried from the BCGW.
+
+        The connection is only made when the first query is needed,
+        so a run covered by the local cache doesn't connect at all.
+
+        Args:
+            bcgw_credentials (tuple of 2 strings):
+                Tuple elements:
+                    0 (str): BCGW username
+                    1 (str): BCGW password
+        """
+        self.bcgw_credentials = bcgw_credentials
+        self.connection = None
+
+    def query(self, layer: str, query_bounds: List[Tuple[float]]) -> List[Tuple[str, Polygon]]:
+        """
+        Query a BCGW layer for the polygons intersecting any of the bounds.
+
+        Returns:
+            (list of tuples):
+                - (ID, polygon) of each polygon. Multipolygons are split
+                    into polygons, with IDs "<row ID>:<part number>".
+        """
+        if self.connection is None:
+            self.connection = density_analysis_config.get_bcgw_connection(
+                self.bcgw_credentials
+            )
+
+        id_polygons = []
+        for geometry, rowid in spatial_query_bcgw(self.connection, query_bounds, layer):
+            polygons = create_polygon_list_from_sql([(geometry,)])
+            id_polygons.extend(
+                (f"{rowid}:{part}", polygon) for part, polygon in enumerate(polygons)
+            )
+
+        return id_polygons
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class LocalWaterSource():
+    def __init__(self, gpkg_path):
+        """
+        Water polygons read from a local GeoPackage, standing in for the BCGW
+        when testing (e.g., a copy of a water polygon cache).
+
+        Args:
+            gpkg_path (str):
+                - Path to a GeoPackage with a layer of polygons for each
+                    BCGW layer, with the same layer names and ID field
+                    as the cache (see WaterPolygonCache).
+        """
+        self.gpkg_path = gpkg_path
+
+    def query(self, layer: str, query_bounds: List[Tuple[float]]) -> List[Tuple[str, Polygon]]:
+        """
+        Read the polygons of a layer intersecting any of the bounds.
+
+        Returns:
+            (list of tuples):
+                - (ID, polygon) of each polygon.
+        """
+        return _read_polygons_in_bounds(self.gpkg_path, _cache_layer_name(layer), query_bounds)
+
+    def close(self):
+        pass
+
+
+class WaterPolygonCache():
+    def __init__(self, cache_path, water_source, refresh=False):
+        """
+        Local cache of water polygons, in a GeoPackage.
+
+        Each layer is indexed by an R-tree (GeoPackage's spatial index),
+        so polygons are read by bounding box. The areas already downloaded
+        for each layer are kept in a layer of their own; a project area
+        outside them is downloaded from the water source with one query
+        per layer, for all of the missing areas at once.
+
+        Args:
+            cache_path (str):
+                - Path to the cache GeoPackage (created if it doesn't exist).
+            water_source (BcgwWaterSource or LocalWaterSource):
+                - Source of the polygons for areas not cached yet.
+            refresh (bool) (Optional, default False):
+                - Delete the cache, so all of the polygons are downloaded again.
+        """
+        self.cache_path = cache_path
+        self.water_source = water_source
+
+        if refresh and os.path.isfile(cache_path):
+            os.remove(cache_path)
+
+    def polygons(self, layer: str, query_bounds: List[Tuple[float]]) -> List[Polygon]:
+        """
+        Get the polygons of a layer intersecting any of the bounds,
+        downloading the areas not cached yet.
+
+        Args:
+            layer (str):
+                - Name of BCGW layer
+            query_bounds (list of tuples of float values):
+                - Bounding coordinates (BC Albers) of the project areas.
+
+        Returns:
+            (List[Polygon]):
+                - Polygons intersecting the bounds (each polygon once).
+        """
+        cached_area = self._cached_area(layer)
+        missing_bounds = [
+            bounds for bounds in query_bounds
+            if not cached_area.covers(box(*bounds))
+        ]
+
+        if missing_bounds:
+            print(f"\n\tDownloading {layer} for {len(missing_bounds)} area(s) not cached yet")
+            self._add(layer, missing_bounds, self.water_source.query(layer, missing_bounds))
+
+        id_polygons = _read_polygons_in_bounds(
+            self.cache_path, _cache_layer_name(layer), query_bounds
+        )
+
+        return [polygon for _, polygon in id_polygons]
+
+    def _layers(self) -> List[str]:
+        if not os.path.isfile(self.cache_path):
+            return []
+        return fiona.listlayers(self.cache_path)
+
+    def _cached_area(self, layer: str):
+        if WATER_CACHE_EXTENTS_LAYER not in self._layers():
+            return Polygon()
+
+        with fiona.open(self.cache_path, layer=WATER_CACHE_EXTENTS_LAYER) as extents:
+            return unary_union([
+                shape(extent["geometry"]) for extent in extents
+                if extent["properties"]["layer"] == layer
+            ] or [Polygon()])
+
+    def _add(self, layer: str, query_bounds: List[Tuple[float]], id_polygons: List[Tuple[str, Polygon]]):
+        """
+        Add downloaded polygons (skipping any already cached from
+        a neighbouring area) and the areas they were downloaded for.
+        """
+        cache_layer = _cache_layer_name(layer)
+        layers = self._layers()
+
+        cached_ids = set()
+        if cache_layer in layers:
+            cached_ids = {
+                polygon_id for polygon_id, _ in
+                _read_polygons_in_bounds(self.cache_path, cache_layer, query_bounds)
+            }
+
+        with _open_cache_layer(self.cache_path, cache_layer, layers, WATER_CACHE_POLYGON_SCHEMA) as dest:
+            dest.writerecords(
+                {"geometry": mapping(polygon), "properties": {"id": polygon_id}}
+                for polygon_id, polygon in id_polygons if polygon_id not in cached_ids
+            )
+
+        with _open_cache_layer(self.cache_path, WATER_CACHE_EXTENTS_LAYER, layers, WATER_CACHE_EXTENTS_SCHEMA) as dest:
+            dest.writerecords(
+                {
+                    "geometry": mapping(box(*bounds)),
+                    "properties": {"layer": layer, "downloaded": datetime.now().isoformat(timespec="seconds")}
+                }
+                for bounds in query_bounds
+            )
+
+
+def _cache_layer_name(layer: str) -> str:
+    return layer.replace(".", "__")
+
+
+def _open_cache_layer(cache_path: str, cache_layer: str, layers: List[str], schema: dict):
+    if cache_layer in layers:
+        return fiona.open(cache_path, "a", layer=cache_layer)
+    return fiona.open(cache_path, "w", driver="GPKG", layer=cache_layer, schema=schema, crs="epsg:3005")
+
+
+def _read_polygons_in_bounds(
+    gpkg_path: str, layer: str, query_bounds: List[Tuple[float]]
+) -> List[Tuple[str, Polygon]]:
+    """
+    Read the polygons of a GeoPackage layer intersecting any of the bounds,
+    using the layer's spatial index.
+
+    Returns:
+        (list of tuples):
+            - (ID, polygon) of each polygon, once.
+    """
+    id_polygons = {}
+
+    if not os.path.isfile(gpkg_path) or layer not in fiona.listlayers(gpkg_path):
+        return []
+
+    with fiona.open(gpkg_path, layer=layer) as src:
+        for bounds in query_bounds:
+            for record in src.filter(bbox=bounds):
+                polygon_id = record["properties"]["id"]
+                if polygon_id not in id_polygons:
+                    id_polygons[polygon_id] = shape(record["geometry"])
+
+    return list(id_polygons.items())
+
+
 # ------------------------------------------------------------------------------
 # Functions
 # ------------------------------------------------------------------------------
 
 def identify_water_polys_in_project_areas(
-    db_connection: oracledb.Connection,
+    water_source,
     project_area_polygons: List[Polygon],
     outdir: str,
-    pickle_filtered_water_polys=False
+    pickle_filtered_water_polys=False,
+    cache_path: str = None,
+    refresh_cache=False
 ) -> List[Polygon]:
     """
     Identify which water polygons from the BCGW
     fall within the project areas,
     and include the ocean too.
 
+    Water polygons are read from a local cache (see WaterPolygonCache),
+    and the source is only queried for project areas not cached yet.
+
     Args:
-        db_connection (oracledb.Connection):
-            - Oracle database connection object
+        water_source (BcgwWaterSource or LocalWaterSource):
+            - Source of the water polygons to cache.
         project_area_polygons (List[Polygon]):
             - List of shapely.geometry Polygon objects
                 representing the project area.
@@ -161,6 +428,12 @@ def identify_water_polys_in_project_areas(
         pickle_filtered_water_polys (bool) (Optional, default False):
             - Switch to make a pickle file of the filtered water polygons
                 to use again by a later run of this script.
+        cache_path (str) (Optional, default None):
+            - Path to the cache GeoPackage.
+                If None, density_analysis_config.water_polygon_cache_path()
+        refresh_cache (bool) (Optional, default False):
+            - Delete the cache first, so all of the polygons are downloaded
+                again (e.g., after the water polygons on the BCGW have changed).
 
     Returns:
         water_polygons (List[Polygon]):
@@ -171,14 +444,20 @@ def identify_water_polys_in_project_areas(
     print(
         f"\nIdentifying polygons from the Freshwater Atlas "
         f"on the BCGW that fall within the project area."
-        f"\n\tQuerying layers: {*BCGW_FWA_LAYERS,}")
+        f"\n\tLayers: {*BCGW_FWA_LAYERS,}")
+
+    if cache_path is None:
+        cache_path = density_analysis_config.water_polygon_cache_path()
+
+    project_area_bounds = [
+        get_shapely_bounds_albers(polygon) for polygon in project_area_polygons
+    ]
+
+    water_cache = WaterPolygonCache(cache_path, water_source, refresh=refresh_cache)
     water_polygons = []
-    for polygon in tqdm.tqdm(project_area_polygons):
-        bounds = get_shapely_bounds_albers(polygon)
-        for layer in BCGW_FWA_LAYERS:
-            db_result = spatial_query_bcgw(db_connection, bounds, layer)
-            polygons = create_polygon_list_from_sql(db_result)
-            water_polygons.extend(polygons)
+    for layer in BCGW_FWA_LAYERS:
+        water_polygons.extend(water_cache.polygons(layer, project_area_bounds))
+
     local_water_polygons = read_shapefiles_to_albers(LOCAL_WATER_LAYERS)
     water_polygons.extend(local_water_polygons)
 
@@ -222,7 +501,7 @@ def get_shapely_bounds_albers(shapely_polygon: Polygon) -> Tuple[float]:
 
 def spatial_query_bcgw(
     db_connection: oracledb.Connection,
-    query_bounds: Tuple[float],
+    query_bounds: List[Tuple[float]],
     bcgw_layer: str,
 ):
     """
@@ -230,38 +509,36 @@ def spatial_query_bcgw(
     limited to the coordinate bounds provided.
     Coordinates should be BC Albers (EPSG:3005).
 
+    All of the bounding boxes are queried at once, as the union
+    of the boxes (passed as a CLOB, as it can be a long WKT string).
+
     Args:
         db_connection (cx_Oracle.Connection or oracledb.Connection):
             - Oracle database connection object
-        query_bounds (tuple of float values):
+        query_bounds (list of tuples of float values):
             - Bounding coordinates within which to perform query
         bcgw_layer (str):
             - Name of BCGW layer to query
 
     Returns:
         result (list):
-            - List of polygons in WKT format within BCGW that
-                intersect/overlap the bounding box described
+            - List of (polygon in WKT format, row ID) within BCGW that
+                intersect/overlap the bounding boxes described
                 by the query bounds.
     """
-    xmin, ymin, xmax, ymax = query_bounds
-
-    sdo_geom = (
-        "SDO_GEOMETRY(2003, 3005, NULL, "
-        "SDO_ELEM_INFO_ARRAY(1,1003,3), "
-        f"SDO_ORDINATE_ARRAY({xmin}, {ymin}, {xmax}, {ymax}))"
-    )
+    query_area = unary_union([box(*bounds) for bounds in query_bounds])
 
     cursor = db_connection.cursor()
+    cursor.setinputsizes(query_wkt=oracledb.DB_TYPE_CLOB)
 
     query = f"""
-    SELECT SDO_UTIL.TO_WKTGEOMETRY(GEOMETRY)
+    SELECT SDO_UTIL.TO_WKTGEOMETRY(GEOMETRY), ROWIDTOCHAR(l.ROWID)
     FROM {bcgw_layer} l
     WHERE SDO_RELATE(l.geometry,
-    {sdo_geom}, 'mask=anyinteract') = 'TRUE'
+    SDO_GEOMETRY(:query_wkt, 3005), 'mask=anyinteract') = 'TRUE'
     """
 
-    result = cursor.execute(query).fetchall()
+    result = cursor.execute(query, query_wkt=query_area.wkt).fetchall()
 
     return result
 
@@ -420,6 +697,39 @@ def write_to_file(polygons: List[Polygon], water_dir: str):
             output.write({"geometry": mapping(polygons)})
 
 
+def polygons_in_crs(polygons: List[Polygon], crs) -> List[Polygon]:
+    """
+    Transform list of Shapely polygons (BC Albers)
+    to another CRS.
+
+    Each list of polygons is only transformed once per CRS;
+    the density rasters of a project almost always share a CRS.
+
+    Args:
+        polygons (List[Polygon]):
+            - List of shapely polygons in BC Albers.
+        crs (rasterio.crs.CRS):
+            - CRS to transform the polygons to.
+
+    Returns:
+        List[Polygon]:
+            - The polygons in the CRS.
+    """
+    if crs == ALBERS_CRS:
+        return polygons
+
+    key = (id(polygons), str(crs))
+    if key not in _polygons_by_crs:
+        transformer = Transformer.from_crs(ALBERS_CRS, crs.to_wkt(), always_xy=True)
+        # keep a reference to the original list, so its id isn't reused
+        _polygons_by_crs[key] = (
+            polygons,
+            [transform(transformer.transform, polygon) for polygon in polygons]
+        )
+
+    return _polygons_by_crs[key][1]
+
+
 def transform_polygons_to_raster_crs(
     open_geotiff, polygons: List[Polygon]
 ) -> List[Polygon]:
@@ -429,34 +739,32 @@ def transform_polygons_to_raster_crs(
     which has been read with rasterio.
 
     Args:
-        open_geotiff (_type_): _description_
-        polygons (List[Polygon]): _description_
+        open_geotiff (rasterio.DatasetReader):
+            - Raster opened with rasterio.
+        polygons (List[Polygon]):
+            - List of shapely polygons in BC Albers.
 
     Returns:
-        List[Polygon]: _description_
+        List[Polygon]:
+            - The polygons in the raster's CRS.
     """
-    transformed_polygons = []
-
-    epsg = open_geotiff.crs
-    transformer = Transformer.from_crs("epsg:3005", epsg)
-
-    for polygon in polygons:
-        transformed_polygon = transform(transformer.transform, polygon)
-        transformed_polygons.append(transformed_polygon)
-
-    return transformed_polygons
+    return polygons_in_crs(polygons, open_geotiff.crs)
 
 
 def mask_all_density_grids(
     outdir: str,
     density_grids: List[str],
     project_area_polygons: List[Polygon],
-    water_polys_in_project_areas: List[Polygon]
+    water_polys_in_project_areas: List[Polygon],
+    workers: int = None
 ) -> List[Tuple[str, np.ndarray]]:
     """
     Mask a list of rasters using project areas and
     water polygons.
 
+    The rasters are masked in a process pool. The polygons are sent
+    to each process once, and transformed once per CRS in each process.
+
     Args:
         outdir (str):
             - Path to directory to save outputs.
@@ -466,6 +774,8 @@ def mask_all_density_grids(
             - List of shapely polygons representing the project area (AOI).
         water_polys_in_project_areas (List[Polygon]):
             - List of shapely polygons representing water in the project area.
+        workers (int) (Optional, default None):
+            - Number of processes masking rasters (default: number of CPUs).
 
     Returns:
         list of tuples:
@@ -482,17 +792,32 @@ def mask_all_density_grids(
     """
     print("\nMasking water from project areas...")
 
-    all_density_values = []
-
-    for grid in density_grids:
-        density_values, original_data_type = mask_density_grid(
-            outdir, grid, project_area_polygons, water_polys_in_project_areas
+    with concurrent.futures.ProcessPoolExecutor(
+        workers,
+        initializer=_init_mask_worker,
+        initargs=(project_area_polygons, water_polys_in_project_areas)
+    ) as executor:
+        all_density_values = list(
+            executor.map(partial(_mask_density_grid_worker, outdir), density_grids)
         )
-        all_density_values.append((grid, density_values, original_data_type))
 
     return all_density_values
 
 
+def _init_mask_worker(project_area_polygons, water_polys_in_project_areas):
+    """
+    Share the masking polygons with a worker process of mask_all_density_grids.
+    """
+    global _worker_polygons
+    filter_user_warnings("ignore")
+    _worker_polygons = (project_area_polygons, water_polys_in_project_areas)
+
+
+def _mask_density_grid_worker(outdir, grid):
+    density_values, original_data_type = mask_density_grid(outdir, grid, *_worker_polygons)
+    return grid, density_values, original_data_type
+
+
 def mask_density_grid(
     outdir: str,
     geotiff_file: str,
@@ -503,6 +828,9 @@ def mask_density_grid(
     Mask density grid, removing area outside the project area
     and area inside the water polygons.
 
+    The project area and water polygons are burned into one
+    in-memory mask, in a single pass over the raster.
+
     Writes masked rasters to Geotiff for verification of removed water.
 
     Args:
@@ -531,49 +859,33 @@ def mask_density_grid(
 
     with rio.open(geotiff_file) as density_grid:
         nodata = density_grid.nodata
+        metadata = density_grid.meta
+        water_mask_grid = density_grid.read()
 
         # If the density grid's CRS isn't BC Albers NAD83,
         # project the masking polygons into the same CRS
         # as the density grid.
-        if density_grid.crs != "EPSG:3005":
-            t_project_polygons = transform_polygons_to_raster_crs(
-                density_grid, project_polygons
-            )
-            t_water_polygons = transform_polygons_to_raster_crs(
-                density_grid, water_polygons
+        # Water is burned after the project areas, so any cell touching
+        # water is masked even if it also touches the project area.
+        shapes = (
+            [(polygon, IN_PROJECT_AREA) for polygon in polygons_in_crs(project_polygons, density_grid.crs)]
+            + [(polygon, IN_WATER) for polygon in polygons_in_crs(water_polygons, density_grid.crs)]
+        )
+        if shapes:
+            mask_values = rasterize(
+                shapes,
+                out_shape=density_grid.shape,
+                transform=density_grid.transform,
+                fill=OUTSIDE_PROJECT_AREA,
+                all_touched=True,
+                dtype="uint8"
             )
         else:
-            t_project_polygons = project_polygons
-            t_water_polygons = water_polygons
-
-        metadata = density_grid.meta
-        proj_mask_grid, out_transform = mask(
-            density_grid, t_project_polygons, all_touched=True, invert=False
-        )
-
-    temp_dir = density_analysis_config.temp_dir(outdir)
-
-    temp_raster = os.path.join(
-        temp_dir,
-        "temp.tif"
-    )
-
-    # Write the raster masked to the project area
-    # (use the metadata from the original raster)
-    with rio.open(temp_raster, "w", **metadata, compress="LZW") as dest:
-        dest.write(proj_mask_grid)
-
-    # Mask the raster with the water polygons, and read the file into
-    # a new rasterio object (water_mask_grid), bringing the
-    # original metadata along to use again.
-    with rio.open(temp_raster) as density_grid:
-        water_mask_grid, out_transform = mask(
-            density_grid, t_water_polygons, all_touched=True, invert=True
-        )
-        metadata = density_grid.meta
+            mask_values = np.full(density_grid.shape, OUTSIDE_PROJECT_AREA, dtype="uint8")
 
-    # Delete temporary directory and the temp.tif file inside it.
-    shutil.rmtree(temp_dir)
+    # Mask the cells outside the project area or in water with nodata
+    # (0 if the raster has no nodata value, like rasterio.mask)
+    water_mask_grid[:, mask_values != IN_PROJECT_AREA] = nodata if nodata is not None else 0
 
     # Check if all values of the masked raster are null
     all_values_nan = np.all(water_mask_grid == nodata)
@@ -671,7 +983,10 @@ def run(
     bcgw_credentials,
     use_new_water_polys=True,
     pickle_filtered_water_polys=False,
-    pickle_density_values=False
+    pickle_density_values=False,
+    use_local_water_source=False,
+    workers=None,
+    refresh_water_polygon_cache=False
 ):
     """
     Mask a list of lidar density rasters by project areas
@@ -703,6 +1018,18 @@ def run(
             - Option to save density values to a pickle file to use for later
                 testing of downstream modules.
             - Defaults to False.
+        use_local_water_source (bool, optional):
+            - Option to cache water polygons from a local GeoPackage standing in
+                for the BCGW (see LocalWaterSource), instead of the BCGW.
+            - Only used in testing situations. Defaults to False.
+        workers (int, optional):
+            - Number of processes masking rasters.
+            - Defaults to None (number of CPUs).
+        refresh_water_polygon_cache (bool, optional):
+            - Option to delete the local cache of water polygons, so they are
+                all downloaded again (e.g., after the water polygons on the
+                BCGW have changed). See WaterPolygonCache.
+            - Defaults to False.
 
     Returns:
         density_values (list of tuples):
@@ -726,16 +1053,32 @@ def run(
     # use_new_water_polys will only be False in testing situations.
     # bcgw_credentials will be None only in testing situations,
     # specifically, if sam_testing in liqcs_gui.py is set to True.
-    if use_new_water_polys and bcgw_credentials:
-        # Connect to BCGW
-        with density_analysis_config.get_bcgw_connection(bcgw_credentials) as conn:
-            # Identify which water polygons fall within the project areas
+    if use_local_water_source:
+        # Cache water polygons from a local stand-in for the BCGW,
+        # in a cache of its own
+        water_polys_in_project_areas = identify_water_polys_in_project_areas(
+            LocalWaterSource(_local_water_source()),
+            project_area_polygons,
+            outdir,
+            pickle_filtered_water_polys=pickle_filtered_water_polys,
+            cache_path=_local_water_cache(),
+            refresh_cache=refresh_water_polygon_cache
+        )
+
+    elif use_new_water_polys and bcgw_credentials:
+        # Identify which water polygons fall within the project areas
+        # (only connects to the BCGW for areas that aren't cached yet)
+        water_source = BcgwWaterSource(bcgw_credentials)
+        try:
             water_polys_in_project_areas = identify_water_polys_in_project_areas(
-                conn,
+                water_source,
                 project_area_polygons,
                 outdir,
-                pickle_filtered_water_polys=pickle_filtered_water_polys
+                pickle_filtered_water_polys=pickle_filtered_water_polys,
+                refresh_cache=refresh_water_polygon_cache
             )
+        finally:
+            water_source.close()
 
     else:
         # Only use this pickle file for test purposes to avoid needing to
@@ -753,7 +1096,8 @@ def run(
         outdir,
         density_grids,
         project_area_polygons,
-        water_polys_in_project_areas
+        water_polys_in_project_areas,
+        workers=workers
     )
 
     if pickle_density_values:
@@ -805,6 +1149,18 @@ def main():
     # Independently relevant. (Doesn't matter if other switches are True or False)
     pickle_density_values = False
 
+    # If use_local_water_source is True, cache water polygons from the local
+    # stand-in GeoPackage in the test data folder instead of the BCGW.
+    # (only True in testing scenarios)
+    # Independently relevant. (Doesn't matter if other switches are True or False)
+    use_local_water_source = False
+
+    # If refresh_water_polygon_cache is True, delete the local cache of
+    # water polygons, so they're all downloaded again
+    # (e.g., after the water polygons on the BCGW have changed).
+    # Only relevant if use_new_water_polys or use_local_water_source is True.
+    refresh_water_polygon_cache = False
+
     # --------------------------------------------------------------------------
     # Input rasters
     input_dir = density_analysis_config.specify_input_dir(
@@ -855,7 +1211,9 @@ def main():
         bcgw_credentials=bcgw_credentials,
         use_new_water_polys=use_new_water_polys,
         pickle_filtered_water_polys=pickle_filtered_water_polys,
-        pickle_density_values=pickle_density_values
+        pickle_density_values=pickle_density_values,
+        use_local_water_source=use_local_water_source,
+        refresh_water_polygon_cache=refresh_water_polygon_cache
     )
 
 
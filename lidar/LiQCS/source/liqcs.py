@@ -12,10 +12,10 @@ import datetime
 
 
 # -- Local imports
-from liqcs_config import IS_LINUX, SHELL_EXEC, rainbow_string, dashline, total_ram, RAM
+from liqcs_config import IS_LINUX, SHELL_EXEC, rainbow_string, dashline
 from liqcs_const import LidarClass, GridType, EpsgCode, LiqcsTests
 from liqcs_summary import LidarSummary, find_format_errors
-from rsge_toolbox.lidar.Laszy import Laszy, LaszyReport
+from rsge_toolbox.lidar.Laszy import Laszy, LaszyReport, LaszyStore
 from liqcs_validate_filename import filename_is_bad
 from liqcs_void_check import *
 from liqcs_grid import Grid
@@ -86,12 +86,6 @@ def run_from_gui(
             - List of exceptions the code encountered.
     """
 
-    # reduce number of concurrent process based on total RAM
-    if total_ram() < RAM.GB_8:
-        cores = 1
-    elif total_ram() < RAM.GB_32:
-        cores = 2
-
     exceptions = run_tests(
         testList,
         inputPath,
@@ -152,12 +146,12 @@ def run_tests(
             traj_to_gpkg_handler(epsgCode, infileGlob, resultsPath)
 
         if LiqcsTests.LASZY == currentTest:
-            print(f"Generating {len(las_files)} Laszy json files...", flush=True)
+            print(f"Summarizing {len(las_files)} files to Laszy store...", flush=True)
             laszy_info_handler(las_files, resultsPath, int(cores))
 
         if LiqcsTests.LASZY_SUMMARY == currentTest:
-            print("Generating Laszy Summary from Laszy json files...", flush=True)
-            laszy_summary_handler(las_files, resultsPath)
+            print("Generating Laszy Summary from Laszy store...", flush=True)
+            laszy_summary_handler(las_files, resultsPath, int(cores))
 
         if LiqcsTests.QC_PREP == currentTest:
             print("Running qc prep...", flush=True)
@@ -165,7 +159,7 @@ def run_tests(
 
         if LiqcsTests.VOID_CHECK == currentTest:
             print("Void check/reporting in progress...", flush=True)
-            void_check_handler(grid_path, resultsPath, shapefile)
+            void_check_handler(grid_path, resultsPath, shapefile, int(cores))
 
         if LiqcsTests.DENSITY_ANALYSIS == currentTest:
             print("Density Analysis running...", flush=True)
@@ -183,13 +177,14 @@ def run_tests(
     return EXCEPTIONS
 
 
-def void_check_handler(grid_path, resultsPath, shapefile):
+def void_check_handler(grid_path, resultsPath, shapefile, cores=None):
 
     """
 
     :param grid_path:
     :param resultsPath:
     :param shapefile:
+    :param cores:
     :return:
     """
 
@@ -199,7 +194,7 @@ def void_check_handler(grid_path, resultsPath, shapefile):
 
         last_return_path = os.path.join(grid_path, Strings.DENSITY, GridType.LAST_RETURN)
         mask = void_mask(breaklines=shapefile[0], aoi=shapefile[1], out_dir=void_path)
-        void_report(last_return_path, resultsPath, mask)
+        void_report(last_return_path, resultsPath, mask, workers=cores)
 
     except Exception as e:
         print(e)
@@ -315,15 +310,19 @@ def lidar_summary_handler(resultsPath):
         EXCEPTIONS.append(f"lidar Summary:\n{traceback.format_exc()}")
         
 
-def laszy_summary_handler(flist: list, outdir: str):
+def laszy_summary_handler(flist: list, outdir: str, cores: int = 1):
 
     """
     :param flist:
     :param outdir:
+    :param cores:
     """
 
     try:
-        report = LaszyReport(file_list=flist, outdir=outdir, las_to_json=True, verbose=False)
+        report = LaszyReport(
+            file_list=flist, outdir=outdir, las_to_store=True,
+            verbose=False, read_points=True, workers=cores
+        )
         report.write(Strings.LASZY_REPORT, validate=True, check_logs=True)
     except Exception as e:
         print(e)
@@ -372,12 +371,12 @@ def lasinfo_handler(cores, las_files, resultsPath):
         EXCEPTIONS.append(f"Lasinfo:\n{traceback.format_exc()}")
 
 
-def _laszy_json(file: str, outdir: str):
+def _laszy_summary(file: str, store: str):
 
     """Helper for laszy info."""
 
-    las = Laszy(file)
-    las.summarize(outdir=outdir)
+    las = Laszy(file, read_points=False)  # point records are streamed by summarize()
+    las.summarize(store=store)
 
 
 def laszy_info_handler(flist: list, outdir: str, cores: int = 1):
@@ -388,10 +387,19 @@ def laszy_info_handler(flist: list, outdir: str, cores: int = 1):
     :param cores:
     """
 
-    json_outdir = os.path.join(outdir, Strings.LASZY_JSON)
-    laszy_partial = partial(_laszy_json, outdir=json_outdir)
+    store = os.path.join(outdir, Strings.LASZY_STORE)
+    done = LaszyStore(store).paths() if os.path.exists(store) else set()
+    flist = [file for file in flist if os.path.abspath(file) not in done]
+
+    laszy_partial = partial(_laszy_summary, store=store)
     with concurrent.futures.ProcessPoolExecutor(cores) as executor:
-        executor.map(laszy_partial, flist)
+        futures = {executor.submit(laszy_partial, file): file for file in flist}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(e)
+                EXCEPTIONS.append(f"Laszy ({futures[future]}):\n{traceback.format_exc()}")
 
 
 def density_analysis_handler(densityAnalysisDict, resultsPath):
@@ -592,15 +600,23 @@ def is_epsg_required(tests: Union[list, set]) -> bool:
     return is_vector_output or is_raster_output
 
 
-def generate_grids(in_file: str, grid_types: list, out_dir: str, epsgCode: int, gridClasses: list):
+def generate_grids(
+        in_file: str, grid_types: list, out_dir: str, epsgCode: int,
+        gridClasses: list, multiband: bool = False):
     """
     Generate gridded data from input LAS/LAZ file.
 
+    Points are streamed from file in chunks, and the cell index of each
+    point is computed once and shared by every requested grid product
+    (see Grid.stream_products()). Memory use is bounded by the chunk size
+    rather than the size of the tile.
+
     :param in_file: Input LAS/LAZ file
     :param grid_types: List of GRID_TYPE(s) or string if one type provided. (See liqcs_const.py)
     :param out_dir: Output directory for writing.
     :param epsgCode: EPSG code defining Coordinate Reference System for output data.
     :param gridClasses: List of class number definitions (conforming to ASPRS LAS specification)
+    :param multiband: Write all products to a single multi-band GeoTIFF in out_dir, rather than one file per product.
     """
 
     filename = in_file.split(os.sep)[-1]
@@ -611,30 +627,46 @@ def generate_grids(in_file: str, grid_types: list, out_dir: str, epsgCode: int,
         grid_types = [grid_types]
 
     try:
-        grid = Grid()
-        grid.set_crs(epsgCode)
-        grid.read_lidar(in_file)
+        # map each grid product to its band description and single-band output file
+        outputs = {}
         for t in grid_types:
             folder = (Strings.INTENSITY if (t == GridType.INTENSITY) else Strings.DENSITY)
 
             if t == GridType.CLASS:
                 for class_number in gridClasses:
                     cls = LidarClass.DICT[class_number]
-                    out_name = os.path.join(out_dir, folder, cls, f"{basename}_{cls}.tif")
-                    if not os.path.exists(out_name):
-                        grid.compute(class_number, False, False)
-                        grid.write(out_name)
-                        grid.reset()
+                    outputs[class_number] = (cls, os.path.join(out_dir, folder, cls, f"{basename}_{cls}.tif"))
             else:
                 last_return = (GridType.LAST_RETURN if (t == GridType.LAST_RETURN) else "")
-                out_name = os.path.join(out_dir, folder, last_return, f"{basename}_{t}.tif")
-                if not os.path.exists(out_name):
-                    grid.compute(
-                        last_return=(t == GridType.LAST_RETURN),
-                        intensity=(t == GridType.INTENSITY)
-                    )
-                    grid.write(out_name)
-                    grid.reset()
+                outputs[t] = (t, os.path.join(out_dir, folder, last_return, f"{basename}_{t}.tif"))
+
+        if multiband:
+            out_name = os.path.join(out_dir, f"{basename}_grids.tif")
+            if os.path.exists(out_name):
+                return
+        else:
+            outputs = {
+                product: (description, out_name)
+                for product, (description, out_name) in outputs.items()
+                if not os.path.exists(out_name)
+            }
+
+        if not outputs:
+            return
+
+        grid = Grid()
+        grid.set_crs(epsgCode)
+        products = grid.stream_products(in_file, list(outputs.keys()))
+
+        if multiband:
+            bands = {description: products[product] for product, (description, _) in outputs.items()}
+            grid.write_bands(out_name, bands)
+        else:
+            for product, (_, out_name) in outputs.items():
+                grid.data_out = products[product]
+                grid.write(out_name)
+
+        grid.reset()
 
     except Exception as e:
         print(f'{filename} grid process failed with exception: \n{e}\n')
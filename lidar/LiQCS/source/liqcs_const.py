@@ -79,7 +79,7 @@ class LiqcsTests:
         },
         LASZY:{
             "Name": "Laszy",
-            "Description": "Generate a json file for each las/laz file."
+            "Description": "Summarize each las/laz file to the Laszy summary store (parquet)."
         },
         LASZY_SUMMARY:{
             "Name": "Laszy Summary",
@@ -249,6 +249,44 @@ class GridType:
     }
 
 
+# ===============================================================
+# -- Valid grid reducers
+# ===============================================================
+class GridReducer:
+
+    """
+    Per-cell reducer strings consts.
+
+    @param COUNT: "count"
+    @param SUM: "sum"
+    @param MEAN: "mean"
+    @param MIN: "min"
+    @param MAX: "max"
+    @param STD: "std"
+    @param TYPES: All reducers in list.
+    @param DIMENSIONS: Point dimensions that may be reduced.
+    """
+
+    COUNT = "count"
+    SUM = "sum"
+    MEAN = "mean"
+    MIN = "min"
+    MAX = "max"
+    STD = "std"
+    TYPES = [
+        COUNT,
+        SUM,
+        MEAN,
+        MIN,
+        MAX,
+        STD
+    ]
+    DIMENSIONS = [
+        "intensity",
+        "z"
+    ]
+
+
 # ===============================================================
 # -- EPSG codes
 # ===============================================================
@@ -300,6 +338,7 @@ class Strings:
     @param VOIDS: "voids"
     @param GRIDS: "grids"
     @param LASZY: "laszy"
+    @param LASZY_STORE: "laszy_store"
     @param DENSITY: "density"
     @param INTENSITY: "intensity"
     @param FORMATTING: "formatting"
@@ -314,6 +353,7 @@ class Strings:
     INTENSITY = "intensity"
     FORMATTING = "formatting"
     LASZY_JSON = "laszy_json"
+    LASZY_STORE = "laszy_store"
     LAST_RETURN = "last_return"
     LASZY_REPORT = "laszy_report"
     LIDAR_EXTENTS = "LiDAR_Extents"
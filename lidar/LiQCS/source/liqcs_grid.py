@@ -8,7 +8,159 @@ from osgeo import osr
 from osgeo import gdal
 from math import floor, ceil
 
-from liqcs_const import ImageFormats
+from liqcs_const import ImageFormats, GridReducer, GridType
+
+
+class GridAccumulator:
+    """
+    Accumulate per-cell point statistics from flat cell indices.
+
+    Points are binned with np.bincount rather than visited one at a time,
+    so the cost of a grid is a handful of vectorized passes over the point
+    arrays. Statistics are kept as running totals, allowing points to be
+    added in several batches before the grids are read back.
+    """
+
+    def __init__(self, rows: int, cols: int, reducers: list = None):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        self.reducers = list(reducers) if reducers else [GridReducer.COUNT]
+        self.shift = None
+
+        for reducer in self.reducers:
+            if reducer not in GridReducer.TYPES:
+                raise ValueError(f"Invalid reducer: {reducer}")
+
+        self.count = np.zeros(self.size, dtype=np.int64)
+        self.sum = np.zeros(self.size, dtype=np.float64) if self.__needs_sum() else None
+        self.sum_sq = np.zeros(self.size, dtype=np.float64) if GridReducer.STD in self.reducers else None
+        self.min = np.full(self.size, np.inf) if GridReducer.MIN in self.reducers else None
+        self.max = np.full(self.size, -np.inf) if GridReducer.MAX in self.reducers else None
+
+    def flat_index(self, ind_x: np.ndarray, ind_y: np.ndarray) -> np.ndarray:
+        """
+        Convert column and row indices to flat cell indices.
+
+        Negative indices wrap around in the same manner as numpy indexing,
+        and indices beyond the grid extent raise an IndexError.
+
+        @param ind_x: Array of column indices.
+        @param ind_y: Array of row indices.
+        @return: Array of flat cell indices.
+        """
+
+        if ind_x.size > 0:
+            x_out = (ind_x.min() < -self.cols) or (ind_x.max() >= self.cols)
+            y_out = (ind_y.min() < -self.rows) or (ind_y.max() >= self.rows)
+            if x_out or y_out:
+                raise IndexError("Point coordinates fall outside of the grid extent.")
+
+        ind_x = np.mod(ind_x, self.cols, dtype=np.int64)
+        ind_y = np.mod(ind_y, self.rows, dtype=np.int64)
+
+        return ind_y * self.cols + ind_x
+
+    def add(self, flat: np.ndarray, values: np.ndarray = None):
+        """
+        Add points to the running cell statistics.
+
+        @param flat: Array of flat cell indices (see flat_index()).
+        @param values: Point values to reduce. Required for all reducers other than count.
+        """
+
+        self.count += np.bincount(flat, minlength=self.size)
+
+        if self.reducers == [GridReducer.COUNT] or flat.size == 0:
+            return
+
+        if values is None:
+            raise ValueError("Values are required for reducers other than count.")
+
+        values = np.asarray(values, dtype=np.float64)
+
+        if self.sum is not None:
+            # shift values by a reference to keep the sum of squares well-conditioned
+            if self.shift is None:
+                self.shift = values[0] if self.sum_sq is not None else 0.0
+            shifted = values - self.shift
+            self.sum += np.bincount(flat, weights=shifted, minlength=self.size)
+            if self.sum_sq is not None:
+                self.sum_sq += np.bincount(flat, weights=shifted * shifted, minlength=self.size)
+
+        if (self.min is not None) or (self.max is not None):
+            order = np.argsort(flat, kind="stable")
+            flat_sorted = flat[order]
+            values_sorted = values[order]
+            starts = np.flatnonzero(np.r_[True, flat_sorted[1:] != flat_sorted[:-1]])
+            cells = flat_sorted[starts]
+            if self.min is not None:
+                self.min[cells] = np.minimum(self.min[cells], np.minimum.reduceat(values_sorted, starts))
+            if self.max is not None:
+                self.max[cells] = np.maximum(self.max[cells], np.maximum.reduceat(values_sorted, starts))
+
+    def counts(self) -> np.ndarray:
+        """
+        Get the number of points in each cell.
+
+        @return: 2D array of point counts.
+        """
+
+        return self.count.reshape(self.rows, self.cols)
+
+    def sums(self) -> np.ndarray:
+        """
+        Get the sum of point values in each cell.
+
+        @return: 2D array of value sums.
+        """
+
+        return (self.sum + self.count * (self.shift or 0.0)).reshape(self.rows, self.cols)
+
+    def reduce(self, reducer: str, no_data=0) -> np.ndarray:
+        """
+        Get the grid of a single reducer.
+
+        @param reducer: Reducer name (See GridReducer in liqcs_const.py)
+        @param no_data: Value assigned to cells containing no points.
+        @return: 2D array of reduced values.
+        """
+
+        if reducer not in self.reducers:
+            raise ValueError(f"Reducer '{reducer}' was not accumulated.")
+
+        count = self.count
+        has_data = count > 0
+        count_no_zero = np.where(has_data, count, 1)
+
+        if reducer == GridReducer.COUNT:
+            out = count.astype(np.float64)
+        elif reducer == GridReducer.SUM:
+            out = self.sums().ravel()
+        elif reducer == GridReducer.MEAN:
+            out = self.sums().ravel() / count_no_zero
+        elif reducer == GridReducer.MIN:
+            out = self.min.copy()
+        elif reducer == GridReducer.MAX:
+            out = self.max.copy()
+        else:
+            mean_shifted = self.sum / count_no_zero
+            variance = np.maximum(self.sum_sq / count_no_zero - mean_shifted * mean_shifted, 0.0)
+            out = np.sqrt(variance)
+
+        out[~has_data] = no_data
+
+        return out.reshape(self.rows, self.cols)
+
+    def __needs_sum(self) -> bool:
+        """
+        Determine whether a running sum is required by the selected reducers.
+        """
+
+        return any(
+            r in self.reducers
+            for r in (GridReducer.SUM, GridReducer.MEAN, GridReducer.STD)
+        )
 
 
 class Grid:
@@ -28,6 +180,7 @@ class Grid:
         self.max = None
         self.verbose = False
         self.err = os.getcwd()
+        self.chunk_size = 5_000_000
 
     def set_err(self, err_dir: str):
         """
@@ -111,42 +264,175 @@ class Grid:
         """
 
         self.NO_DATA_VALUE = 0
+        self.__set_rows_cols()
 
-        # Get x and y axis distances (m) from las file
-        dist_x, dist_y = self.get_las_xy_dimensions()
+        # apply filter to points based on class and/or last return
+        if intensity:
+            self.__compute_intensity(self.data_in.x, self.data_in.y)
+        else:
+            las_x, las_y = self.filter_points(cls, last_return)
+            self.__compute_density(las_x, las_y)
 
-        # calculate number of columns for raster grid
-        self.cols = int(dist_x / self.cell_size)
-        # self.col += 1
-        self.rows = int(dist_y / self.cell_size)
-        # self.row += 1
+        self.data_out = np.delete(self.data_out, 0, axis=0)
+
+    def compute_stats(
+            self, reducers: list, dimension: str = "intensity",
+            cls: int = None, last_return: bool = False) -> dict:
+        """
+        Create several per-cell statistics grids in a single pass over the points.
+
+        @precondition: User must make a valid call to read_lidar(), such that Grid->data points to valid LAS/LAZ file.
+        @param reducers: List of reducer names (See GridReducer in liqcs_const.py)
+        @param dimension: Point dimension to reduce (See GridReducer.DIMENSIONS)
+        @param cls: Integer indicating class number you wish to filter by.
+        @param last_return: Bool value indicating whether the points should be filtered by last return.
+        @return: Dictionary mapping each reducer name to a 2D array of float64 values.
+        """
+
+        if dimension not in GridReducer.DIMENSIONS:
+            raise ValueError(f"Invalid dimension: {dimension}")
+
+        self.NO_DATA_VALUE = 0
+        self.__set_rows_cols()
+
+        mask = self.filter_mask(cls, last_return)
+        las_x, las_y = self.data_in.x, self.data_in.y
+        values = np.asarray(getattr(self.data_in, dimension))
+        if mask is not None:
+            las_x, las_y, values = las_x[mask], las_y[mask], values[mask]
+
+        accumulator = GridAccumulator(self.rows, self.cols, reducers)
+        accumulator.add(self.cell_index(accumulator, las_x, las_y), values)
+
+        return {
+            reducer: np.delete(accumulator.reduce(reducer, self.NO_DATA_VALUE), 0, axis=0)
+            for reducer in accumulator.reducers
+        }
+
+    def compute_products(self, products: list) -> dict:
+        """
+        Create several density and/or intensity grids from a single cell index.
+
+        The cell index of every point is computed once and shared by all
+        requested products, rather than re-filtering and re-projecting the
+        X/Y arrays for each product as successive calls to compute() would.
+
+        @precondition: User must make a valid call to read_lidar(), such that Grid->data points to valid LAS/LAZ file.
+        @param products: List of class numbers (density by class), GridType.LAST_RETURN and/or GridType.INTENSITY.
+        @return: Dictionary mapping each requested product to its 2D int32 array.
+        """
+
+        self.NO_DATA_VALUE = 0
+        self.__set_rows_cols()
+
+        accumulators = self.__product_accumulators(products)
+        self.__accumulate_products(accumulators, self.data_in)
+
+        return self.__finalize_products(accumulators)
+
+    def stream_products(self, filepath: str, products: list, chunk_size: int = None) -> dict:
+        """
+        Create several density and/or intensity grids by streaming points from file.
+
+        Points are read in chunks of 'chunk_size' and accumulated into the
+        grids incrementally, so peak memory is bounded by the chunk size rather
+        than the number of points in the file. The resulting grids are identical
+        to those of read_lidar() followed by compute_products().
+
+        @param filepath: Path to input LAS/LAZ file
+        @param products: List of class numbers (density by class), GridType.LAST_RETURN and/or GridType.INTENSITY.
+        @param chunk_size: Number of points per chunk. Defaults to Grid->chunk_size.
+        @return: Dictionary mapping each requested product to its 2D int32 array.
+        """
+
+        chunk_size = chunk_size or self.chunk_size
+
+        try:
+            with laspy.open(filepath, laz_backend=laspy.LazBackend.LazrsParallel) as reader:
+                self.__set_min_max(reader.header)
+                self.NO_DATA_VALUE = 0
+                self.__set_rows_cols()
+
+                accumulators = self.__product_accumulators(products)
+                for points in reader.chunk_iterator(chunk_size):
+                    self.__accumulate_products(accumulators, points)
+
+        except Exception as e:
+            print(f'Error opening {filepath}, file may be corrupt...\n')
+            with open(os.path.join(self.err, "lidar_read_errors.txt"), mode='a+') as f:
+                f.write(f"{filepath}: {e}\n")
+            raise
+
+        return self.__finalize_products(accumulators)
+
+    def __product_accumulators(self, products: list) -> dict:
+        """
+        Create an empty GridAccumulator for each grid product.
+        """
+
+        return {
+            product: GridAccumulator(
+                self.rows, self.cols,
+                [GridReducer.MEAN] if (product == GridType.INTENSITY) else [GridReducer.COUNT]
+            )
+            for product in products
+        }
+
+    def __accumulate_products(self, accumulators: dict, points):
+        """
+        Add a set of points to each grid product, sharing one cell index.
+        """
+
+        if not accumulators:
+            return
+
+        flat = self.cell_index(next(iter(accumulators.values())), points.x, points.y)
+
+        for product, accumulator in accumulators.items():
+            if product == GridType.INTENSITY:
+                accumulator.add(flat, points.intensity)
+            else:
+                last_return = (product == GridType.LAST_RETURN)
+                mask = self.filter_mask(None if last_return else product, last_return, points)
+                accumulator.add(flat[mask])
+
+    def __finalize_products(self, accumulators: dict) -> dict:
+        """
+        Convert accumulated grid products to output arrays.
+        """
+
+        out = {}
+        for product, accumulator in accumulators.items():
+            if product == GridType.INTENSITY:
+                data = self.intensity_from_sums(accumulator.counts(), accumulator.sums())
+            else:
+                data = self.density_from_counts(accumulator.counts())
+
+            out[product] = np.delete(data, 0, axis=0)
+
+        return out
 
-        # Create empty numpy array to write values to
-        count = np.zeros((self.rows, self.cols)).astype(np.int32)
+    def cell_index(self, accumulator: GridAccumulator, las_x: np.ndarray, las_y: np.ndarray) -> np.ndarray:
+        """
+        Scale or "project" point coordinates to flat grid cell indices.
+
+        @param accumulator: GridAccumulator sized to the grid.
+        @param las_x: Array of X coordinates.
+        @param las_y: Array of Y coordinates.
+        @return: Array of flat cell indices.
+        """
 
         # Apply -1 to have negative y resolution for raster
         ycell = -1 * self.cell_size
 
-        # apply filter to points based on class and/or last return
-        if intensity:
-            las_x, las_y = self.data_in.x, self.data_in.y
-        else:
-            las_x, las_y = self.filter_points(cls, last_return)
-
-        # Scale or "project" values  of lidar data to grid,
         scale_x = (las_x - self.min[0]) / self.cell_size
         scale_y = (las_y - self.min[1]) / ycell
 
-        # Change type to integer and save as variables to use for index values
+        # Change type to integer to use as index values
         ind_x = scale_x.astype(np.int32)
         ind_y = scale_y.astype(np.int32)
 
-        if intensity:
-            self.__compute_intensity(count, ind_x, ind_y)
-        else:
-            self.__compute_density(count, ind_x, ind_y)
-
-        self.data_out = np.delete(self.data_out, 0, axis=0)
+        return accumulator.flat_index(ind_x, ind_y)
 
     def filter_points(self, cls: int, last_return: bool) -> tuple:
         """
@@ -158,57 +444,88 @@ class Grid:
         las = self.data_in
         las_x, las_y = las.x, las.y
 
+        mask = self.filter_mask(cls, last_return)
+        if mask is not None:
+            las_x, las_y = las_x[mask], las_y[mask]
+
+        return las_x, las_y
+
+    def filter_mask(self, cls: int, last_return: bool, points=None):
+        """
+        Get the boolean point mask for a class and/or last return filter.
+
+        @param cls: Integer indicating class number you wish to filter by.
+        @param last_return: Boolean indicating whether to filter by last return.
+        @param points: Points to filter. Defaults to Grid->data_in.
+        @return: Boolean array, or None if no filter applies.
+        """
+
+        las = self.data_in if points is None else points
+
         if last_return and cls:
-            las_x = las_x[(las.num_returns == las.return_num) & (las.classification == cls)]
-            las_y = las_y[(las.num_returns == las.return_num) & (las.classification == cls)]
+            return (las.num_returns == las.return_num) & (las.classification == cls)
 
         elif last_return:
-            las_x = las_x[las.num_returns == las.return_num]
-            las_y = las_y[las.num_returns == las.return_num]
+            return las.num_returns == las.return_num
 
         elif cls:
-            las_x = las_x[las.classification == cls]
-            las_y = las_y[las.classification == cls]
+            return las.classification == cls
 
-        return las_x, las_y
+        return None
 
-    def __compute_intensity(self, count, ind_x, ind_y):
+    def __compute_intensity(self, las_x, las_y):
         """
         Compute intensity from Grid->data.
 
-        A private method for encapsulation of density computation.
+        A private method for encapsulation of intensity computation.
         """
-        int_sum = np.zeros((self.rows, self.cols)).astype(np.int32)
-        # Runtime bottleneck - This is O(n) WRT the number of points in the point cloud
-        # We can't do better than this without sacrificing accuracy
-        for x, y, i in np.nditer([ind_x, ind_y, self.data_in.intensity]):
-            count[y, x] += 1
-            int_sum[y, x] += i
-        # Fill areas lacking data with 1 to avoid divide by zero error
-        count_no_zero = (np.where(count > 0, count, 1)).astype(np.int32)
-        # calculate intensity
-        int_avg = (int_sum / count_no_zero).astype(np.int32)
-        # Interpolate 0 values in array to avoid any holes in data
-        self.data_out = np.where(
-            np.logical_and(int_avg > 1, int_avg != 0),
-            int_avg, self.NO_DATA_VALUE
-        ).astype(np.int32)
 
-    def __compute_density(self, count, ind_x, ind_y):
+        accumulator = GridAccumulator(self.rows, self.cols, [GridReducer.MEAN])
+        accumulator.add(self.cell_index(accumulator, las_x, las_y), self.data_in.intensity)
+        self.data_out = self.intensity_from_sums(accumulator.counts(), accumulator.sums())
+
+    def __compute_density(self, las_x, las_y):
         """
         Compute density from Grid->data.
 
         A private method for encapsulation of density computation.
         """
 
-        # Runtime bottleneck - This is O(n) WRT the number of points in the point cloud
-        # We can't do better than this without sacrificing accuracy
-        for x, y in np.nditer([ind_x, ind_y]):
-            count[y, x] += 1
+        accumulator = GridAccumulator(self.rows, self.cols)
+        accumulator.add(self.cell_index(accumulator, las_x, las_y))
+        self.data_out = self.density_from_counts(accumulator.counts())
+
+    def density_from_counts(self, count: np.ndarray) -> np.ndarray:
+        """
+        Convert per-cell point counts to a density grid.
+
+        @param count: 2D array of point counts.
+        @return: 2D int32 array of densities.
+        """
+
         # Fill areas lacking data with keyword argument specified no data value
         count_no_data = (np.where(count > 0, count, self.NO_DATA_VALUE)).astype(np.int32)
         # calculate density
-        self.data_out = (count_no_data / self.cell_size).astype(np.int32)
+        return (count_no_data / self.cell_size).astype(np.int32)
+
+    def intensity_from_sums(self, count: np.ndarray, int_sum: np.ndarray) -> np.ndarray:
+        """
+        Convert per-cell point counts and intensity sums to an intensity grid.
+
+        @param count: 2D array of point counts.
+        @param int_sum: 2D array of intensity sums.
+        @return: 2D int32 array of average intensities.
+        """
+
+        # Fill areas lacking data with 1 to avoid divide by zero error
+        count_no_zero = (np.where(count > 0, count, 1)).astype(np.int32)
+        # calculate intensity
+        int_avg = (int_sum / count_no_zero).astype(np.int32)
+        # Interpolate 0 values in array to avoid any holes in data
+        return np.where(
+            np.logical_and(int_avg > 1, int_avg != 0),
+            int_avg, self.NO_DATA_VALUE
+        ).astype(np.int32)
 
     def write(self, out_name: str = "", out_fmt: str = "tif"):
         """
@@ -234,37 +551,54 @@ class Grid:
         elif (out_fmt == ImageFormats.GEOTIFF) or (out_fmt == ImageFormats.GEOTIF):
             # Create new raster and write array to image
 
-            # Get geotiff driver
-            driver = gdal.GetDriverByName('GTiff')
-
             if self.data_out is not None:
-                # Create raster object
-                out_img = driver.Create(
-                    out_name, self.cols, self.rows, 1, gdal.GDT_Int32,
-                    options=['COMPRESS=LZW', 'NUM_THREADS=ALL_CPUS']
-                )
-
-                # Set positional parameters
-                out_img.SetGeoTransform(
-                    (
-                        floor(self.min[0]), self.cell_size, 0,
-                        ceil(self.max[1]), 0, self.cell_size * -1
-                    )
-                )
-
-                out_band = out_img.GetRasterBand(1)  # get band from raster object
-                out_band.SetNoDataValue(self.NO_DATA_VALUE)
-                out_band.WriteArray(self.data_out)  # write array to raster band
-                # write wkt proj metadata to image if it exists
-                if self.crs is not None:
-                    out_img.SetProjection(self.crs)
-                out_band.FlushCache()
-                out_img = None  # Necessary to free dynamically allocated memory created by GDAL - do not remove
+                self.write_bands(out_name, {"": self.data_out})
             else:
                 raise Exception('No array attribute found for grid object')
         else:
             raise Exception(f'Invalid format: {out_fmt}')
 
+    def write_bands(self, out_name: str, bands: dict):
+        """
+        Write one or more rasterized lidar arrays to a GeoTIFF, one band per array.
+
+        @param out_name: Output file name.
+        @param bands: Dictionary mapping band descriptions to 2D int32 arrays (See compute_products()).
+        """
+
+        if not bands:
+            raise Exception('No array attribute found for grid object')
+
+        # Get geotiff driver
+        driver = gdal.GetDriverByName('GTiff')
+
+        # Create raster object
+        out_img = driver.Create(
+            out_name, self.cols, self.rows, len(bands), gdal.GDT_Int32,
+            options=['COMPRESS=LZW', 'NUM_THREADS=ALL_CPUS']
+        )
+
+        # Set positional parameters
+        out_img.SetGeoTransform(
+            (
+                floor(self.min[0]), self.cell_size, 0,
+                ceil(self.max[1]), 0, self.cell_size * -1
+            )
+        )
+
+        for i, (description, data) in enumerate(bands.items(), start=1):
+            out_band = out_img.GetRasterBand(i)  # get band from raster object
+            out_band.SetNoDataValue(self.NO_DATA_VALUE)
+            if description:
+                out_band.SetDescription(str(description))
+            out_band.WriteArray(data)  # write array to raster band
+            out_band.FlushCache()
+
+        # write wkt proj metadata to image if it exists
+        if self.crs is not None:
+            out_img.SetProjection(self.crs)
+        out_img = None  # Necessary to free dynamically allocated memory created by GDAL - do not remove
+
     def create_ascii_header(self) -> str:
         """
         @precondition: User must first make a successful call to create_grid()
@@ -281,25 +615,42 @@ class Grid:
 
         return header
 
-    def __set_min_max(self):
+    def __set_min_max(self, header=None):
         """
         Set the minimum and maximum X,Y values for the grid surface.
 
         Private helper method to set the minimum and maximum
         values for the resulting grid sruface.
+
+        @param header: LAS header to read bounds from. Defaults to the header of Grid->data_in.
         """
 
-        las = self.data_in
+        header = self.data_in.header if header is None else header
 
         self.min = [
-            floor(las.header.x_min),
-            floor(las.header.y_min)
+            floor(header.x_min),
+            floor(header.y_min)
         ]
         self.max = [
-            floor(las.header.x_max) + 1,
-            floor(las.header.y_max) + 1
+            floor(header.x_max) + 1,
+            floor(header.y_max) + 1
         ]
 
+    def __set_rows_cols(self):
+        """
+        Set the number of rows and columns of the grid surface.
+
+        Private helper method to size the grid from the
+        minimum and maximum values and the cell size.
+        """
+
+        # Get x and y axis distances (m) from las file
+        dist_x, dist_y = self.get_las_xy_dimensions()
+
+        # calculate number of columns for raster grid
+        self.cols = int(dist_x / self.cell_size)
+        self.rows = int(dist_y / self.cell_size)
+
     def get_las_xy_dimensions(self) -> tuple:
         """
         Get the x and y dimensions of a las file,
@@ -76,32 +76,29 @@ def check_min_max_x_y(input_dir: str, report_path: str = None) -> str:
     """
 
     re_lidar = r'(.laz$|.las$)'
-    lidar_file_count = 0
-    min_max_x_y_error_list = []
 
-    # Traverse all files in input directory
-    for root, subFolder, files in (os.walk(input_dir)):
-        for file in files:
-            # Identify las/laz files in input directory
-            if re.search(re_lidar, file):
-                # Count the number of las/laz files in the input directory
-                lidar_file_count += 1
+    # Traverse all files in input directory, and identify las/laz files
+    lidar_file_paths = [
+        os.path.join(root, file)
+        for root, subFolder, files in os.walk(input_dir)
+        for file in files
+        if re.search(re_lidar, file)
+    ]
 
-                # Get the full path of the lidar file
-                lidar_file_path = os.path.join(root, file)
+    # Count the number of las/laz files in the input directory
+    lidar_file_count = len(lidar_file_paths)
 
-                # Get the las header attributes from the liqcs_lasattr object.
-                hdr = liqcs_parse_header.parse_header(lidar_file_path)
+    # Only write output if there were lidar files in the input directory
+    if lidar_file_count:
 
-                # Check for errors in the x/y min/max attributes
-                is_extent_error = (hdr["xmin"] >= hdr["xmax"]) or (hdr["ymin"] == hdr["ymax"])
+        # Get the las header attributes of all of the lidar files at once
+        hdrs = liqcs_parse_header.parse_headers(lidar_file_paths)
 
-                # Add lidar file path to list if it has an error
-                if is_extent_error:
-                    min_max_x_y_error_list.append(lidar_file_path)
+        # Check for errors in the x/y min/max attributes
+        is_extent_error = (hdrs["xmin"] >= hdrs["xmax"]) | (hdrs["ymin"] == hdrs["ymax"])
 
-    # Only write output if there were lidar files in the input directory
-    if lidar_file_count:
+        # List the lidar file paths with an error
+        min_max_x_y_error_list = hdrs.loc[is_extent_error, "infile"].tolist()
 
         # Generate text for output report
         error_report_text = generate_text_for_report(
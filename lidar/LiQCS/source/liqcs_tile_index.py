@@ -1,118 +1,127 @@
 from shapely import speedups, geometry
 from fiona.crs import from_epsg
-from rsge_toolbox.lidar import Laszy
 from rsge_toolbox.util import WktCrsInfo
-import shapely.geometry
+from rsge_toolbox.lidar.LasHeader import read_wkt
+import concurrent.futures
 import geopandas as gpd
 import pandas as pd
-import laspy
+import functools
 import datetime
-import re
 import os
 
 from liqcs_parse_header import parse_header
 
+try:
+    from shapely import box as box_array  # vectorized, shapely >= 2.0
+except ImportError:
+    box_array = None
 
-def tile_index(file_list: list, contract: str, out_dir: str):
+
+def tile_index(file_list: list, contract: str, out_dir: str, workers: int = None):
 
     """
     Write tile index geometry to a gpkg file.
 
     @param file_list: List of LAS/LAZ files.
-    @param epsg: Output EPSG code.
     @param contract: Contract number of project (?)
     @param out_dir: Output directory.
+    @param workers: Number of threads reading headers (default: concurrent.futures default).
     """
 
-    gdf = gpd.GeoDataFrame(columns=["map_tile", "file", "geometry", "contract_number"])
-    tiles = [bounding_box(f) for f in file_list]
-    contract_list = [contract] * len(file_list)
-    gdf = append_to_gdf(tiles, file_list, gdf, contract_list)
+    tiles = read_tiles(file_list, workers)
+
+    speedups.disable()
+    gdf = gpd.GeoDataFrame(
+        {
+            "map_tile": [os.path.basename(file)[3:16] for file in file_list],
+            "file": file_list,
+            "geometry": bounding_boxes(tiles["xmin"], tiles["ymin"], tiles["xmax"], tiles["ymax"]),
+            "contract_number": contract
+        },
+        geometry="geometry"
+    )
 
     out_dir = out_dir + '/Tile_Index/'
     if not os.path.exists(out_dir):
         os.makedirs(out_dir)
     os.chdir(out_dir)
 
-    fileByEpsg = getProjectionsFromInput(file_list, out_dir)
+    fileByEpsg = getProjectionsFromInput(file_list, out_dir, tiles["epsg"])
     __write_tile_index(fileByEpsg, contract, out_dir, gdf)
 
 
-def bounding_box(file: str) -> shapely.geometry.Polygon:
+def read_tiles(file_list: list, workers: int = None) -> pd.DataFrame:
+
+    """
+    Read the bounds and EPSG code of each LAS/LAZ file.
+
+    Each file's header and WKT are read once, in a thread pool (the work is I/O-bound).
+
+    @param file_list: List of LAS/LAZ files.
+    @param workers: Number of threads reading headers (default: concurrent.futures default).
+    @return: DataFrame of xmin, ymin, xmax, ymax and epsg, one row per file, in the order of file_list.
+    """
+
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        rows = list(executor.map(read_tile, file_list))
+
+    return pd.DataFrame(rows, columns=["xmin", "ymin", "xmax", "ymax", "epsg"])
+
+
+def read_tile(file: str) -> tuple:
 
     """
-    Create shapely.geometry.Polygon from input LAS/LAZ file.
+    Read the bounds and EPSG code of a LAS/LAZ file from its header and WKT.
 
     @param file: input LAS/LAZ file.
-    @return: shapely.geometry.Polygon object representing bounding box of input file.
+    @return: tuple -> (xmin, ymin, xmax, ymax, epsg). epsg is -1 if not found.
     """
 
-    # parse las/laz header body
-    hdr = parse_header(file, verbose=False)
+    # parse las/laz header body (and VLRs, for the WKT)
+    hdr = parse_header(file, vlrs=True)
+    epsg = wkt_epsg(read_wkt(file, hdr))
 
-    # gt min/max from las/laz header
-    xmin, xmax, ymin, ymax = [hdr['xmin'], hdr['xmax'], hdr['ymin'], hdr['ymax']]
+    return hdr['xmin'], hdr['ymin'], hdr['xmax'], hdr['ymax'], epsg
 
-    # Create polygon from bounding box of las file
-    speedups.disable()
-    bbox_poly = geometry.Polygon(
-        [
-            (xmin, ymax),
-            (xmax, ymax),
-            (xmax, ymin),
-            (xmin, ymin),
-            (xmin, ymax),
-        ]
-    )
 
-    return bbox_poly
+@functools.lru_cache(maxsize=None)
+def wkt_epsg(wkt_str: str) -> int:
 
+    """
+    Get the EPSG code of the projected CRS of a WKT string.
 
-def append_to_gdf(geom_list: list, file_list: list, gdf: gpd.GeoDataFrame, contract: list[str]) -> gpd.GeoDataFrame:
+    The tiles of a project almost always share one WKT, so each WKT is only parsed once.
 
+    @param wkt_str: WKT string.
+    @return: EPSG code if successful, else, -1
     """
 
-    @param geom_list: List of bounding box geometries.
-    @param file_list: List of filenames.
-    @param gdf: GeoDataFrame to append to.
-    @param contract: Contract number of project (?)
-    @return: GeoDataFrame with appended geometries and other fields.
+    return WktCrsInfo.WktCrsInfo(wkt_str).get_proj_epsg()
+
+
+def bounding_boxes(xmin, ymin, xmax, ymax) -> gpd.GeoSeries:
+
     """
+    Create bounding box polygons from columns of bounds.
 
-    for geom, file, contract_number in zip(geom_list, file_list, contract):
+    @return: GeoSeries of shapely.geometry.Polygon objects.
+    """
 
-        filename = os.path.basename(file)
-        tile = filename[3:16]
+    if box_array is not None:
+        return gpd.GeoSeries(box_array(xmin, ymin, xmax, ymax))
 
-        # append to dataframe
-        gdf = pd.concat(
-            [
-                gdf, gpd.GeoDataFrame.from_records(
-                    [
-                        {
-                            "map_tile": tile, "file": file,
-                            "geometry": geom, "contract_number": contract_number
-                        }
-                    ]
-                )
-            ], ignore_index=True)
+    return gpd.GeoSeries([geometry.box(*bounds) for bounds in zip(xmin, ymin, xmax, ymax)])
 
-    return gdf
 
-def getProjectionsFromInput(file_list: list, out_dir: str):
+def getProjectionsFromInput(file_list: list, out_dir: str, epsg_list: list):
     fileByEpsg={}
     projectionsNotFound = []
-    
-    for file in file_list:
-        las = Laszy.Laszy(file, read_points=False)
-        wkt_str = las.get_crs_info()
-        crsinfo = WktCrsInfo.WktCrsInfo(wkt_str)
-        epsg = crsinfo.get_proj_epsg()
-        
+
+    for file, epsg in zip(file_list, epsg_list):
         if epsg == -1:
             projectionsNotFound.append(file)
             continue
-        
+
         if epsg not in fileByEpsg:
             fileByEpsg[epsg] = []
         fileByEpsg[epsg].append(file)
@@ -128,15 +137,16 @@ def getProjectionsFromInput(file_list: list, out_dir: str):
 def __write_tile_index(fileByEpsg: dict, contract: str, out_dir: str, tile_gdf: gpd.GeoDataFrame):
 
     """
-    @param contract:
-    @param out_dir:
-    @param tile_gdf:
-    @param epsg_code:
-    @return:
+    Write the tiles of each EPSG code to their own layer of the gpkg file.
+
+    @param fileByEpsg: Dictionary of lists of files, by EPSG code.
+    @param contract: Contract number of project (?)
+    @param out_dir: Output directory.
+    @param tile_gdf: Tile index GeoDataFrame.
     """
 
-    for epsg in fileByEpsg:
+    for epsg, files in fileByEpsg.items():
         out_name = f"tile_index_{contract}_{datetime.date.today()}.gpkg"
-        tile_gdf.crs = from_epsg(epsg)
+        epsg_gdf = tile_gdf[tile_gdf["file"].isin(files)].set_crs(from_epsg(epsg), allow_override=True)
         bbox_tiles_gpkg = os.path.join(out_dir, out_name)
-        tile_gdf.to_file(bbox_tiles_gpkg, layer=str(epsg), driver='GPKG')
+        epsg_gdf.to_file(bbox_tiles_gpkg, layer=str(epsg), driver='GPKG')
@@ -1,8 +1,9 @@
 import os
 import pandas as pd
 from math import pi
-from shapely.geometry import Point
-from geopandas import GeoDataFrame
+from shapely.geometry import LineString
+from geopandas import GeoDataFrame, points_from_xy
+from pyproj import Transformer
 import numpy as np
 import sys
 import liqcs_config
@@ -10,9 +11,21 @@ import tkinter as tk
 from tkinter import Tk, filedialog, LEFT, ttk
 from glob import glob
 import subprocess
+import concurrent.futures
+import functools
+import multiprocessing
 
 from liqcs_const import EpsgCode
 
+try:
+    from shapely import linestrings  # vectorized, shapely >= 2.0
+except ImportError:
+    linestrings = None
+
+RAD_TO_DEG = 180 / pi
+EARTH_RADIUS = 6371000  # metres, mean radius; only used to space records for distance-based decimation
+METRES_PER_DEGREE = 111320  # at the equator; converts a line tolerance in metres for WGS84 output
+
 
 ###########################################################################
 # Get a list of the SBET record types
@@ -45,42 +58,135 @@ def sbet_record_types() -> list:
     ]
 
 
+SBET_DTYPE = np.dtype(sbet_record_types())
+
+
 def readSbet(filename: str) -> np.ndarray:
 
     """
-    Read an SBET file into a numpy array.
+    Memory-map an SBET file as a numpy array.
+
+    Records are only read from disk when they are used, so thinning the array
+    (e.g. sbet[::100]) doesn't read the whole file.
 
     @param filename: String of filename to read into a numpy array
     @return: np.ndarray of SBET data
     """
 
-    return np.fromfile(filename, dtype=np.dtype(sbet_record_types()))
+    # whole records only, like np.fromfile (np.memmap can't map an empty file)
+    num_records = os.path.getsize(filename) // SBET_DTYPE.itemsize
+    if num_records == 0:
+        return np.empty(0, dtype=SBET_DTYPE)
+
+    return np.memmap(filename, dtype=SBET_DTYPE, mode="r", shape=(num_records,))
+
+
+def decimate_sbet(sbet_array: np.ndarray, nth_point: int = 1, interval: float = None, distance: float = None) -> np.ndarray:
+
+    """
+    Thin SBET records by record count, time, and/or distance travelled.
+
+    The thinning steps are applied in that order.
+
+    @param sbet_array: np.ndarray of SBET data.
+    @param nth_point: Sample every Nth point
+    @param interval: Keep the first record of every 'interval' seconds (optional).
+    @param distance: Keep the first record of every 'distance' metres travelled (optional).
+    @return: np.ndarray of the SBET records kept.
+    """
+
+    sbet = sbet_array[::nth_point]
+
+    if interval and len(sbet):
+        time = sbet["time"]
+        sbet = sbet[_first_of_each_bin(np.floor((time - time[0]) / interval))]
+
+    if distance and len(sbet):
+        # along-track distance, from the lat/long of each record on a sphere (plenty for spacing records)
+        lat, lon = sbet["lat"], sbet["lon"]
+        step = np.hypot(np.diff(lat), np.diff(lon) * np.cos(lat[:-1])) * EARTH_RADIUS
+        along_track = np.concatenate(([0.0], np.cumsum(step)))
+        sbet = sbet[_first_of_each_bin(np.floor(along_track / distance))]
+
+    return sbet
+
+
+def _first_of_each_bin(bins: np.ndarray) -> np.ndarray:
+
+    """
+    @param bins: Bin number of each record (non-decreasing).
+    @return: Boolean mask of the first record in each bin.
+    """
+
+    return np.concatenate(([True], bins[1:] != bins[:-1]))
+
+
+@functools.lru_cache(maxsize=None)
+def _wgs84_transformer(epsg_code: int) -> Transformer:
+    return Transformer.from_crs(EpsgCode.WGS_84, epsg_code, always_xy=True)
+
+
+def project_sbet(lon: np.ndarray, lat: np.ndarray, epsg_code: int) -> tuple:
+
+    """
+    Project SBET longitudes and latitudes (degrees, WGS84) to a CRS, all at once.
+
+    @param lon: Longitudes in degrees.
+    @param lat: Latitudes in degrees.
+    @param epsg_code: EPSG code for output CRS.
+    @return: tuple -> (x, y) np.ndarrays in the output CRS.
+    """
+
+    # SBETS are not projected; they only have lats and longs,
+    # derived from GPS data, which uses WGS84 (EPSG:4326).
+    if epsg_code == EpsgCode.WGS_84:
+        return lon, lat
+
+    return _wgs84_transformer(epsg_code).transform(lon, lat)
+
+
+def _output_crs(epsg_code: int):
+
+    # If the desired output is WGS84, geopandas has a problem assigning
+    # EPSG as a coordinate system. The problem could be solved by changing
+    # the geopandas/pyproj installation parameters, but as a workaround,
+    # no CRS is assigned, which lets us keep 4326 as an output option without
+    # monkeying around with a fussy geopandas/pyproj  installation.
+    return None if epsg_code == EpsgCode.WGS_84 else f"EPSG:{epsg_code}"
 
 
-def sbet_to_geopandas(sbet_array: np.ndarray, epsg_code: int, nth_point: int = 100) -> GeoDataFrame:
+def sbet_to_geopandas(
+        sbet_array: np.ndarray,
+        epsg_code: int,
+        nth_point: int = 100,
+        interval: float = None,
+        distance: float = None
+) -> GeoDataFrame:
 
     """
-    Convert SBET np.ndarray to Geodataframe.
+    Convert SBET np.ndarray to Geodataframe of points.
 
     @param sbet_array: np.ndarray of SBET data.
     @param epsg_code: EPSG code for output CRS.
     @param nth_point: Sample every Nth point
+    @param interval: Keep the first record of every 'interval' seconds (optional).
+    @param distance: Keep the first record of every 'distance' metres travelled (optional).
     @return: GeoDataFrame
     """
 
-    # thin array to every 100th entry
-    sbet = sbet_array[::nth_point]
+    # thin array to every 100th entry (by default)
+    sbet = decimate_sbet(sbet_array, nth_point, interval, distance)
 
-    # put array into a pandas dataframe
+    # put array into a pandas dataframe, converting radians to degrees
     df = pd.DataFrame(
         {
             "time": sbet["time"],
-            "lat": sbet["lat"],
-            "long": sbet["lon"],
+            "lat": sbet["lat"] * RAD_TO_DEG,
+            "long": sbet["lon"] * RAD_TO_DEG,
             "altitude": sbet["alt"],
-            "roll": sbet["roll"],
-            "pitch": sbet["pitch"],
-            "heading": sbet["heading"],
+            "roll": sbet["roll"] * RAD_TO_DEG,
+            "pitch": sbet["pitch"] * RAD_TO_DEG,
+            "heading": sbet["heading"] * RAD_TO_DEG,
             "x_velocity": sbet["ewspeed"],
             "y_velocity": sbet["nsspeed"],
             "z_velocity": sbet["vertspeed"],
@@ -94,72 +200,152 @@ def sbet_to_geopandas(sbet_array: np.ndarray, epsg_code: int, nth_point: int = 1
         }
     )
 
-    # convert radians to degrees
-    df["lat"] = df["lat"] * (180 / pi)
-    df["long"] = df["long"] * (180 / pi)
+    # convert into geopandas dataframe, projecting all of the points at once
+    x, y = project_sbet(df["long"].to_numpy(), df["lat"].to_numpy(), epsg_code)
 
-    df["roll"] = df["roll"] * (180 / pi)
-    df["pitch"] = df["pitch"] * (180 / pi)
-    df["heading"] = df["heading"] * (180 / pi)
-    # df['wander'] = df['wander'] * (180/pi)
+    return GeoDataFrame(df, geometry=points_from_xy(x, y), crs=_output_crs(epsg_code))
 
-    # convert into geopandas dataframe
-    geometry = [Point(xy) for xy in zip(df.long, df.lat)]
-    gdf = GeoDataFrame(df, geometry=geometry)
 
-    # If the desired output is WGS84, geopandas has a problem assigning
-    # EPSG as a coordinate system. The problem could be solved by changing
-    # the geopandas/pyproj installation parameters, but as a workaround,
-    # this "if" clause lets us keep 4326 as an output option without
-    # monkeying around with a fussy geopandas/pyproj  installation.
-    if epsg_code != EpsgCode.WGS_84:
-        # Set coordinate reference system of geopandas dataframe.
-        # SBETS are not projected; they only have lats and longs,
-        # derived from GPS data, which uses WGS84.
-        # Therefore, the input data uses WGS84 (EPSG:4326).
-        gdf = gdf.set_crs(epsg=EpsgCode.WGS_84)
+def sbet_to_linestring(
+        sbet_array: np.ndarray,
+        epsg_code: int,
+        nth_point: int = 1,
+        interval: float = None,
+        distance: float = None,
+        tolerance: float = 1.0
+) -> GeoDataFrame:
+
+    """
+    Convert SBET np.ndarray to a Geodataframe of one simplified line.
+
+    A line of the flight path is a tiny fraction of the size of a point per record.
+
+    @param sbet_array: np.ndarray of SBET data.
+    @param epsg_code: EPSG code for output CRS.
+    @param nth_point: Sample every Nth point
+    @param interval: Keep the first record of every 'interval' seconds (optional).
+    @param distance: Keep the first record of every 'distance' metres travelled (optional).
+    @param tolerance: Simplify the line so it stays within 'tolerance' metres of the records (0 to not simplify).
+    @return: GeoDataFrame with one row, of the start and end time, number of records, and line.
+    """
+
+    sbet = decimate_sbet(sbet_array, nth_point, interval, distance)
 
-        # Re-project to desired coordinate reference system
-        gdf = gdf.to_crs(epsg=epsg_code)
+    if len(sbet) < 2:
+        raise ValueError(f"At least 2 SBET records are needed for a line ({len(sbet)} after thinning)")
 
-    return gdf
+    x, y = project_sbet(sbet["lon"] * RAD_TO_DEG, sbet["lat"] * RAD_TO_DEG, epsg_code)
+    coords = np.column_stack((x, y))
+    line = linestrings(coords) if linestrings is not None else LineString(coords)
 
+    if tolerance:
+        if epsg_code == EpsgCode.WGS_84:
+            tolerance = tolerance / METRES_PER_DEGREE
+        line = line.simplify(tolerance, preserve_topology=False)
+
+    return GeoDataFrame(
+        {
+            "start_time": [sbet["time"][0]],
+            "end_time": [sbet["time"][-1]],
+            "num_records": [len(sbet)],
+        },
+        geometry=[line],
+        crs=_output_crs(epsg_code)
+    )
 
-def traj_to_gpkg(sbet_files: list, out_dir: str, nth_point: int, epsg_code: int):
+
+def sbet_file_to_gpkg(
+        file: str,
+        out_dir: str,
+        nth_point: int,
+        epsg_code: int,
+        interval: float = None,
+        distance: float = None,
+        line_tolerance: float = None
+) -> str:
 
     """
-    Write Trajectory data vector geometry to gpkg file.
+    Write the Trajectory data of one SBET file to a gpkg file.
 
-    @param sbet_files: List of SBET files.
+    @param file: SBET file.
     @param out_dir: Desired output directory.
     @param nth_point: Sample every Nth point
     @param epsg_code: Desired output EPSG code.
+    @param interval: Keep the first record of every 'interval' seconds (optional).
+    @param distance: Keep the first record of every 'distance' metres travelled (optional).
+    @param line_tolerance: Write a line simplified to this tolerance in metres, instead of points (optional).
+    @return: Output gpkg file.
     """
 
-    for idx, file in enumerate(sbet_files, start=1):
-        basename = os.path.splitext(os.path.basename(file))[0]   # get basename of file for output 
+    basename = os.path.splitext(os.path.basename(file))[0]   # get basename of file for output
+    suffix = "_line" if line_tolerance is not None else ""
+    outfile = os.path.join(
+        out_dir,
+        f"{basename}_{__epsg_dict_with_WSG84()[epsg_code][1]}{suffix}.gpkg"
+    )
 
-        sbet = readSbet(file)   # read SBET file
-        gdf = sbet_to_geopandas(
-            sbet,
-            epsg_code,
-            nth_point
-        )   # translate SBET numpy array into geopandas df
+    sbet = readSbet(file)   # memory-map SBET file
 
-        outfile = os.path.join(
-            out_dir,
-            f"{basename}_{__epsg_dict_with_WSG84()[epsg_code][1]}.gpkg"
-        )
+    # translate SBET numpy array into geopandas df
+    if line_tolerance is not None:
+        gdf = sbet_to_linestring(sbet, epsg_code, nth_point, interval, distance, line_tolerance)
+    else:
+        gdf = sbet_to_geopandas(sbet, epsg_code, nth_point, interval, distance)
 
-        print(
-            f"\r Writing geopackage {idx} of {len(sbet_files)} "
-            f"using every {nth_point}th record of SBET "
-            f"to CRS: {__epsg_dict_with_WSG84()[epsg_code][0]}",
-            flush=True
-        )
+    # use geopandas built-in method to write gdf to a geopackage
+    gdf.to_file(outfile, driver='GPKG')
+
+    return outfile
+
+
+def traj_to_gpkg(
+        sbet_files: list,
+        out_dir: str,
+        nth_point: int,
+        epsg_code: int,
+        interval: float = None,
+        distance: float = None,
+        line_tolerance: float = None,
+        workers: int = None
+):
+
+    """
+    Write Trajectory data vector geometry to gpkg file.
+
+    Each SBET file is converted in its own process.
+
+    @param sbet_files: List of SBET files.
+    @param out_dir: Desired output directory.
+    @param nth_point: Sample every Nth point
+    @param epsg_code: Desired output EPSG code.
+    @param interval: Keep the first record of every 'interval' seconds (optional).
+    @param distance: Keep the first record of every 'distance' metres travelled (optional).
+    @param line_tolerance: Write a line simplified to this tolerance in metres, instead of points (optional).
+    @param workers: Number of processes (default: number of CPUs).
+    """
+
+    print(
+        f"\r Writing {len(sbet_files)} geopackage(s) "
+        f"using every {nth_point}th record of SBET "
+        f"to CRS: {__epsg_dict_with_WSG84()[epsg_code][0]}",
+        flush=True
+    )
+
+    convert = functools.partial(
+        sbet_file_to_gpkg,
+        out_dir=out_dir,
+        nth_point=nth_point,
+        epsg_code=epsg_code,
+        interval=interval,
+        distance=distance,
+        line_tolerance=line_tolerance
+    )
 
-        # use geopandas built-in method to write gdf to a geopackage
-        gdf.to_file(outfile, driver='GPKG')
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(convert, file) for file in sbet_files]
+        for idx, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+            outfile = future.result()
+            print(f"\r Wrote geopackage {idx} of {len(sbet_files)}: {outfile}", flush=True)
 
 
 def ___run_from_liqcs(infile_glob, outdir, epsg_code):
@@ -873,4 +1059,5 @@ def main():
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     main()
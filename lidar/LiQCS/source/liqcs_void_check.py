@@ -1,6 +1,15 @@
-from osgeo import gdal_array, ogr, gdal
+from rasterio.features import rasterize, shapes
+from rasterio.windows import Window
+from shapely.geometry import box, shape, mapping
+from shapely.strtree import STRtree
+from shapely.ops import unary_union
+from scipy import ndimage
+from osgeo import gdal
 from typing import Union
+import concurrent.futures
+import rasterio as rio
 import numpy as np
+import fiona
 import getopt
 import glob
 import sys
@@ -11,12 +20,120 @@ from liqcs_const import Strings
 # constants
 BUFFER_2300 = 2300
 VOID_THRESHOLD_500 = 500
+SIEVE_THRESHOLD_25 = 25     # void and data areas smaller than this (pixels) are sieved out
+BORDER_20 = 20              # pixels at the edge of a grid that are never counted as void
+MOSAIC_ROWS = 1024          # rows of the mosaic read at once
 MASK_SHP_FILENAME = "mask.shp"
+MOSAIC_VRT_FILENAME = "density_mosaic.vrt"
+VOIDS_SHP_FILENAME = "voids.shp"
 CSV_FILENAME = "voids_summary.csv"
 CSV_COLUMNS = 'filename, size of void (pixels)'
 
+EIGHT_CONNECTED = np.ones((3, 3), dtype=bool)
+
+# void mask of the worker processes of void_report (see _init_worker)
+_worker_mask = None
+
+
+class VoidMask:
+
+    """
+    Mask polygons (water bodies and the area around the AOI), in an STRtree,
+    so that only the polygons overlapping a grid are burned into it.
+
+    The STRtree can't be pickled, so it is rebuilt when a VoidMask is sent to another process.
+    """
+
+    def __init__(self, polygons: list):
+        self.polygons = list(polygons)
+        self.tree = STRtree(self.polygons)
+
+    def __getstate__(self):
+        return self.polygons
+
+    def __setstate__(self, polygons):
+        self.__init__(polygons)
+
+    def overlapping(self, bounds: tuple) -> list:
+
+        """
+        @param bounds: (xmin, ymin, xmax, ymax) of a grid.
+        @return: List of the mask polygons overlapping the bounds.
+        """
+
+        extent = box(*bounds)
+        hits = self.tree.query(extent)
+
+        # shapely >= 2.0 returns indices, shapely 1.8 returns geometries
+        if len(hits) and isinstance(hits[0], (int, np.integer)):
+            hits = [self.polygons[i] for i in hits]
+
+        return [polygon for polygon in hits if polygon.intersects(extent)]
+
+    def burn(self, covered: np.ndarray, transform, bounds: tuple):
+
+        """
+        Set the pixels of a grid covered by the mask to True.
+
+        @param covered: Boolean array of the grid's covered (not void) pixels. Updated in place.
+        @param transform: Affine transform of the grid.
+        @param bounds: (xmin, ymin, xmax, ymax) of the grid.
+        """
+
+        polygons = self.overlapping(bounds)
+        if polygons:
+            covered |= rasterize(
+                polygons, out_shape=covered.shape, transform=transform, fill=0, default_value=1, dtype="uint8"
+            ).astype(bool)
+
+
+def sieve(covered: np.ndarray, threshold: int = SIEVE_THRESHOLD_25) -> np.ndarray:
+
+    """
+    Remove void and data areas smaller than a threshold.
+
+    Small voids are filled, then small islands of data inside voids are removed,
+    like gdal.SieveFilter with 8-connectedness on a grid of 0s and 1s.
+
+    @param covered: Boolean array of covered (not void) pixels.
+    @param threshold: Areas smaller than this number of pixels are removed.
+    @return: Sieved boolean array of covered pixels.
+    """
+
+    covered = covered.copy()
+
+    for value in (False, True):
+        labels, _ = ndimage.label(covered == value, structure=EIGHT_CONNECTED)
+        small = np.bincount(labels.ravel()) < threshold
+        small[0] = False    # label 0 is the background (the other value)
+        covered[small[labels]] = not value
+
+    return covered
+
+
+def covered_pixels(density: np.ndarray, border: int = BORDER_20) -> np.ndarray:
 
-def void_compute(grid: str, out_dir: str, mask: ogr.Layer = None, write: bool = False) -> int:
+    """
+    Find the covered (not void) pixels of a density grid.
+
+    @param density: Density grid array.
+    @param border: Width in pixels of the edge of the grid that is always covered.
+    @return: Boolean array, True anywhere density > 0 or on the border.
+    """
+
+    covered = density > 0
+    if not border:
+        return covered
+
+    covered[:border] = True
+    covered[-border:] = True
+    covered[:, :border] = True
+    covered[:, -border:] = True
+
+    return covered
+
+
+def void_compute(grid: str, out_dir: str, mask: VoidMask = None, write: bool = False) -> int:
     """
     Create raster data used for void computation using vector mask.
 
@@ -25,14 +142,14 @@ def void_compute(grid: str, out_dir: str, mask: ogr.Layer = None, write: bool =
     present in lidar data.
 
     Function accepts a density grid derived from lidar, and a vector geometry mask
-    produced from create_mask(). The function will use this information to compute
+    produced from void_mask(). The function will use this information to compute
     the sum of suspicious voided areas present in the gridded lidar data.
 
-    @precondition: User SHOULD execute create mask before running void_compute()
+    @precondition: User SHOULD execute void_mask before running void_compute()
     @precondition: User must provide a density grid (preferably derived from last return points).
     @param grid: Path to density grid file.
     @param out_dir: Directory to write results to.
-    @param mask: shapefile output from create_mask()
+    @param mask: VoidMask output from void_mask()
     @param write: Control whether void grids are written to disk.
 
     @return: Computed void area in square units
@@ -41,55 +158,93 @@ def void_compute(grid: str, out_dir: str, mask: ogr.Layer = None, write: bool =
     filename = grid.split('\\')[-1][:-14]
     out_path = os.path.join(out_dir, f"{filename}_voids.tif")
 
-    grid1 = gdal.Open(grid, gdal.GA_ReadOnly)  # Read the density grid
-    band = grid1.GetRasterBand(1)  # extract raster band from density grid
-    wkt = grid1.GetProjection()  # extract projection from density grid
-    band_array = gdal_array.BandReadAsArray(band)  # read raster band as an array
-
-    # Anywhere density > 0 is set to 1, else unchanged
-    data_out = np.where(band_array > 0, 1, band_array)
-    data_out[0:20] = 1
-    data_out[-20::] = 1
-    data_out[:, 0:20] = 1
-    data_out[:, -20::] = 1
-
-    driver = gdal.GetDriverByName(
-        "GTiff" if write else "MEM"
-    )  # Create Geotiff driver object
-
-    # Create new geotiff file object with same dimensions and data-type as input file
-    ds_out = driver.Create(
-        out_path if write else "",
-        grid1.RasterXSize, grid1.RasterYSize, 1, band.DataType
-    )
+    with rio.open(grid) as src:
+        # Anywhere density > 0 is covered, and filter out peppery void areas smaller than 25 pixels
+        covered = sieve(covered_pixels(src.read(1)))
+        if mask is not None:
+            mask.burn(covered, src.transform, src.bounds)
+        profile = src.profile
 
-    gdal_array.CopyDatasetInfo(grid1, ds_out)   # copy properties of density grid to new output raster
-    ds_out.SetProjection(wkt)                   # set projection for output raster
-    band_out = ds_out.GetRasterBand(1)          # set number of bands for new raster
+    if write:
+        profile.update(dtype="uint8", count=1, nodata=None)
+        with rio.open(out_path, "w", **profile) as dst:
+            dst.write(covered.astype("uint8"), 1)
 
-    # write new information to blank raster
-    gdal_array.BandWriteArray(band_out, data_out)
-    gdal.SieveFilter(band_out, None, band_out, 25, connectedness=8)
-    if mask is not None:
-        gdal.RasterizeLayer(ds_out, [1], mask, burnValues=[1])
+    # calculate number of pixels missing from the raster
+    return int(covered.size - np.count_nonzero(covered))
 
-    # filter out peppery void areas smaller than 9x9 pixels
-    sieve_band = ds_out.GetRasterBand(1)
-    sieve_array = gdal_array.BandReadAsArray(sieve_band)
 
-    # calculate number of pixels missing from the raster
-    void_area = int(np.size(sieve_array) - np.sum(sieve_array))
+def void_mosaic(grids: list, out_dir: str, mask: VoidMask = None) -> list:
+    """
+    Find the voids in a mosaic of density grids.
+
+    The grids are mosaicked in a VRT, so voids straddling the edges of grids are found
+    whole, rather than as pieces of each grid (and the grid borders aren't ignored).
+    The mosaic is held in memory as one byte per pixel.
+
+    @param grids: Paths to density grid files.
+    @param out_dir: Directory to write the VRT and void polygons to.
+    @param mask: VoidMask output from void_mask()
+    @return: List of (void size in pixels, void polygon), largest first.
+    """
+
+    vrt_path = os.path.join(out_dir, MOSAIC_VRT_FILENAME)
+    gdal.BuildVRT(vrt_path, grids).FlushCache()
+
+    with rio.open(vrt_path) as src:
+        covered = np.empty((src.height, src.width), dtype=bool)
+        for row in range(0, src.height, MOSAIC_ROWS):
+            window = Window(0, row, src.width, min(MOSAIC_ROWS, src.height - row))
+            covered[row:row + window.height] = src.read(1, window=window) > 0
+        transform, crs, bounds = src.transform, src.crs, src.bounds
+
+    # the area outside of all of the grids (and its border) isn't void
+    footprint = rasterize(
+        [box(*_grid_bounds(grid)) for grid in grids],
+        out_shape=covered.shape, transform=transform, fill=0, default_value=1, dtype="uint8"
+    ).astype(bool)
+    covered |= ndimage.binary_dilation(~footprint, structure=EIGHT_CONNECTED, iterations=BORDER_20)
+
+    covered = sieve(covered)
+    if mask is not None:
+        mask.burn(covered, transform, bounds)
+
+    # label each void, and polygonize the voids over the threshold all at once
+    labels, _ = ndimage.label(~covered, structure=EIGHT_CONNECTED)
+    sizes = np.bincount(labels.ravel())
+    sizes[0] = 0
+    is_reported = sizes > VOID_THRESHOLD_500
+    labels[~is_reported[labels]] = 0
+
+    parts = {}
+    for geom, label in shapes(labels.astype("int32"), mask=labels > 0, connectivity=8, transform=transform):
+        parts.setdefault(int(label), []).append(shape(geom))
+
+    voids = sorted(
+        ((int(sizes[label]), unary_union(polygons)) for label, polygons in parts.items()),
+        key=lambda void: void[0],
+        reverse=True
+    )
+
+    schema = {"geometry": "Polygon", "properties": {"id": "int", "pixels": "int"}}
+    with fiona.open(
+            os.path.join(out_dir, VOIDS_SHP_FILENAME), "w", driver="ESRI Shapefile",
+            schema=schema, crs_wkt=crs.to_wkt() if crs else None
+    ) as shp:
+        for void_id, (size, polygon) in enumerate(voids, start=1):
+            polygons = getattr(polygon, "geoms", [polygon])
+            for part in polygons:
+                shp.write({"geometry": mapping(part), "properties": {"id": void_id, "pixels": size}})
 
-    # flush data to output
-    band_out.FlushCache()
+    return voids
 
-    # close the datasource(s)
-    grid1, ds_out = None, None
 
-    return void_area
+def _grid_bounds(grid: str) -> tuple:
+    with rio.open(grid) as src:
+        return src.bounds
 
 
-def void_mask(breaklines: str = None, aoi: str = None, out_dir: str = None) -> Union[ogr.Layer, None]:
+def void_mask(breaklines: str = None, aoi: str = None, out_dir: str = None) -> Union[VoidMask, None]:
     """
     Create new vector geometry and write to shapefile.
 
@@ -101,110 +256,75 @@ def void_mask(breaklines: str = None, aoi: str = None, out_dir: str = None) -> U
     @param breaklines: Path to shapefile containing vector geometry of water bodies.
     @param aoi: Path to shapefile containing vector geometry of AOI.
     @param out_dir: Output directory for resulting shapefile
+    @return: VoidMask of the breakline polygons and AOI cutouts.
     """
 
     if (breaklines is None) or (aoi is None):
         return None
 
-    driver = ogr.GetDriverByName("ESRI Shapefile")  # Create driver object
-    in_ds = driver.Open(aoi, 0)  # open shapefile in read mode
-    in_layer = in_ds.GetLayer()  # call get layer method (mandatory)
-    in_breaks = driver.Open(breaklines, 0)  # open shapefile in read mode
-    breaks_layer = in_breaks.GetLayer()  # call get layer method (mandatory)
     out = os.path.join(out_dir, MASK_SHP_FILENAME)  # define output name
 
-    # steal prj file from input and write new one for output
-    prj_file = f"{os.path.splitext(aoi)[0]}.prj"  # define prj file out name
-    with open(prj_file, "r") as f:  # context manager
-        contents = f.read()  # read contents
-        prj = open(os.path.splitext(out)[0] + ".prj", "w+")  # open new prj file
-        prj.write(contents)  # write contents to new file
-        prj.close()  # close new file
-
-    # collect bounding geometry
-    bounds_list = []  # empty list for bounds
-    geom_list = []  # empty list for feature geometry
-    for feature in in_layer:  # for geometry feature in layer
-        geom = feature.GetGeometryRef()  # not sure what this does yet
-        geom_list.append(geom.GetGeometryRef(0).GetPoints())
-        bounds_list.append(geom.GetEnvelope())  # get bounds of each geometry feature
-
-    # Create multipolygon of all bounding boxes with cut outs of the geometry they bound
-    multipolygon = ogr.Geometry(ogr.wkbMultiPolygon)  # define empty multipolygon
-    out_ring = ogr.Geometry(ogr.wkbLinearRing)  # Create geometry ring object
-    in_ring = ogr.Geometry(ogr.wkbLinearRing)  # define inner ring object
-    poly = ogr.Geometry(ogr.wkbPolygon)  # create polygon object
-    for b, g in zip(bounds_list, geom_list):  # for bounds of each geometry feature
-        out_ring.AddPoint(b[0] - BUFFER_2300, b[2] - BUFFER_2300)  # add points with 2300m buffer
-        out_ring.AddPoint(b[0] - BUFFER_2300, b[3] + BUFFER_2300)  # add points with 2300m buffer
-        out_ring.AddPoint(b[1] + BUFFER_2300, b[3] + BUFFER_2300)  # add points with 2300m buffer
-        out_ring.AddPoint(b[1] + BUFFER_2300, b[2] - BUFFER_2300)  # add points with 2300m buffer
-        out_ring.AddPoint(b[0] - BUFFER_2300, b[2] - BUFFER_2300)  # close polygon on beginning point
-        for p in g:  # for vertices in geometry
-            in_ring.AddPoint(p[0], p[1])  # add vertex to inner ring
-        poly.AddGeometry(out_ring)  # Polygon inherits outer ring geometry
-        poly.AddGeometry(in_ring)  # Polygon inherits inner ring geometry
-        multipolygon.AddGeometry(poly)  # add polygon to multipolygon
-
-    # get vertices for breaklines
-    break_point = []
-    for feature in breaks_layer:  # for geometry feature in layer
-        geom_breaks = feature.GetGeometryRef()  # not sure what this does yet
-        break_point.append(geom_breaks.GetGeometryRef(0).GetPoints())
-
-    # make polygon feature from breaklines
-    multipoly_break = ogr.Geometry(ogr.wkbMultiPolygon)  # define empty multipolygon
-    ring_breaks = ogr.Geometry(ogr.wkbLinearRing)  # define inner ring object
-    poly_breaks = ogr.Geometry(ogr.wkbPolygon)  # create polygon object
-    for t in break_point:
-        for p in t:
-            ring_breaks.AddPoint(p[0], p[1])
-        poly_breaks.AddGeometry(ring_breaks)
-        multipoly_break.AddGeometry(poly_breaks)
-
-    # calculate union for breaks and bounds with AOI hole cutout
-    union = multipolygon.Union(multipoly_break)
-
-    # save bounds
-    out_driver = ogr.GetDriverByName("Memory")
-
-    # Remove output shapefile if it already exists
-    if os.path.exists(out):
-        out_driver.DeleteDataSource(out)
-
-    # create the datasource for the output shapefile
-    out_ds = out_driver.CreateDataSource(out)  # create datasource object
-    out_layer = out_ds.CreateLayer(
-        "mask", geom_type=ogr.wkbMultiPolygon
-    )  # create new layer
-
-    # add ID field
-    id_field = ogr.FieldDefn("id", ogr.OFTInteger)  # define field
-    out_layer.CreateField(id_field)  # create field
-
-    # create feature and set values
-    feature_defn = (out_layer.GetLayerDefn())
-
-    feature = ogr.Feature(feature_defn)  # same as above
-    feature.SetGeometry(union)  # set geometry for feature class
-    feature.SetField("id", 1)  # set field for feature class
-    out_layer.CreateFeature(feature)  # create new feature
-    # feature = None  # remove feature from memory
-    # # Save and close DataSource
-    in_ds = None
-    in_breaks = None
-
-    return out_layer
-
-
-def void_report(grids_path: str, out_dir: str, mask: Union[ogr.Layer, None]):
+    # bounding box of each AOI geometry (with 2300m buffer) with a cut out of the geometry it bounds
+    with fiona.open(aoi) as src:
+        crs_wkt = src.crs_wkt
+        polygons = []
+        for feature in src:
+            geom = shape(feature["geometry"])
+            xmin, ymin, xmax, ymax = geom.bounds
+            bounds = box(xmin - BUFFER_2300, ymin - BUFFER_2300, xmax + BUFFER_2300, ymax + BUFFER_2300)
+            polygons.append(bounds.difference(geom))
+
+    # polygons of the breaklines (water bodies)
+    with fiona.open(breaklines) as src:
+        polygons.extend(shape(feature["geometry"]) for feature in src)
+
+    # split multipolygons, so the STRtree bounds are as tight as possible
+    polygons = [
+        part
+        for polygon in polygons if not polygon.is_empty
+        for part in getattr(polygon, "geoms", [polygon])
+    ]
+
+    # save mask, with the projection of the AOI
+    schema = {"geometry": "Polygon", "properties": {"id": "int"}}
+    with fiona.open(out, "w", driver="ESRI Shapefile", schema=schema, crs_wkt=crs_wkt) as shp:
+        for polygon in polygons:
+            shp.write({"geometry": mapping(polygon), "properties": {"id": 1}})
+
+    return VoidMask(polygons)
+
+
+def _init_worker(mask: Union[VoidMask, None]):
+
+    """
+    Share the void mask with a worker process of void_report.
+    """
+
+    global _worker_mask
+    _worker_mask = mask
+
+
+def _void_compute_worker(grid: str, out_dir: str) -> int:
+    return void_compute(grid, out_dir, _worker_mask)
+
+
+def void_report(
+        grids_path: str,
+        out_dir: str,
+        mask: Union[VoidMask, None],
+        workers: int = None,
+        mosaic: bool = False
+):
 
     """
     Calculate void area in a list of grid files and produces tabular report.
 
-    @param mask: ogr.Layer generated from void_mask()
+    @param mask: VoidMask generated from void_mask()
     @param grids_path: Path to directory of density grid files.
     @param out_dir: Path to write results.
+    @param workers: Number of processes computing grids (default: number of CPUs).
+    @param mosaic: Find voids in a mosaic of all the grids instead of grid by grid,
+        and write them to voids.shp (True/False).
     """
 
     void_path = os.path.join(out_dir, Strings.VOIDS)
@@ -212,12 +332,27 @@ def void_report(grids_path: str, out_dir: str, mask: Union[ogr.Layer, None]):
 
     with open(os.path.join(out_dir, CSV_FILENAME), 'a', newline='') as csv_file:
         print(CSV_COLUMNS, file=csv_file)
-        for density_grid in density_glob:
-            void = void_compute(density_grid, void_path, mask)
-            if void > VOID_THRESHOLD_500:
-                name = os.path.basename(density_grid).replace('void_', '')
-                row = f"{name}, {void}"
-                print(row, file=csv_file)
+
+        if mosaic:
+            os.makedirs(void_path, exist_ok=True)
+            for void_id, (void, polygon) in enumerate(void_mosaic(density_glob, void_path, mask), start=1):
+                x, y = polygon.representative_point().coords[0]
+                print(f"{VOIDS_SHP_FILENAME} id {void_id} ({x:.0f} {y:.0f}), {void}", file=csv_file)
+            return
+
+        # the mask is sent to each process once, rather than with every grid
+        with concurrent.futures.ProcessPoolExecutor(
+                workers,
+                initializer=_init_worker,
+                initargs=(mask,)
+        ) as executor:
+            voids = executor.map(_void_compute_worker, density_glob, [void_path] * len(density_glob))
+
+            for density_grid, void in zip(density_glob, voids):
+                if void > VOID_THRESHOLD_500:
+                    name = os.path.basename(density_grid).replace('void_', '')
+                    row = f"{name}, {void}"
+                    print(row, file=csv_file)
 
 
 def cli_opts() -> list:
@@ -301,9 +436,8 @@ def cli(opts: list):
     if not out_dir:
         out_dir = os.getcwd()
 
-    void_mask(breaklines, aoi, out_dir)
-    mask_path = os.path.join(out_dir, MASK_SHP_FILENAME)
-    void_area = void_compute(in_grid, out_dir, mask_path, write=False)
+    mask = void_mask(breaklines, aoi, out_dir)
+    void_area = void_compute(in_grid, out_dir, mask, write=False)
     las_tile = os.path.basename(in_grid).split(".")[0]
     print(f"{las_tile}\nvoid area: {void_area}")
 
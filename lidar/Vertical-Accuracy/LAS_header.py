@@ -3,18 +3,19 @@
 # Args:lidar LAS file
 # Output: LAS Header information   
 
-import laspy
+from rsge_toolbox.lidar.LasHeader import parse_header as parse_las_header
 
 def parse_header(filename,par):
     #print("... Extracting LAS header information")
-    with laspy.open(filename) as fh:
-        xmin=fh.header.x_min
-        xmax=fh.header.x_max
-        ymin=fh.header.y_min
-        ymax=fh.header.y_max
-        #zmin=fh.header.z_min
-        #zmax=fh.header.z_max
-        Las_extends = [xmin,ymin,xmax,ymax]
+    # only the header is read (no laz decompressor is set up)
+    header = parse_las_header(filename)
+    xmin=header['xmin']
+    xmax=header['xmax']
+    ymin=header['ymin']
+    ymax=header['ymax']
+    #zmin=header['zmin']
+    #zmax=header['zmax']
+    Las_extends = [xmin,ymin,xmax,ymax]
     # add more fields if needed
 
     return Las_extends
@@ -10,6 +10,7 @@ import os
 import csv
 import tqdm
 import laspy
+import concurrent.futures
 import shapefile
 import numpy as np
 import pandas as pd
@@ -18,14 +19,17 @@ from math import ceil, isnan
 import matplotlib.tri as mtri
 import matplotlib.pyplot as plt
 from dataclasses import dataclass
+from contextlib import contextmanager
 from scipy.spatial import cKDTree
+from functools import partial
 from collections import namedtuple
 from typing import Union, Tuple, List, Optional
 from scipy.interpolate import bisplrep, bisplev, RectBivariateSpline
 
 from rsge_toolbox.lidar.lidar_const import LidarClass
-from rsge_toolbox.lidar.Laszy import Laszy, POINT_FILTER_TYPE
+from rsge_toolbox.lidar.Laszy import Laszy, POINT_FILTER_TYPE, POINT_CHUNK_SIZE
 from rsge_toolbox.lidar.LidarSurface import PointsXYZA, Not3DDataError, LidarSurface
+from rsge_toolbox.util.executor_tools import bounded_submit
 
 # -----------------------------------------------------------
 # -- Type definitions
@@ -174,11 +178,12 @@ class VerticalAccuracy:
         self._tin = None
         self._grid = None
         self._data = None   # tuple containing PointsXYZ at index 0, and scan angles at index 1
+        self._tree = None   # 2D KD-tree over the XY coordinates of self._data (built on demand)
         self.surface = None
         self.point_interpolated = PointInterpolated(tin=None, grid=None)
         self.distance = PlumbDistance(tin=float("nan"), grid=float("nan"), idw=float("nan"))
 
-    def set_source_data(self, src: Union[np.array, Laszy, str]):
+    def set_source_data(self, src: Union[np.array, Laszy, str], gcps: List[GroundControlPoint] = None, proximity: float = None):
 
         """
         Set the source data for the accuracy test.
@@ -188,10 +193,18 @@ class VerticalAccuracy:
             - laspy.LasData object (returned from either laspy.read() or laspy.open())
             - 2D numpy array containing elements X, Y, and Z coordinates, respectively.
 
+        When 'src' is a path and 'gcps' and 'proximity' are given, only the points within
+        'proximity' of any of the GCPs are read from the file (see 'proximity_filter').
+
         :param src: A LAS/LAZ file, laspy.LasData object, or 2D numpy array containing XYZ coordinates.
+        :param gcps: List of GroundControlPoint objects to read points around (Optional).
+        :param proximity: Distance units from each 'gcp.x' and 'gcp.y' (Optional).
         """
 
-        if isinstance(src, str) and os.path.isfile(src):
+        if isinstance(src, str) and os.path.isfile(src) and gcps and proximity:
+            self._data = self.__from_file_windows(src, gcps, proximity)
+
+        elif isinstance(src, str) and os.path.isfile(src):
             self._data = self.__from_file(src)
 
         elif isinstance(src, Laszy):
@@ -201,6 +214,7 @@ class VerticalAccuracy:
             self._data = PointsXYZA(*(np.split(src, 3, axis=1)))
 
         self._src = src
+        self._tree = None
 
     def set_gcp(self, gcp: Union[GroundControlPoint, Point3D, tuple]):
 
@@ -246,7 +260,7 @@ class VerticalAccuracy:
         else:
             self.gcp = None
 
-    def set_surface(self, nn_dist: float):
+    def set_surface(self, nn_dist: float, window: PointsXYZA = None):
 
         """
         Set the 'self.surface' attribute.
@@ -259,12 +273,16 @@ class VerticalAccuracy:
             - Smaller values will improve runtime, but may yield sparse results depending on the terrain.
             - Larger values will improve NN search results, but cause an increase in runtime.
 
+        The points within 'nn_dist' of the gcp may optionally be passed as 'window' (see 'proximity_windows'),
+        in which case the source data is not filtered again.
+
         :param nn_dist: The distance to be applied to nearest neighbour search against self.gcp
+        :param window: Points already filtered by proximity to self.gcp (Optional).
         :exception ValueError:
         """
 
         if bool(self._data):
-            points = self.proximity_filter(self._data, nn_dist)
+            points = window if window is not None else self.proximity_filter(self._data, nn_dist)
             nn_points = self.__nearest_neighbours(points, self.gcp, nn_dist)
             if len(nn_points.z) < SURFACE_MIN_POINTS:
                 raise InsufficientSurfacePointsError
@@ -297,6 +315,45 @@ class VerticalAccuracy:
 
         return points_filtered
 
+    def proximity_windows(self, gcps: List[GroundControlPoint], proximity: float) -> List[PointsXYZA]:
+
+        """
+        Filter the source data by proximity to each of a list of GCPs.
+
+        Equivalent to calling 'proximity_filter' once per GCP, but all GCPs are answered by a single
+        batched query against a 2D KD-tree of the source data, rather than a scan of the entire
+        point cloud per GCP. The KD-tree is built on first use and reused until the source data changes.
+
+        :param gcps: List of GroundControlPoint objects.
+        :param proximity: Distance units from each 'gcp.x' and 'gcp.y'
+        :return: List of PointsXYZA namedtuples, one per GCP, in the order of 'gcps'.
+        """
+
+        points = self._data
+        if self._tree is None:
+            self._tree = cKDTree(np.column_stack((points.x, points.y)))
+
+        # Chebyshev (p=inf) balls are the square windows used by proximity_filter
+        gcps_xy = np.array([(gcp.x, gcp.y) for gcp in gcps], dtype=float).reshape(-1, 2)
+        neighbours = self._tree.query_ball_point(gcps_xy, proximity, p=np.inf, return_sorted=True)
+
+        windows = []
+        for (x, y), indices in zip(gcps_xy, neighbours):
+            indices = np.asarray(indices, dtype=int)
+
+            # query_ball_point includes points exactly at 'proximity', proximity_filter does not
+            indices = indices[
+                (np.abs(points.x[indices] - x) < proximity) & (np.abs(points.y[indices] - y) < proximity)
+            ]
+            windows.append(PointsXYZA(
+                x=points.x[indices],
+                y=points.y[indices],
+                z=points.z[indices],
+                a=points.a[indices] if points.a is not None else None
+            ))
+
+        return windows
+
     def tin_compare(self) -> float:
 
         """
@@ -687,6 +744,102 @@ class VerticalAccuracy:
 
         return points
 
+    @staticmethod
+    def __from_file_windows(path: str, gcps: List[GroundControlPoint], proximity: float) -> PointsXYZA:
+
+        """
+        Extract XYZ coordinates and scan angles from LAS/LAZ file, for points near a set of GCPs only.
+
+        Reads the points in chunks, keeping only points within the square windows
+        of side 2 * 'proximity' centered on each GCP. Chunks whose bounds miss every window
+        are rejected outright. LAS files are read, and LAZ and COPC files decompressed, one
+        chunk at a time, so memory is bounded by the chunk size and the number of points kept.
+
+        The same class/return filter as '__from_file' is applied (ground if the file
+        has ground points, otherwise last returns), and the coordinates are the same.
+
+        :param path: Path to LAS/LAZ file.
+        :param gcps: List of GroundControlPoint objects.
+        :param proximity: Distance units from each 'gcp.x' and 'gcp.y'
+        :return: PointsXYZA namedtuple of the points within the windows.
+        """
+
+        centers = np.array([(gcp.x, gcp.y) for gcp in gcps], dtype=float).reshape(-1, 2)
+        centers_tree = cKDTree(centers)
+        x_lo, y_lo = centers.min(axis=0) - proximity
+        x_hi, y_hi = centers.max(axis=0) + proximity
+
+        kept = []
+        has_ground = False
+        with VerticalAccuracy.__open_chunks(path) as (header, chunks):
+            for chunk in chunks:
+                if len(chunk) == 0:
+                    continue
+
+                classification = np.asarray(chunk.classification)
+                has_ground |= bool(np.any(classification == LidarClass.GROUND.number))
+
+                # Coordinates as in '__apply_offset'
+                x = chunk.x + header.x_offset
+                y = chunk.y + header.y_offset
+
+                # early rejection of chunks outside the union of all windows
+                in_bbox = (x_lo < x) & (x < x_hi) & (y_lo < y) & (y < y_hi)
+                if not in_bbox.any():
+                    continue
+
+                # A point is in some window if it is in the window of its nearest (p=inf) GCP
+                idx = np.flatnonzero(in_bbox)
+                _, nearest = centers_tree.query(
+                    np.column_stack((x[idx], y[idx])), k=1, p=np.inf, distance_upper_bound=proximity
+                )
+                found = nearest < len(centers)
+                idx, nearest = idx[found], nearest[found]
+                in_window = (
+                    (np.abs(x[idx] - centers[nearest, 0]) < proximity)
+                    & (np.abs(y[idx] - centers[nearest, 1]) < proximity)
+                )
+                idx = idx[in_window]
+
+                kept.append((
+                    x[idx], y[idx], np.asarray(chunk.z)[idx] + header.z_offset,
+                    np.asarray(chunk["scan_angle"])[idx],
+                    classification[idx],
+                    np.asarray(chunk.return_num)[idx],
+                    np.asarray(chunk.num_returns)[idx]
+                ))
+
+        if kept:
+            x, y, z, a, classification, return_num, num_returns = (np.concatenate(arrays) for arrays in zip(*kept))
+        else:
+            x = y = z = a = classification = return_num = num_returns = np.empty(0)
+
+        # filter points (ground for classified data, last_return for unclassified)
+        if has_ground:
+            keep = (classification == LidarClass.GROUND.number)
+        else:
+            keep = (return_num == num_returns)
+
+        return PointsXYZA(x[keep], y[keep], z[keep], a[keep] / 100)
+
+    @staticmethod
+    @contextmanager
+    def __open_chunks(path: str):
+
+        """
+        Open a LAS/LAZ file for reading its point records in chunks of POINT_CHUNK_SIZE.
+
+        Uncompressed LAS files are read chunk by chunk, and compressed files are decompressed
+        chunk by chunk. Each chunk owns its records (LAS files aren't memory-mapped: views onto
+        the mapped records would still be held by the caller when the file is closed).
+
+        :param path: Path to LAS/LAZ file.
+        :return: Context manager yielding the LasHeader and an iterator of point record chunks.
+        """
+
+        with laspy.open(path, laz_backend=laspy.LazBackend.LazrsParallel) as reader:
+            yield reader.header, reader.chunk_iterator(POINT_CHUNK_SIZE)
+
     @staticmethod
     def __apply_offset(las: Laszy, las_points: laspy.ScaleAwarePointRecord) -> tuple:
 
@@ -833,40 +986,54 @@ class Vertigo:
         else:
             raise InvalidVectorFormatError
 
-    def map_control(self) -> dict:
+    def map_control(self, workers: int = None) -> dict:
 
         """
         Map control points to input data set in flist.
 
         Finds which GCPs belong to which input LAS/LAZ files and returns
-        a dictionary of the mapping.
+        a dictionary of the mapping. Headers are read in parallel, and GCPs
+        are matched to file bounds through an index of GCPs sorted by X,
+        rather than testing every GCP against every file.
+
+        Each GCP is mapped to the first file in flist whose bounds contain it.
 
+        :param workers: Number of threads used to read headers (default: ThreadPoolExecutor default).
         :return: Map of LAS/LAZ files to GCPs
         """
 
-        gcp_count = 0
         control_map = {}
-        control_copy = self.control.copy()
-
-        # loop through files and check for GCPs within geo bounds
-        for f in self.flist:
-            if gcp_count == len(self.control):
-                break  # if we find them all, stop looping
-            laszy = Laszy(f, read_points=False)
-            x_min, x_max = laszy.get_x_minmax()
-            y_min, y_max = laszy.get_y_minmax()
-
-            control_map[f] = []
-            for gcp in control_copy:
-                if x_min <= gcp.x <= x_max and y_min <= gcp.y <= y_max:
-                    control_map[f].append(gcp)
-                    gcp_count += 1
-
-            if control_map[f]:  # if GCPs mapped, remove them from our search
-                control_found = set(control_map[f])
-                control_copy = list(set(control_copy).difference(control_found))
-            else:  # otherwise, no GCPs in that file. Delete them from our map
-                del control_map[f]
+        if not self.control:
+            self.control_map = control_map
+            return control_map
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            bounds = list(executor.map(self.__header_bounds, self.flist))
+
+        # sort GCPs by X, so each file's X range is found by binary search
+        gcp_x = np.array([gcp.x for gcp in self.control], dtype=float)
+        gcp_y = np.array([gcp.y for gcp in self.control], dtype=float)
+        order = np.argsort(gcp_x, kind="stable")
+        sorted_x = gcp_x[order]
+
+        mapped = np.zeros(len(self.control), dtype=bool)
+        for f, bbox in zip(self.flist, bounds):
+            if mapped.all():
+                break  # if we find them all, stop looking
+            if bbox is None:
+                continue
+
+            x_min, x_max, y_min, y_max = bbox
+            lo = np.searchsorted(sorted_x, x_min, side="left")
+            hi = np.searchsorted(sorted_x, x_max, side="right")
+            candidates = np.sort(order[lo:hi])
+            candidates = candidates[
+                ~mapped[candidates] & (y_min <= gcp_y[candidates]) & (gcp_y[candidates] <= y_max)
+            ]
+
+            if candidates.size > 0:
+                control_map[f] = [self.control[i] for i in candidates]
+                mapped[candidates] = True
 
         self.control_map = control_map
         return control_map
@@ -890,7 +1057,7 @@ class Vertigo:
 
         return results
 
-    def assess(self, tin: bool = True, grid: bool = False, idw: Union[int, bool] = False, nn_dist: int = 1.2, verbose: bool = False) -> None:
+    def assess(self, tin: bool = True, grid: bool = False, idw: Union[int, bool] = False, nn_dist: int = 1.2, verbose: bool = False, workers: int = 1, max_in_flight: int = None) -> None:
 
         """
         Evaluate vertical accuracy between control points and input lidar data.
@@ -901,62 +1068,151 @@ class Vertigo:
             - grid: Plumbline distance measurement between derived bicubic interpolated grid and GCPs.
             - idw: Inverse Distance Weighting (idw) measurement between Nearest Neighbour points and GCPs.
 
+        Files are independent, and are assessed in a process pool when workers > 1. At most
+        'max_in_flight' files are submitted at once, bounding memory. Either way, results and
+        errors are merged in 'control_map' order, so the output does not depend on 'workers'.
+
         :param tin: Enable TIN to GCP distance computation [default=True].
         :param grid: Enable Grid to GCP distance computation [default=False].
         :param idw: Enabled when set to a value greater than IDW_MIN (value=3) [default=0].
         :param nn_dist: Nearest Neighbour distance to each GCP (in distance units) [default=1].
+        :param workers: Number of processes used to assess files [default=1].
+        :param max_in_flight: Maximum number of files submitted to the pool at once [default=2 * workers].
         """
 
         if not self.control_map:
             self.map_control()
 
-        for file in self.control_map.keys():
-            vat = VerticalAccuracy()
-            vat.set_source_data(file)
-            gcps = self.control_map[file]
-            if verbose:
-                base = os.path.basename(file).split(".")[0]
-                gcps = tqdm.tqdm(gcps, desc=f"{base}: ")
-
-            for gcp in gcps:
-                vat.set_gcp(gcp)
-                try:  # try to generate surface from gcp nearest neighbors
-                    vat.set_surface(nn_dist=nn_dist)
-                except (np.linalg.LinAlgError, InsufficientSurfacePointsError):
-                    self._err.append(f"{file} :: \n\tSurface not suitable for computations")
-                    continue
-
-                if tin:
-                    self.__assess_handler(file, gcp, vat, method=COMPUTATION_TYPE.tin, arg=None)
-                if grid:
-                    self.__assess_handler(file, gcp, vat, method=COMPUTATION_TYPE.grid, arg=None)
-                if idw >= IDW_MIN_POINTS:
-                    self.__assess_handler(file, gcp, vat, method=COMPUTATION_TYPE.idw, arg=idw)
-                dist_copy = PlumbDistance(tin=vat.distance.tin, idw=vat.distance.idw, grid=vat.distance.grid)
-
-                result_surface = vat.surface
-                result_surface.points = None  # Release actual points from memory, keep stats (saving some memory)
-                result = AssessResult(
-                    las=os.path.basename(file), gcp=vat.gcp.name,
-                    distance=dist_copy, surface=result_surface,
-                    flagged=self.__should_flag_gcp(dist_copy)
+        assess_file = partial(
+            Vertigo._assess_file, tin=tin, grid=grid, idw=idw, nn_dist=nn_dist,
+            threshold=self.VERTICAL_THRESHOLD
+        )
+        files = list(self.control_map.keys())
+        workers = max(1, int(workers))
+
+        if workers > 1:
+            max_in_flight = max(workers, max_in_flight or (2 * workers))
+            with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+                futures = bounded_submit(
+                    lambda file: executor.submit(assess_file, file, self.control_map[file]),
+                    files,
+                    max_in_flight
                 )
+                results = (future.result() for future in futures)
+                if verbose:
+                    results = tqdm.tqdm(results, total=len(files), desc="Assessing LAS/LAZ files...")
+                self.__merge_results(results)
+        else:
+            self.__merge_results(assess_file(file, self.control_map[file], verbose=verbose) for file in files)
 
-                self.results.append(result)
-                vat.reset()
+    def __merge_results(self, file_results) -> None:
+
+        """
+        Append per-file results and errors, writing the error log as errors are found.
+
+        :param file_results: Iterable of (results, errors) tuples (see _assess_file()).
+        """
+
+        for results, errors in file_results:
+            self.results.extend(results)
+            self._err.extend(errors)
 
             if self._err:
                 with open("./vertigo_errors.log", "w") as e:
                     for err in self._err:
                         e.write(err)
 
-    def __should_flag_gcp(self, dist_copy):
-        tin_exceeds = (dist_copy.grid >= self.VERTICAL_THRESHOLD)
-        grid_exceeds = (dist_copy.tin >= self.VERTICAL_THRESHOLD)
-        idw_exceeds = (dist_copy.idw >= (self.VERTICAL_THRESHOLD + 0.20))
+    @staticmethod
+    def _assess_file(file: str, gcps: List[GroundControlPoint], tin: bool, grid: bool, idw: Union[int, bool], nn_dist: float, threshold: float, verbose: bool = False) -> tuple:
+
+        """
+        Assess the vertical accuracy of a single LAS/LAZ file against its GCPs.
+
+        Runs in worker processes, so errors are returned rather than stored. A file that can't
+        be read is returned as an error too, so it doesn't stop the assessment of the other files.
+
+        :param file: LAS/LAZ file.
+        :param gcps: GCPs mapped to the file.
+        :param tin: Enable TIN to GCP distance computation.
+        :param grid: Enable Grid to GCP distance computation.
+        :param idw: Enabled when set to a value greater than IDW_MIN (value=3).
+        :param nn_dist: Nearest Neighbour distance to each GCP (in distance units).
+        :param threshold: Vertical threshold for flagging GCPs (Vertigo.VERTICAL_THRESHOLD).
+        :param verbose: Show a progress bar over the GCPs.
+        :return: tuple -> (results, errors), a list of AssessResult in GCP order, and a list of error strings.
+        """
+
+        results, errors = [], []
+
+        vat = VerticalAccuracy()
+        try:
+            vat.set_source_data(file, gcps=gcps, proximity=nn_dist)
+            windows = vat.proximity_windows(gcps, nn_dist)
+        except Exception as e:
+            errors.append(f"{file} :: \n\tFile could not be read: {e}")
+            return results, errors
+
+        gcp_windows = zip(gcps, windows)
+        if verbose:
+            base = os.path.basename(file).split(".")[0]
+            gcp_windows = tqdm.tqdm(gcp_windows, desc=f"{base}: ", total=len(gcps))
+
+        for gcp, window in gcp_windows:
+            vat.set_gcp(gcp)
+            try:  # try to generate surface from gcp nearest neighbors
+                vat.set_surface(nn_dist=nn_dist, window=window)
+            except (np.linalg.LinAlgError, InsufficientSurfacePointsError):
+                errors.append(f"{file} :: \n\tSurface not suitable for computations")
+                continue
+
+            if tin:
+                Vertigo.__assess_handler(file, gcp, vat, COMPUTATION_TYPE.tin, None, errors)
+            if grid:
+                Vertigo.__assess_handler(file, gcp, vat, COMPUTATION_TYPE.grid, None, errors)
+            if idw >= IDW_MIN_POINTS:
+                Vertigo.__assess_handler(file, gcp, vat, COMPUTATION_TYPE.idw, idw, errors)
+            dist_copy = PlumbDistance(tin=vat.distance.tin, idw=vat.distance.idw, grid=vat.distance.grid)
+
+            result_surface = vat.surface
+            result_surface.points = None  # Release actual points from memory, keep stats (saving some memory)
+            result = AssessResult(
+                las=os.path.basename(file), gcp=vat.gcp.name,
+                distance=dist_copy, surface=result_surface,
+                flagged=Vertigo.__should_flag_gcp(dist_copy, threshold)
+            )
+
+            results.append(result)
+            vat.reset()
+
+        return results, errors
+
+    @staticmethod
+    def __should_flag_gcp(dist_copy, threshold):
+        tin_exceeds = (dist_copy.grid >= threshold)
+        grid_exceeds = (dist_copy.tin >= threshold)
+        idw_exceeds = (dist_copy.idw >= (threshold + 0.20))
 
         return tin_exceeds or grid_exceeds or idw_exceeds
 
+    @staticmethod
+    def __header_bounds(file: str) -> Optional[Tuple[float, float, float, float]]:
+
+        """
+        Read the XY bounds of a LAS/LAZ file from its header.
+
+        :param file: Path to LAS/LAZ file.
+        :return: Tuple (x_min, x_max, y_min, y_max), or None if the header could not be read.
+        """
+
+        laszy = Laszy(file, read_points=False)
+        if laszy.public_header_block is None:
+            return None
+
+        x_min, x_max = laszy.get_x_minmax()
+        y_min, y_max = laszy.get_y_minmax()
+
+        return x_min, x_max, y_min, y_max
+
     def get_dists(self) -> tuple:
 
         dists = ([], [], [])
@@ -1046,7 +1302,8 @@ class Vertigo:
             self.stats[key]["rmse"] = round(float((np.sum(dists ** 2) / len(dists)) ** (1 / 2)), 3)
             self.stats[key]["computed_from"] = f"{len(dists)} / {total}"
 
-    def __assess_handler(self, file: str, gcp: GroundControlPoint, vat: VerticalAccuracy, method: int, arg: Union[float, int, None]) -> None:
+    @staticmethod
+    def __assess_handler(file: str, gcp: GroundControlPoint, vat: VerticalAccuracy, method: int, arg: Union[float, int, None], errors: List[str]) -> None:
 
         """
         Wrap distance computation with simpel error handling.
@@ -1056,6 +1313,7 @@ class Vertigo:
         :param vat: VerticalAccuracyTest object.
         :param method: constant integer [METHOD_TIN, METHOD_GRID, METHOD_IDW]
         :param arg: Argument for computation method (if necessary).
+        :param errors: List that error messages are appended to.
         """
 
         try:
@@ -1066,7 +1324,7 @@ class Vertigo:
             elif method == COMPUTATION_TYPE.grid:
                 vat.grid_compare(arg) if arg else vat.grid_compare()
         except Exception as e:
-            self._err.append(f"{file} :: {COMPUTATION_TYPE.types[method]} :: {gcp.x}, {gcp.y}\n\t{e}")
+            errors.append(f"{file} :: {COMPUTATION_TYPE.types[method]} :: {gcp.x}, {gcp.y}\n\t{e}")
 
     def __from_gpkg(self, gpkg_file: str, col_fmt: ColumnFormat = None) -> None:
 
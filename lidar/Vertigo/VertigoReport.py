@@ -10,9 +10,11 @@ from reportlab.lib import colors
 # system libs
 import os
 import io
+import hashlib
+import concurrent.futures
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib.lines as mlines
+from matplotlib.figure import Figure
 
 # user libs
 from rsge_toolbox.util.time_tools import today_str
@@ -44,6 +46,61 @@ DISCLAIMER_TEXT = (
 )
 
 
+# Rendered histograms (PNG) by hash of their inputs, oldest first
+HISTOGRAM_CACHE_SIZE = 32
+_histogram_png_cache = {}
+
+
+def _render_histogram_png(data, title: str, bins: int, hist_stats: dict, size: tuple) -> bytes:
+
+    """
+    Render a histogram of distances to PNG.
+
+    A Figure is used directly (rather than pyplot) so histograms can be rendered in threads
+    with the Agg backend, and nothing is kept open by pyplot once rendered.
+
+    :param data: Distances.
+    :param title: Name of the distances (e.g. "TIN").
+    :param bins: Number of bins.
+    :param hist_stats: Statistics of the distances, listed in the legend.
+    :param size: (width, height) of the figure in inches.
+    :return: PNG image.
+    """
+
+    fig = Figure(figsize=size)
+    ax = fig.subplots()
+    ax.set_xlabel(f"{title} Distances (m)")
+    ax.hist(data, bins=bins, edgecolor="black")
+
+    # Adding text to top right and creating dummy lines for legend
+    lines = [
+        mlines.Line2D(
+            [], [], color='none', markersize=10, markeredgewidth=1.5,
+            label=f"{k}: {v}"
+        ) for k, v in hist_stats.items()
+    ]
+
+    # Create legend
+    ax.legend(handles=lines[:-1], loc='upper right', frameon=False)
+
+    # Save the figure to a BytesIO buffer
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+
+    return buffer.getvalue()
+
+
+def _cache_histogram_png(key: str, png: bytes):
+
+    """
+    Add a rendered histogram to the histogram cache, dropping the oldest ones if it's full.
+    """
+
+    while len(_histogram_png_cache) >= HISTOGRAM_CACHE_SIZE:
+        _histogram_png_cache.pop(next(iter(_histogram_png_cache)))
+    _histogram_png_cache[key] = png
+
+
 class VertigoGlossary:
     GLOSSARY = {
         "TIN (Triangulated Irregular Network)": [
@@ -216,57 +273,71 @@ class VertigoReport:
         """
         Draw histograms for the report.
 
+        The histograms are rendered in a thread pool (unless they're in the histogram cache),
+        and each one is drawn on its own page as soon as it (and the ones before it) are rendered.
+
         :param c: reportlab canvas object.
         """
 
         tin_data, grid_data, idw_data = self._vertigo.get_dists()
         stats = self._vertigo.stats
 
-        # Assuming your data is stored in the 'data' variable
-        key_index = 0
-        stat_keys = ["tin", "grid", "idw"]
-        for data, title in zip([tin_data, grid_data, idw_data], ["TIN", "Grid", "IDW"]):
+        histograms = [
+            (data, title, stats[stat_key])
+            for data, title, stat_key in zip([tin_data, grid_data, idw_data], ["TIN", "Grid", "IDW"], ["tin", "grid", "idw"])
+            if len(data) > 0
+        ]
 
-            hist_stats = stats[stat_keys[key_index]]
+        with concurrent.futures.ThreadPoolExecutor() as executor:
 
-            if len(data) <= 0:
-                continue
+            # render the histograms that aren't in the histogram cache
+            pages = []
+            for data, title, hist_stats in histograms:
+                key, render_args = self.__histogram_key(data, title, hist_stats)
+                png = _histogram_png_cache.get(key)
+                if png is None:
+                    png = executor.submit(_render_histogram_png, *render_args)
+                pages.append((title, key, png))
 
-            # draw the title
-            c.setFont("Helvetica", 20)
-            c.drawCentredString(letter[0] / 2, letter[1] - inch, f"{title} Histogram")
-
-            # Create a histogram using matplotlib
-            n = len(data)
-            bins = n if n < self.DEFAULT_BIN_SIZE else self.DEFAULT_BIN_SIZE
-            fig, ax = plt.subplots()
-            ax.set_xlabel(f"{title} Distances (m)")
-            fig.set_size_inches(self.HIST_X_INCHES, self.HIST_Y_INCHES)  # Adjust the dimensions as needed
-            ax.hist(data, bins=bins, edgecolor="black")
-
-            # Adding text to top right and creating dummy lines for legend
-            lines = [
-                mlines.Line2D(
-                    [], [], color='none', markersize=10, markeredgewidth=1.5,
-                    label=f"{k}: {v}"
-                ) for k, v in hist_stats.items()
-            ]
+            for title, key, png in pages:
 
-            # Create legend
-            plt.legend(handles=lines[:-1], loc='upper right', frameon=False)
+                if isinstance(png, concurrent.futures.Future):
+                    png = png.result()
+                    _cache_histogram_png(key, png)
 
-            # Save the figure to a BytesIO buffer
-            buffer = io.BytesIO()
-            fig.savefig(buffer, format='png')
-            buffer.seek(0)
+                # draw the title
+                c.setFont("Helvetica", 20)
+                c.drawCentredString(letter[0] / 2, letter[1] - inch, f"{title} Histogram")
 
-            # Embed the histogram image onto the canvas
-            image = ImageReader(buffer)
-            c.drawImage(image, x=40, y=10)  # Adjust the position as needed
+                # Embed the histogram image onto the canvas
+                image = ImageReader(io.BytesIO(png))
+                c.drawImage(image, x=40, y=10)  # Adjust the position as needed
 
-            # Advance to the next page
-            c.showPage()
-            key_index += 1
+                # Advance to the next page
+                c.showPage()
+
+    def __histogram_key(self, data, title: str, hist_stats: dict) -> tuple:
+
+        """
+        Get the histogram cache key and _render_histogram_png() arguments of a histogram.
+
+        The key is a hash of every input of the histogram, so a histogram is only rendered
+        again if its inputs change (and not e.g. when the report is written again with another title).
+
+        :param data: Distances.
+        :param title: Name of the distances (e.g. "TIN").
+        :param hist_stats: Statistics of the distances, listed in the legend.
+        :return: tuple -> (key, render_args)
+        """
+
+        n = len(data)
+        bins = n if n < self.DEFAULT_BIN_SIZE else self.DEFAULT_BIN_SIZE
+        size = (self.HIST_X_INCHES, self.HIST_Y_INCHES)
+
+        key = hashlib.sha256(repr((title, bins, size, list(hist_stats.items()))).encode())
+        key.update(np.ascontiguousarray(data, dtype=np.float64))
+
+        return key.hexdigest(), (data, title, bins, hist_stats, size)
 
     @staticmethod
     def __cover_page_draw(c):
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+import laspy
+import numpy as np
+
+from rsge_toolbox.lidar.lidar_const import LidarClass
+from Vertigo import GroundControlPoint, Point3D, VerticalAccuracy, Vertigo
+
+
+class FromFileWindowsTest(unittest.TestCase):
+
+    """Read the points near a set of GCPs from small LAS/LAZ files (run from lidar/Vertigo)."""
+
+    PROXIMITY = 10.0
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+        header = laspy.LasHeader(point_format=6, version="1.4")
+        header.offsets = [0, 0, 0]
+        header.scales = [0.01, 0.01, 0.01]
+
+        n = 5000
+        rng = np.random.default_rng(0)
+        las = laspy.LasData(header)
+        las.x = rng.random(n) * 100
+        las.y = rng.random(n) * 100
+        las.z = rng.random(n)
+        las.classification = np.where(rng.random(n) < 0.5, LidarClass.GROUND.number, 1).astype(np.uint8)
+        las.return_number = np.ones(n, dtype=np.uint8)
+        las.number_of_returns = np.ones(n, dtype=np.uint8)
+
+        self.las_path = os.path.join(self.tmp_dir.name, "tile.las")
+        self.laz_path = os.path.join(self.tmp_dir.name, "tile.laz")
+        las.write(self.las_path)
+        las.write(self.laz_path)
+
+        self.las = las
+        self.gcps = [GroundControlPoint(Point3D(25, 25, 0.5)), GroundControlPoint(Point3D(70, 60, 0.5))]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def __from_file_windows(self, path):
+        return VerticalAccuracy._VerticalAccuracy__from_file_windows(path, self.gcps, self.PROXIMITY)
+
+    def test_las_matches_the_ground_points_in_the_windows(self):
+        points = self.__from_file_windows(self.las_path)
+
+        x, y = np.asarray(self.las.x), np.asarray(self.las.y)
+        in_window = np.zeros(len(x), dtype=bool)
+        for gcp in self.gcps:
+            in_window |= (np.abs(x - gcp.x) < self.PROXIMITY) & (np.abs(y - gcp.y) < self.PROXIMITY)
+        expected = in_window & (np.asarray(self.las.classification) == LidarClass.GROUND.number)
+
+        self.assertGreater(len(points.x), 0)
+        np.testing.assert_allclose(np.sort(points.x), np.sort(x[expected]))
+        np.testing.assert_allclose(np.sort(points.y), np.sort(y[expected]))
+
+    def test_las_and_laz_read_the_same_points(self):
+        las_points = self.__from_file_windows(self.las_path)
+        laz_points = self.__from_file_windows(self.laz_path)
+
+        for las_values, laz_values in zip(las_points, laz_points):
+            np.testing.assert_array_equal(las_values, laz_values)
+
+
+class AssessFileTest(unittest.TestCase):
+
+    """An unreadable file is returned as an error, not raised (run from lidar/Vertigo)."""
+
+    def test_unreadable_file_is_an_error(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "unreadable.las")
+            with open(path, "wb") as f:
+                f.write(b"not a las file")
+
+            results, errors = Vertigo._assess_file(
+                path, [GroundControlPoint(Point3D(0, 0, 0))], tin=True, grid=False, idw=False,
+                nn_dist=1.2, threshold=Vertigo.VERTICAL_THRESHOLD
+            )
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+
+# ------------------------------------------------------------------------------
+# Description:
+#
+#   Apply the same LasAttr edits to every las/laz file matching a glob
+#   pattern (e.g., all of the tiles in a delivery), with a process pool.
+#
+#   Available edits (applied in the order given):
+#       - replace the horizontal-only WKT with a compound WKT
+#           (LasAttr.replace_wkt_with_compound_wkt)
+#       - remove all non-WKT VLRs/EVLRs
+#           (LasAttr.remove_all_vlrs_evlrs_except_wkt)
+#       - set the system ID
+#
+#   Each file is written to a temporary file next to its output location,
+#   then renamed over the output file, so an interrupted run never leaves
+#   a half-written file behind (even when overwriting the input files).
+#
+#   Every finished file is recorded in a journal file, under the edits of
+#   the batch; re-running the same batch skips the files the journal lists
+#   as done, so an interrupted run picks up where it left off.
+#
+#   The batch itself is rsge_toolbox.lidar.LasAttrBatch; this module binds
+#   it to lasattr.
+#
+#   Usage from the command line, e.g.:
+#       python lasattr_batch.py "D:\delivery\*.laz" --compound-wkt 6647
+#           --strip-vlrs --outdir D:\delivery_cgvd2013
+#
+#   Usage from other modules:
+#       lasattr_batch.batch_edit(glob_pattern, edits, outdir)
+#
+# ------------------------------------------------------------------------------
+
+import functools
+
+import lasattr
+from rsge_toolbox.lidar import LasAttrBatch
+
+
+# ------------------------------------------------------------------------------
+# EDIT NAMES
+# Edits are (edit name, value) tuples, see rsge_toolbox.lidar.LasAttrBatch
+# ------------------------------------------------------------------------------
+
+_edit_compound_wkt = LasAttrBatch.EDIT_COMPOUND_WKT
+_edit_strip_vlrs = LasAttrBatch.EDIT_STRIP_VLRS
+_edit_system_id = LasAttrBatch.EDIT_SYSTEM_ID
+
+apply_edits = functools.partial(LasAttrBatch.apply_edits, lasattr)
+edit_file = functools.partial(LasAttrBatch.edit_file, lasattr)
+batch_edit = functools.partial(LasAttrBatch.batch_edit, lasattr)
+
+
+def main():
+    LasAttrBatch.main(lasattr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import os
+import copy
+import hashlib
+import tempfile
+import laspy
+import numpy as np
+from osgeo import gdal
+from pyproj import Proj
+from scipy import ndimage
+from collections import namedtuple
+
+from rsge_toolbox.lidar.Laszy import POINT_CHUNK_SIZE, POINT_FILTER_TYPE
+
+# ------------------------------------
+# -- Type Definitions
+# ------------------------------------
+InterpolationOrder = namedtuple("InterpolationOrder", "NEAREST BILINEAR BICUBIC")
+PointOffset = namedtuple("PointOffset", "x y z", defaults=(0.0, 0.0, 0.0))
+
+
+# ------------------------------------
+# -- Constants
+# ------------------------------------
+INTERPOLATION_ORDER = InterpolationOrder(NEAREST=0, BILINEAR=1, BICUBIC=3)
+GEOID_CACHE_DIR = os.path.join(tempfile.gettempdir(), "rsge_geoid_cache")
+GEOID_EDGE_MODE = "nearest"  # ndimage.map_coordinates mode for points beyond the grid edges
+
+
+# =========================================================
+# --- GeoidGrid class
+# =========================================================
+class GeoidGrid:
+
+    """
+    Geoid undulation grid (BYN or GTX), read through GDAL.
+
+    The grid values (with the band scale factor applied) are decoded once
+    and cached as a .npy file, then memory-mapped on every later use, so
+    only the pages of the grid covering the data are ever read.
+
+    Attributes:
+        - path: Path to the BYN/GTX grid.
+        - values: Memory-mapped 2D array of geoid undulations (metres).
+        - geotransform: GDAL geotransform of the grid.
+    """
+
+    def __init__(self, path: str, cache_dir: str = GEOID_CACHE_DIR):
+
+        """
+        Initialize GeoidGrid object.
+
+        :param path: Path to a BYN or GTX geoid grid.
+        :param cache_dir: Directory of cached grid arrays.
+        """
+
+        self.path = path
+
+        ds = gdal.Open(path)
+        if ds is None:
+            raise FileNotFoundError(f"Unable to open geoid grid: {path}")
+
+        self.geotransform = ds.GetGeoTransform()
+        self.values = self.__cached_values(ds, cache_dir)
+
+    def interpolate(self, lon: np.ndarray, lat: np.ndarray, order: int = INTERPOLATION_ORDER.BICUBIC) -> np.ndarray:
+
+        """
+        Interpolate geoid undulations at geographic coordinates.
+
+        :param lon: Array of longitudes (degrees).
+        :param lat: Array of latitudes (degrees).
+        :param order: Spline order (see INTERPOLATION_ORDER) [default=BICUBIC].
+        :return: Array of geoid undulations (metres).
+        """
+
+        up_le_long, res_x, _, up_le_lat, _, res_y = self.geotransform
+        pixel_x = (lon - up_le_long) / res_x
+        pixel_y = (lat - up_le_lat) / res_y
+
+        return ndimage.map_coordinates(self.values, np.array([pixel_y, pixel_x]), order=order, mode=GEOID_EDGE_MODE)
+
+    def __cached_values(self, ds: gdal.Dataset, cache_dir: str) -> np.ndarray:
+
+        """
+        Load the scaled grid values from the cache, decoding them into the cache first if needed.
+
+        :param ds: Open GDAL dataset of the grid.
+        :param cache_dir: Directory of cached grid arrays.
+        :return: Memory-mapped 2D array of geoid undulations.
+        """
+
+        stat = os.stat(self.path)
+        key = hashlib.md5(f"{os.path.abspath(self.path)}|{stat.st_size}|{stat.st_mtime_ns}".encode()).hexdigest()
+        name = os.path.splitext(os.path.basename(self.path))[0]
+        npy = os.path.join(cache_dir, f"{name}_{key}.npy")
+
+        if not os.path.isfile(npy):
+            band = ds.GetRasterBand(1)
+            scale = band.GetScale() or 1.0
+            values = band.ReadAsArray() * scale
+
+            # write to a temporary file first, so a partly written grid is never loaded
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{npy}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, values)
+            os.replace(tmp, npy)
+
+        return np.load(npy, mmap_mode="r")
+
+
+# =========================================================
+# --- GeoidSeparation class
+# =========================================================
+class GeoidSeparation:
+
+    """
+    Convert ellipsoidal heights of UTM (NAD83) lidar points to orthometric heights.
+
+    Points are transformed to geographic coordinates with a vectorized pyproj
+    inverse projection, and the geoid undulation N is interpolated from a
+    GeoidGrid, so that H = h - N.
+
+    Attributes:
+        - grid: GeoidGrid object.
+        - zone: UTM zone number.
+        - order: Interpolation spline order (see INTERPOLATION_ORDER).
+    """
+
+    def __init__(self, grid: GeoidGrid, zone: int, order: int = INTERPOLATION_ORDER.BICUBIC):
+
+        """
+        Initialize GeoidSeparation object.
+
+        :param grid: GeoidGrid object.
+        :param zone: UTM zone number of the lidar data.
+        :param order: Interpolation spline order (see INTERPOLATION_ORDER) [default=BICUBIC].
+        """
+
+        self.grid = grid
+        self.zone = zone
+        self.order = order
+        self._proj = Proj(f"+proj=utm +zone={zone} +north +ellps=GRS80 +datum=NAD83 +units=m +no_defs")
+
+    def separation(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+
+        """
+        Get the geoid undulation at UTM coordinates.
+
+        :param x: Array of UTM eastings.
+        :param y: Array of UTM northings.
+        :return: Array of geoid undulations (metres).
+        """
+
+        lon, lat = self._proj(np.asarray(x), np.asarray(y), inverse=True)
+
+        return self.grid.interpolate(lon, lat, self.order)
+
+    def transform_points(self, points: laspy.ScaleAwarePointRecord, offset: PointOffset = PointOffset(), ant_ht: float = 0.0, class_num: int = POINT_FILTER_TYPE.IGNORE_CLASS) -> tuple:
+
+        """
+        Convert a chunk of points to orthometric heights.
+
+        Offsets and the antenna height are applied before the conversion,
+        and points may optionally be filtered by class.
+
+        :param points: Point records, e.g. a chunk from laspy.open().chunk_iterator().
+        :param offset: PointOffset to add to the point coordinates.
+        :param ant_ht: Antenna height to subtract from the point heights.
+        :param class_num: Class number to keep (-1 to keep all classes).
+        :return: tuple -> (points, N), the transformed points and their geoid undulations.
+        """
+
+        if offset.x != 0.0:
+            points.x = points.x + offset.x
+        if offset.y != 0.0:
+            points.y = points.y + offset.y
+        if offset.z != 0.0:
+            points.z = points.z + offset.z
+        if ant_ht != 0.0:
+            points.z = points.z - ant_ht
+
+        if class_num > POINT_FILTER_TYPE.IGNORE_CLASS:
+            points = points[points.classification == class_num]
+
+        n = self.separation(points.x, points.y)
+        points.z = np.array(points.z - n)
+
+        return points, n
+
+    def transform_file(self, infile: str, outfile: str, header: laspy.LasHeader = None, offset: PointOffset = PointOffset(), ant_ht: float = 0.0, class_num: int = POINT_FILTER_TYPE.IGNORE_CLASS, chunk_size: int = POINT_CHUNK_SIZE) -> dict:
+
+        """
+        Convert a LAS/LAZ file to orthometric heights, writing the output incrementally.
+
+        Points are read, transformed and written one chunk at a time, so memory is
+        bounded by 'chunk_size' rather than the file size.
+
+        :param infile: Input LAS/LAZ file (ellipsoidal heights).
+        :param outfile: Output LAS/LAZ file (orthometric heights).
+        :param header: Header of the output file (default: a copy of the input header).
+        :param offset: PointOffset to add to the point coordinates.
+        :param ant_ht: Antenna height to subtract from the point heights.
+        :param class_num: Class number to keep (-1 to keep all classes).
+        :param chunk_size: Number of points per chunk.
+        :return: Dictionary of summary statistics of the written points.
+        """
+
+        stats = {"point_count": 0, "n_min": np.inf, "n_max": -np.inf, "n_mean": float("nan"), "classes": []}
+        n_sum, classes = 0.0, set()
+
+        with laspy.open(infile, laz_backend=laspy.LazBackend.LazrsParallel) as reader:
+            header = header if header is not None else copy.deepcopy(reader.header)
+            with laspy.open(outfile, mode="w", header=header, laz_backend=laspy.LazBackend.LazrsParallel) as writer:
+                for points in reader.chunk_iterator(chunk_size):
+                    points, n = self.transform_points(points, offset, ant_ht, class_num)
+                    if len(points) == 0:
+                        continue
+
+                    writer.write_points(points)
+
+                    stats["point_count"] += len(points)
+                    stats["n_min"] = min(stats["n_min"], float(np.min(n)))
+                    stats["n_max"] = max(stats["n_max"], float(np.max(n)))
+                    n_sum += float(np.sum(n))
+                    classes.update(np.unique(points.classification).tolist())
+
+        if stats["point_count"] > 0:
+            stats["n_mean"] = n_sum / stats["point_count"]
+        stats["classes"] = [int(c) for c in sorted(classes)]
+
+        return stats
@@ -0,0 +1,378 @@
+import argparse
+import concurrent.futures
+import importlib
+import glob
+import json
+import os
+from types import ModuleType
+
+# ------------------------------------
+# -- Batch LasAttr edits
+# ------------------------------------
+# Apply the same LasAttr edits to every las/laz file matching a glob pattern
+# (e.g., all of the tiles in a delivery), with a process pool.
+#
+# LasAttr is kept as a standalone script in more than one tool (e.g. lidar/lasattr/lasattr.py
+# and LiQCS' liqcs_lasattr.py), so every function here takes the lasattr module to use.
+# Each tool's batch script is a thin wrapper binding its own lasattr module.
+#
+# Available edits (applied in the order given):
+#   - replace the horizontal-only WKT with a compound WKT
+#       (LasAttr.replace_wkt_with_compound_wkt)
+#   - remove all non-WKT VLRs/EVLRs
+#       (LasAttr.remove_all_vlrs_evlrs_except_wkt)
+#   - set the system ID
+#
+# Each file is written to a temporary file next to its output location, then renamed over
+# the output file, so an interrupted run never leaves a half-written file behind (even when
+# overwriting the input files).
+#
+# Every finished file is recorded in a journal file, under the edits of the batch. Re-running
+# the same batch skips the files the journal lists as done, so an interrupted run picks up
+# where it left off. A journal written for other edits is never resumed.
+
+# ------------------------------------
+# -- Edit names
+# ------------------------------------
+# Edits are (edit name, value) tuples:
+#   (EDIT_COMPOUND_WKT, epsg of the vertical datum)
+#   (EDIT_STRIP_VLRS, keep_evlrs (bool))
+#   (EDIT_SYSTEM_ID, system id (string, 32 characters max))
+EDIT_COMPOUND_WKT = "compound_wkt"
+EDIT_STRIP_VLRS = "strip_vlrs"
+EDIT_SYSTEM_ID = "system_id"
+
+# ------------------------------------
+# -- Journal
+# ------------------------------------
+# First line: "edits", tab, the edits of the batch (JSON)
+# Then one line per finished file: status, tab, file path (, tab, error message)
+JOURNAL_FILENAME = "lasattr_batch_journal.txt"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+_JOURNAL_EDITS = "edits"
+
+
+def apply_edits(lasattr: ModuleType, lasattr_instance, edits: list) -> bool:
+
+    """
+    Apply a list of edits to a LasAttr object instance.
+
+    :param lasattr: lasattr module of the LasAttr object.
+    :param lasattr_instance: LasAttr object of a las/laz file.
+    :param edits: (edit name, value) tuples, applied in order.
+    :return: True if the system ID was set by one of the edits (so write_output shouldn't
+        replace it with "MODIFICATION").
+    """
+
+    system_id_set = False
+
+    for edit_name, value in edits:
+        if edit_name == EDIT_COMPOUND_WKT:
+            lasattr_instance.replace_wkt_with_compound_wkt(epsg=value)
+        elif edit_name == EDIT_STRIP_VLRS:
+            lasattr_instance.remove_all_vlrs_evlrs_except_wkt(keep_evlrs=value)
+        elif edit_name == EDIT_SYSTEM_ID:
+            setattr(
+                lasattr_instance,
+                list(lasattr.public_header_dict)[9],
+                value
+            )
+            system_id_set = True
+        else:
+            raise ValueError(f"Unknown edit: '{edit_name}'")
+
+    return system_id_set
+
+
+def edit_file(lasattr: ModuleType, input_laslaz_path: str, edits: list, outdir: str = None) -> str:
+
+    """
+    Apply a list of edits to a las/laz file, and write the result to a temporary file that
+    is then renamed to the output file.
+
+    :param lasattr: lasattr module used to edit the file.
+    :param input_laslaz_path: Path to the las/laz file.
+    :param edits: (edit name, value) tuples, applied in order.
+    :param outdir: Output folder (default: overwrite the input file).
+    :return: Path to the output file.
+    """
+
+    if outdir:
+        output_laslaz_path = os.path.join(outdir, os.path.basename(input_laslaz_path))
+    else:
+        output_laslaz_path = input_laslaz_path
+
+    lasattr_obj = lasattr.LasAttr(input_laslaz_path)
+    system_id_set = apply_edits(lasattr, lasattr_obj, edits)
+
+    # Keep the input file's extension on the temporary file,
+    # so write_output doesn't add another one
+    root, ext = os.path.splitext(output_laslaz_path)
+    temp_laslaz_path = f"{root}.{os.getpid()}.tmp{ext}"
+
+    try:
+        lasattr_obj.write_output(
+            temp_laslaz_path,
+            update_system_id=not system_id_set
+        )
+        os.replace(temp_laslaz_path, output_laslaz_path)
+    finally:
+        if os.path.exists(temp_laslaz_path):
+            os.remove(temp_laslaz_path)
+
+    return output_laslaz_path
+
+
+def journal_edits(edits: list) -> str:
+
+    """
+    Get the edits of a batch as they are recorded in its journal.
+
+    :param edits: (edit name, value) tuples.
+    :return: JSON string of the edits.
+    """
+
+    return json.dumps([[edit_name, value] for edit_name, value in edits])
+
+
+def read_journal(journal_path: str) -> tuple:
+
+    """
+    Read the edits of a journal, and the paths of the files it lists as done.
+
+    :param journal_path: Path to the journal file.
+    :return: tuple -> (edits, done). edits is the JSON string of the journal's edits (see
+        journal_edits()), or None if there's no journal (or it doesn't record its edits),
+        and done is the set of absolute paths of the files that are done.
+    """
+
+    edits = None
+    done = set()
+
+    if os.path.isfile(journal_path):
+        with open(journal_path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) >= 2 and fields[0] == _JOURNAL_EDITS:
+                    edits = fields[1]
+                elif len(fields) >= 2 and fields[0] == STATUS_DONE:
+                    done.add(fields[1])
+
+    return edits, done
+
+
+def precompute_compound_wkts(lasattr: ModuleType, laslaz_path: str, edits: list) -> dict:
+
+    """
+    Make the compound WKT strings for the horizontal-only WKTs of a las/laz file, so the
+    worker processes don't each have to make them.
+
+    Most deliveries use the same WKT for every file, so the WKTs of the first file usually
+    cover the whole batch. Any others are made (once) by each worker process as they come up.
+
+    :param lasattr: lasattr module used to edit the files.
+    :param laslaz_path: Path to a las/laz file of the batch.
+    :param edits: (edit name, value) tuples.
+    :return: Compound WKT strings, keyed by (horizontal WKT string, epsg).
+    """
+
+    epsgs = [value for edit_name, value in edits if edit_name == EDIT_COMPOUND_WKT]
+
+    if epsgs:
+        lasattr_obj = lasattr.LasAttr(laslaz_path)
+        for prefix, index in lasattr_obj.find_wkt():
+            crs_obj, wkt_string = lasattr._crs_obj_from_prefix_and_index(
+                lasattr_obj,
+                prefix,
+                index
+            )
+            if not crs_obj.is_compound:
+                for epsg in epsgs:
+                    lasattr.compound_wkt(wkt_string, epsg)
+
+    return dict(lasattr._compound_wkt_blobs)
+
+
+def _init_worker(lasattr_name: str, compound_wkt_blobs: dict):
+
+    """
+    Import the lasattr module in a worker process (modules can't be sent to processes),
+    and share the precomputed compound WKT strings with it.
+    """
+
+    global _lasattr
+    _lasattr = importlib.import_module(lasattr_name)
+    _lasattr._compound_wkt_blobs.update(compound_wkt_blobs)
+
+
+def _edit_file_handler(input_laslaz_path: str, edits: list, outdir: str) -> tuple:
+
+    """
+    Run edit_file in a worker process, returning the error message instead of raising it,
+    so one bad file doesn't stop the batch.
+
+    :return: tuple -> (input file path, status, error message)
+    """
+
+    try:
+        edit_file(_lasattr, input_laslaz_path, edits, outdir)
+        return input_laslaz_path, STATUS_DONE, ""
+    except Exception as e:
+        message = " ".join(str(e).replace(_lasattr._dashline, "").split())
+        return input_laslaz_path, STATUS_FAILED, message
+
+
+def batch_edit(lasattr: ModuleType, glob_pattern: str, edits: list, outdir: str = None, workers: int = None, journal_path: str = None) -> dict:
+
+    """
+    Apply a list of edits to every las/laz file matching a glob pattern.
+
+    LasAttr keeps some state at the module level while it reads a file,
+    so files are edited in separate processes rather than threads.
+
+    :param lasattr: lasattr module used to edit the files (imported by name in the worker processes).
+    :param glob_pattern: Glob pattern of the las/laz files (recursive "**" allowed).
+    :param edits: (edit name, value) tuples, applied in order.
+    :param outdir: Output folder (default: overwrite the input files).
+    :param workers: Number of worker processes (default: number of CPUs).
+    :param journal_path: Path to the journal file (default: lasattr_batch_journal.txt in the
+        output folder, or in the input folder if overwriting).
+    :return: Number of files "done", "failed", and "skipped" (done in an earlier run).
+    :raises ValueError: If the journal was written for other edits. Resuming it would skip
+        files that never got these edits (and, when overwriting the input files, starting over
+        would apply both sets of edits), so delete it or use another journal_path.
+    """
+
+    laslaz_paths = sorted(
+        os.path.abspath(path)
+        for path in glob.glob(glob_pattern, recursive=True)
+        if path.lower().endswith((".las", ".laz"))
+    )
+
+    if not laslaz_paths:
+        raise FileNotFoundError(f"No las/laz files match: {glob_pattern}")
+
+    if outdir:
+        outdir = os.path.abspath(outdir)
+        os.makedirs(outdir, exist_ok=True)
+
+    if journal_path is None:
+        journal_folder = outdir or os.path.commonpath(
+            [os.path.dirname(path) for path in laslaz_paths]
+        )
+        journal_path = os.path.join(journal_folder, JOURNAL_FILENAME)
+
+    edits_json = journal_edits(edits)
+    resumed_edits, done = read_journal(journal_path)
+
+    if os.path.isfile(journal_path) and resumed_edits != edits_json:
+        raise ValueError(
+            f"The journal {journal_path} was written for other edits ({resumed_edits}), "
+            f"not {edits_json}. Delete it, or use another journal, to run this batch."
+        )
+
+    todo = [path for path in laslaz_paths if path not in done]
+
+    counts = {
+        STATUS_DONE: 0,
+        STATUS_FAILED: 0,
+        "skipped": len(laslaz_paths) - len(todo)
+    }
+
+    if not todo:
+        return counts
+
+    try:
+        compound_wkt_blobs = precompute_compound_wkts(lasattr, todo[0], edits)
+    except Exception as e:
+        # The file will fail (and be journaled) in its worker; the workers make the WKTs instead
+        print(f"Couldn't read the WKTs of {todo[0]}: {e}", flush=True)
+        compound_wkt_blobs = {}
+
+    with open(journal_path, "a", encoding="utf-8") as journal, \
+            concurrent.futures.ProcessPoolExecutor(
+                workers,
+                initializer=_init_worker,
+                initargs=(lasattr.__name__, compound_wkt_blobs)
+            ) as executor:
+
+        if resumed_edits is None:
+            journal.write(f"{_JOURNAL_EDITS}\t{edits_json}\n")
+            journal.flush()
+
+        futures = [
+            executor.submit(_edit_file_handler, path, edits, outdir)
+            for path in todo
+        ]
+
+        for future in concurrent.futures.as_completed(futures):
+            path, status, message = future.result()
+            counts[status] += 1
+
+            # Record each file as soon as it's finished, so an interrupted
+            # batch can be resumed without repeating finished files
+            journal.write(f"{status}\t{path}" + (f"\t{message}" if message else "") + "\n")
+            journal.flush()
+
+            if status == STATUS_FAILED:
+                print(f"Failed: {path}\n\t{message}", flush=True)
+
+    return counts
+
+
+def main(lasattr: ModuleType):
+
+    """
+    Command line interface of batch_edit(), e.g.:
+        python lasattr_batch.py "D:\\delivery\\*.laz" --compound-wkt 6647 --strip-vlrs --outdir D:\\delivery_cgvd2013
+
+    :param lasattr: lasattr module used to edit the files.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Apply LasAttr edits to every las/laz file matching a glob pattern."
+    )
+    parser.add_argument("glob_pattern", help="glob pattern of the las/laz files, e.g. D:\\delivery\\*.laz")
+    parser.add_argument(
+        "--compound-wkt", type=int, metavar="EPSG",
+        help="replace the horizontal-only WKT with a compound WKT, using EPSG for the vertical datum (e.g. 6647)"
+    )
+    parser.add_argument("--strip-vlrs", action="store_true", help="remove all VLRs and EVLRs except WKT")
+    parser.add_argument("--keep-evlrs", action="store_true", help="keep all EVLRs when stripping VLRs")
+    parser.add_argument("--system-id", help="set the system ID (32 characters max)")
+    parser.add_argument("--outdir", help="output folder (default: overwrite the input files)")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--journal", help=f"journal file (default: {JOURNAL_FILENAME} in the output folder)")
+    args = parser.parse_args()
+
+    edits = []
+    if args.compound_wkt is not None:
+        edits.append((EDIT_COMPOUND_WKT, args.compound_wkt))
+    if args.strip_vlrs:
+        edits.append((EDIT_STRIP_VLRS, args.keep_evlrs))
+    if args.system_id is not None:
+        edits.append((EDIT_SYSTEM_ID, args.system_id))
+
+    if not edits:
+        parser.error("no edits given (--compound-wkt, --strip-vlrs, --system-id)")
+
+    try:
+        counts = batch_edit(
+            lasattr,
+            args.glob_pattern,
+            edits,
+            outdir=args.outdir,
+            workers=args.workers,
+            journal_path=args.journal
+        )
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+
+    print(
+        f"\n{lasattr._dashline}"
+        f"\nDone: {counts[STATUS_DONE]}"
+        f"\nFailed: {counts[STATUS_FAILED]}"
+        f"\nSkipped (done in an earlier run): {counts['skipped']}"
+        f"\n{lasattr._dashline}"
+    )
@@ -0,0 +1,288 @@
+import os
+import struct
+import numpy as np
+import pandas as pd
+import concurrent.futures
+from typing import Union
+
+from rsge_toolbox.lidar.lidar_const import ASPRS
+
+# ------------------------------------
+# -- LAS public header layout
+# ------------------------------------
+# (name, struct format code, count) of each public header field, in file order.
+# Byte string fields ("s") are kept as raw bytes, e.g. b"LASF" for "filesig".
+# The layout is that of the LAS 1.4 header (375 bytes). Earlier versions have
+# shorter headers, so their trailing fields are whatever follows the header.
+HEADER_FIELDS = (
+    ("filesig", "s", 4),
+    ("filesourceid", "H", 1),
+    ("reserved", "H", 1),
+    ("guid1", "L", 1),
+    ("guid2", "H", 1),
+    ("guid3", "H", 1),
+    ("guid4", "B", 8),
+    ("vermajor", "B", 1),
+    ("verminor", "B", 1),
+    ("sysid", "s", 32),
+    ("gensoftware", "s", 32),
+    ("fileday", "H", 1),
+    ("fileyear", "H", 1),
+    ("headersize", "H", 1),
+    ("offset", "L", 1),
+    ("numvlrecords", "L", 1),
+    ("pointformat", "B", 1),
+    ("pointreclen", "H", 1),
+    ("numptrecords", "L", 1),
+    ("numptbyreturn", "L", 5),
+    ("xscale", "d", 1),
+    ("yscale", "d", 1),
+    ("zscale", "d", 1),
+    ("xoffset", "d", 1),
+    ("yoffset", "d", 1),
+    ("zoffset", "d", 1),
+    ("xmax", "d", 1),
+    ("xmin", "d", 1),
+    ("ymax", "d", 1),
+    ("ymin", "d", 1),
+    ("zmax", "d", 1),
+    ("zmin", "d", 1),
+    ("waveform", "Q", 1),
+    ("firstEVLR", "Q", 1),
+    ("numEVLR", "L", 1),
+    ("exnumbptrec", "Q", 1),
+    ("exnumbyreturn", "Q", 15),
+)
+
+# (name, struct format code, count) of each VLR header field, in file order.
+VLR_HEADER_FIELDS = (
+    ("reserved", "H", 1),
+    ("user_id", "s", 16),
+    ("record_id", "H", 1),
+    ("record_length", "H", 1),
+    ("description", "s", 32),
+)
+
+# (name, struct format code, count) of each EVLR header field, in file order.
+EVLR_HEADER_FIELDS = (
+    ("reserved", "H", 1),
+    ("user_id", "s", 16),
+    ("record_id", "H", 1),
+    ("record_length", "Q", 1),
+    ("description", "s", 32),
+)
+
+_NUMPY_TYPES = {"s": "S", "B": "u1", "H": "<u2", "L": "<u4", "Q": "<u8", "d": "<f8"}
+
+
+def _struct_format(fields: tuple) -> str:
+    return "<" + "".join(f"{count}{code}" for _, code, count in fields)
+
+
+def _numpy_dtype(fields: tuple) -> np.dtype:
+    return np.dtype([
+        (name, f"S{count}") if code == "s" else
+        (name, _NUMPY_TYPES[code], (count,)) if count > 1 else
+        (name, _NUMPY_TYPES[code])
+        for name, code, count in fields
+    ])
+
+
+def _field_slices(fields: tuple) -> list:
+
+    """
+    Map each field to its position in the flat tuple returned by struct.unpack.
+    Fields of several values (e.g. "numptbyreturn") map to a slice.
+    """
+
+    slices, i = [], 0
+    for name, code, count in fields:
+        if code == "s" or count == 1:
+            slices.append((name, i))
+            i += 1
+        else:
+            slices.append((name, slice(i, i + count)))
+            i += count
+
+    return slices
+
+
+# ------------------------------------
+# -- Precompiled decoders
+# ------------------------------------
+HEADER_STRUCT = struct.Struct(_struct_format(HEADER_FIELDS))
+HEADER_DTYPE = _numpy_dtype(HEADER_FIELDS)
+VLR_HEADER_STRUCT = struct.Struct(_struct_format(VLR_HEADER_FIELDS))
+EVLR_HEADER_STRUCT = struct.Struct(_struct_format(EVLR_HEADER_FIELDS))
+
+_HEADER_SLICES = _field_slices(HEADER_FIELDS)
+_VLR_HEADER_SLICES = _field_slices(VLR_HEADER_FIELDS)
+_EVLR_HEADER_SLICES = _field_slices(EVLR_HEADER_FIELDS)
+_VLR_READ_SIZE = 65536  # bytes read at once when VLRs are parsed; enough for the header and VLRs of most files
+
+LAZ_POINT_FORMAT_FLAG = 128  # laz compression adds 128 to the point data format
+
+
+def parse_header(filename: Union[str, os.PathLike], verbose: bool = False, vlrs: bool = False) -> dict:
+
+    """
+    Parse the public header of a LAS/LAZ file into a dictionary.
+
+    The header is read with a single read and decoded with one precompiled struct.
+
+    :param filename: Input LAS/LAZ filepath.
+    :param verbose: Write the header fields to stdout (True/False).
+    :param vlrs: Also parse the VLRs (True/False). Adds a "vlrs" list of dictionaries
+        with the VLR header fields, the "offset" of each VLR, and its "data" (bytes).
+    :return: Dictionary containing LAS/LAZ file header contents.
+    """
+
+    with open(filename, "rb") as fh:
+        data = fh.read(_VLR_READ_SIZE if vlrs else HEADER_STRUCT.size)
+        header = _decode_header(filename, data)
+
+        if vlrs:
+            # read the rest of the VLRs, if they didn't fit in the first read
+            if header["offset"] > len(data):
+                data += fh.read(header["offset"] - len(data))
+            header["vlrs"] = _decode_vlrs(data, header["headersize"], header["numvlrecords"])
+
+    if verbose:
+        for name, code, _ in HEADER_FIELDS:
+            print(f"{name}\t", f"{code}\t", header[name])
+
+    return header
+
+
+def parse_headers(filenames: list, workers: int = None) -> pd.DataFrame:
+
+    """
+    Parse the public headers of many LAS/LAZ files into a table.
+
+    The headers are read in parallel (the work is I/O-bound) and decoded all at once
+    with a numpy structured dtype. Byte string fields (e.g. "sysid") are stripped of
+    trailing null bytes, and fields of several values (e.g. "numptbyreturn") are
+    columns of arrays.
+
+    :param filenames: List of LAS/LAZ filepaths.
+    :param workers: Number of threads reading headers (default: concurrent.futures default).
+    :return: DataFrame of header contents, one row per file, in the order of 'filenames'.
+    """
+
+    filenames = list(filenames)
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        data = b"".join(executor.map(_read_header_bytes, filenames))
+
+    table = np.frombuffer(data, dtype=HEADER_DTYPE)
+
+    df = pd.DataFrame({
+        name: table[name] if table[name].ndim == 1 else list(table[name])
+        for name in HEADER_DTYPE.names
+    })
+    df.insert(0, "infile", filenames)
+
+    is_laz = np.array([str(filename).endswith(".laz") for filename in filenames], dtype=bool)
+    df["pointformat"] = table["pointformat"].astype(int) - is_laz * LAZ_POINT_FORMAT_FLAG
+
+    return df
+
+
+def read_wkt(filename: Union[str, os.PathLike], header: dict = None) -> str:
+
+    """
+    Read the WKT CRS string of a LAS/LAZ file.
+
+    The WKT is taken from the VLRs, or from the EVLRs (LAS 1.4) if it isn't in the VLRs.
+    Only the EVLR headers are read until the WKT record is found, so EVLRs such as
+    waveform data are never read.
+
+    :param filename: Input LAS/LAZ filepath.
+    :param header: Header of the file from parse_header(filename, vlrs=True), if already parsed.
+    :return: WKT string if present, else, an empty string.
+    """
+
+    if header is None or "vlrs" not in header:
+        header = parse_header(filename, vlrs=True)
+
+    for vlr in header["vlrs"]:
+        if _is_wkt_record(vlr):
+            return _decode_wkt(vlr["data"])
+
+    # EVLRs are only allowed from LAS 1.3 (and only hold WKT from LAS 1.4), and
+    # the EVLR fields of earlier headers are whatever follows the header
+    if (header["vermajor"], header["verminor"]) < (1, 4) or header["firstEVLR"] == 0:
+        return ""
+
+    with open(filename, "rb") as fh:
+        offset = header["firstEVLR"]
+        for _ in range(header["numEVLR"]):
+            fh.seek(offset)
+            data = fh.read(EVLR_HEADER_STRUCT.size)
+            if len(data) < EVLR_HEADER_STRUCT.size:
+                break
+
+            values = EVLR_HEADER_STRUCT.unpack(data)
+            evlr = {name: values[i] for name, i in _EVLR_HEADER_SLICES}
+            if _is_wkt_record(evlr):
+                return _decode_wkt(fh.read(evlr["record_length"]))
+
+            offset += EVLR_HEADER_STRUCT.size + evlr["record_length"]
+
+    return ""
+
+
+def _read_header_bytes(filename: Union[str, os.PathLike]) -> bytes:
+
+    with open(filename, "rb") as fh:
+        data = fh.read(HEADER_STRUCT.size)
+
+    if len(data) < HEADER_STRUCT.size:
+        raise ValueError(f"{filename} is too small to be a LAS/LAZ file ({len(data)} bytes)")
+
+    return data
+
+
+def _decode_header(filename: Union[str, os.PathLike], data: bytes) -> dict:
+
+    if len(data) < HEADER_STRUCT.size:
+        raise ValueError(f"{filename} is too small to be a LAS/LAZ file ({len(data)} bytes)")
+
+    values = HEADER_STRUCT.unpack_from(data)
+
+    header = {"infile": filename}
+    for name, i in _HEADER_SLICES:
+        header[name] = values[i]
+
+    if str(filename).endswith(".laz"):
+        header["pointformat"] = header["pointformat"] - LAZ_POINT_FORMAT_FLAG
+
+    return header
+
+
+def _decode_vlrs(data: bytes, headersize: int, numvlrecords: int) -> list:
+
+    vlrs = []
+    offset = headersize
+    for _ in range(numvlrecords):
+        values = VLR_HEADER_STRUCT.unpack_from(data, offset)
+        vlr = {name: values[i] for name, i in _VLR_HEADER_SLICES}
+
+        vlr["offset"] = offset
+        start = offset + VLR_HEADER_STRUCT.size
+        vlr["data"] = data[start:start + vlr["record_length"]]
+        vlrs.append(vlr)
+
+        offset = start + vlr["record_length"]
+
+    return vlrs
+
+
+def _is_wkt_record(record: dict) -> bool:
+
+    wkt = ASPRS.VlrRecordType.CRS_WKT
+
+    return record["record_id"] == wkt.record_id and record["user_id"].rstrip(b"\0").decode(errors="replace") == wkt.user_id
+
+
+def _decode_wkt(data: bytes) -> str:
+    return data.decode(errors="replace").rstrip("\0")
@@ -1,17 +1,20 @@
 import os
-import re
 import io
 import sys
 import glob
 import uuid
 import math
+import time
+import hashlib
 import json
 import tqdm
 import laspy
 import datetime
 import numpy as np
 import pandas as pd
+import concurrent.futures
 from typing import Union
+from functools import partial
 from lazrs import LazrsError
 from collections import namedtuple
 
@@ -25,6 +28,12 @@ from rsge_toolbox.lidar.lidar_const import ASPRS, RegexLidar
 # -- Type Definitions
 # ------------------------------------
 PointFilterType = namedtuple("PointFilterType", "LAST_RETURN IGNORE_CLASS IGNORE_RETURN")
+RuleSeverity = namedtuple("RuleSeverity", "ERROR WARNING")
+
+# A LaszyReport validation rule. 'check' takes the report DataFrame and returns a boolean
+# mask of failing rows, 'display' (optional) returns the values reported for failing rows,
+# and 'flag' (optional) reports failures as a single boolean column of that name instead.
+ValidationRule = namedtuple("ValidationRule", "name columns severity check display flag", defaults=(None, ""))
 
 
 
@@ -34,6 +43,7 @@ PointFilterType = namedtuple("PointFilterType", "LAST_RETURN IGNORE_CLASS IGNORE
 ACQUISITON = False  # !!! Temporary constant - will be removed in the future. Being used to switch off some new features.
 GPS_WEEK_TIME_LENGTH = 6
 GPS_WEEK_TIME_ERR_STR = "GpsDateConversionError"
+GPS_WEEK_SECONDS = 604800
 CORRUPT_FILE_MSG = "POSSIBLE CORRUPT FILE (Failed to decompress)"
 
 # ------------------------------------
@@ -49,6 +59,7 @@ UNICODE_DECODE_ERROR = "UnicodeDecodeError"
 POINT_FILTER_TYPE = PointFilterType(
     LAST_RETURN=0, IGNORE_RETURN=-1, IGNORE_CLASS=-1
 )
+POINT_CHUNK_SIZE = 5_000_000  # points per chunk when streaming point records
 
 
 # ------------------------------------
@@ -58,8 +69,10 @@ LASZY_REPORT_DROP_COLUMNS = [  # drop all columns that don't need to be checked
     "x_min", "x_max", "y_min", "y_max", "z_min", "z_max", "guid_hex", "generating_software", "point_count",
     'waveform_internal_packets', 'waveform_external_packets', 'projection', 'spheroid', "wkt_bbox",
     'vert_cs', 'proj_cs', 'geog_cs', 'vlr_count', 'vlr_has_geotiff_crs', 'date_start',
-    'has_keypoint', 'has_withheld', 'has_overlap', 'evlr_count', 'evlr_has_geotiff_crs', "rgb_encoding"
+    'has_keypoint', 'has_withheld', 'has_overlap', 'evlr_count', 'evlr_has_geotiff_crs', "rgb_encoding",
+    "gps_time_max"
 ]
+RULE_SEVERITY = RuleSeverity(ERROR="error", WARNING="warning")
 
 
 # =========================================================
@@ -401,21 +414,28 @@ class Laszy:
         if bool(pdr) and not class_flags_exist:
             return point_flags
 
-        class_flags = np.sort(self.points.classification_flags)
-        check_synthetic = np.bitwise_and(class_flags, ASPRS.ClassFlag.SYNTHETIC)
-        check_withheld = np.bitwise_and(class_flags, ASPRS.ClassFlag.WITHHELD)
-        check_keypoint = np.bitwise_and(class_flags, ASPRS.ClassFlag.KEYPOINT)
-        check_overlap = np.bitwise_and(class_flags, ASPRS.ClassFlag.OVERLAP)
-
-        point_flags = {  # check if a flagged point exists after bitwise-and
-            "has_synthetic": ASPRS.ClassFlag.SYNTHETIC in check_synthetic,
-            "has_keypoint": ASPRS.ClassFlag.KEYPOINT in check_keypoint,
-            "has_withheld": ASPRS.ClassFlag.WITHHELD in check_withheld,
-            "has_overlap": ASPRS.ClassFlag.OVERLAP in check_overlap
-        }
+        class_flags = np.bitwise_or.reduce(self.points.classification_flags)
+        point_flags = self.__class_flags_summary(int(class_flags))
 
         return point_flags
 
+    @staticmethod
+    def __class_flags_summary(class_flags: int) -> dict:
+
+        """
+        Interpret the bitwise-or of all classification flags in the point records.
+
+        :param class_flags: Bitwise-or of the classification flags of every point record.
+        :return: Dictionary containing the point flag name, and a boolean indicating the status of the bit field.
+        """
+
+        return {  # check if a flagged point exists after bitwise-and
+            "has_synthetic": bool(class_flags & ASPRS.ClassFlag.SYNTHETIC),
+            "has_keypoint": bool(class_flags & ASPRS.ClassFlag.KEYPOINT),
+            "has_withheld": bool(class_flags & ASPRS.ClassFlag.WITHHELD),
+            "has_overlap": bool(class_flags & ASPRS.ClassFlag.OVERLAP)
+        }
+
     def is_rgb_encoded(self) -> bool:
 
         """
@@ -500,7 +520,7 @@ class Laszy:
 
         return False
 
-    def summarize(self, header_only=False, outdir="") -> Union[dict, None]:
+    def summarize(self, header_only=False, outdir="", store="") -> Union[dict, None]:
 
         """
         Summarize the input LAS/LAZ data into a dictionary.
@@ -511,12 +531,21 @@ class Laszy:
         that can only be derived from the point records will not be
         present in the result.
 
+        When header_only is False and the points were not read on
+        initialization (read_points=False), the point record summary
+        is computed from streamed chunks of points, so the full point
+        array is never held in memory.
+
         If 'outdir' is NOT an empty string, function will write results to
         file in JSON format. Note that even if the 'outdir' is not valid,
         function will create a directory to write hte results to.
 
+        If 'store' is NOT an empty string, the summary is also appended
+        to the LaszyStore (parquet dataset) at that path.
+
         :param outdir: Out directory. If provided, results will also be writting to a file ({self._file}.json)
         :param header_only: boolean value. Determines whether to read the point data.
+        :param store: LaszyStore directory. If provided, results will also be appended to the store.
         :return:
         """
 
@@ -549,6 +578,9 @@ class Laszy:
         if bool(outdir):
             self.__summary_to_json(outdir, summary)
 
+        if bool(store):
+            LaszyStore(store).append([summary], [self.file_absolute])
+
         return summary
 
     def __public_header_summary(self) -> dict:
@@ -602,23 +634,65 @@ class Laszy:
         :return:
         """
 
-        gps_min, gps_max = self.get_gps_time_minmax()
-        fl_min, fl_max = self.get_point_source_id_minmax()
+        if self.points is not None:
+            classes = self.get_classes()
+            gps_min, gps_max = self.get_gps_time_minmax()
+            fl_min, fl_max = self.get_point_source_id_minmax()
+            class_flags = self.get_classification_flags()
+        else:
+            classes, (gps_min, gps_max), (fl_min, fl_max), class_flags = self.__streamed_point_stats()
+
         gps_min_week_time = self.__is_gps_week_time(gps_min)
         gps_max_week_time = self.__is_gps_week_time(gps_max)
         point_records_summary = {
-            "classes": self.get_classes(),
+            "classes": classes,
             "gps_time_min": gps_min,
             "gps_time_max": gps_max,
             "date_start": time_tools.gps2unix(gps_min) if not gps_min_week_time else GPS_WEEK_TIME_ERR_STR,
             "date_end": time_tools.gps2unix(gps_max) if not gps_max_week_time else GPS_WEEK_TIME_ERR_STR,
             "flightline_start": fl_min,
             "flightline_end": fl_max,
-            "class_flags": self.get_classification_flags()
+            "class_flags": class_flags
         }
 
         return point_records_summary
 
+    def __streamed_point_stats(self) -> tuple:
+
+        """
+        Derive point record statistics from chunks of points read from file.
+
+        Only used when points have not been read into memory. Each chunk
+        is reduced and discarded before the next is read.
+
+        :return: tuple -> (classes, (gps_min, gps_max), (psid_min, psid_max), class_flags)
+        """
+
+        classes = set()
+        gps_min, gps_max = math.inf, -math.inf
+        psid_min, psid_max = math.inf, -math.inf
+        class_flags = 0
+
+        pdr = self.public_header_block.point_format.id
+        class_flags_exist = (6 <= pdr <= 10)
+
+        reader = self._lasdata
+        reader.seek(0)
+        for points in reader.chunk_iterator(POINT_CHUNK_SIZE):
+            if len(points) == 0:
+                continue
+            classes.update(np.unique(points.classification).tolist())
+            gps_times, pt_src_ids = points.gps_time, points.pt_src_id
+            gps_min, gps_max = min(gps_min, np.min(gps_times)), max(gps_max, np.max(gps_times))
+            psid_min, psid_max = min(psid_min, np.min(pt_src_ids)), max(psid_max, np.max(pt_src_ids))
+            if class_flags_exist:
+                class_flags |= int(np.bitwise_or.reduce(points.classification_flags))
+
+        classes = [int(val) for val in sorted(classes)]
+        point_flags = self.__class_flags_summary(class_flags) if class_flags_exist else None
+
+        return classes, (float(gps_min), float(gps_max)), (int(psid_min), int(psid_max)), point_flags
+
     def __crs_info_summary(self) -> dict:
 
         """
@@ -816,10 +890,205 @@ class _LaszyReportColumns:
         *POINT_RECORDS, *CLASS_FLAGS, *EVLR_HDR, RGB_ENCODING, WKT_BBOX
     ]
 
+    # nullable pandas dtypes, so every LaszyStore fragment has the same parquet schema
+    _INT = [
+        "file_source_id", "point_data_format", "point_count", "global_encoding",
+        "vlr_count", "evlr_count", "flightline_start", "flightline_end"
+    ]
+    _FLOAT = [
+        "version", "x_min", "x_max", "y_min", "y_max", "z_min", "z_max", "x_scale", "y_scale",
+        "z_scale", "x_offset", "y_offset", "z_offset", "gps_time_min", "gps_time_max"
+    ]
+    _BOOL = [
+        *GLOBAL_ENCODING[1:], "vlr_has_wkt_crs", "vlr_has_geotiff_crs",
+        *CLASS_FLAGS, "evlr_has_wkt_crs", "evlr_has_geotiff_crs", RGB_ENCODING
+    ]
+    DTYPES = {col: "string" for col in COLUMNS}
+    DTYPES.update({col: "Int64" for col in _INT})
+    DTYPES.update({col: "float64" for col in _FLOAT})
+    DTYPES.update({col: "boolean" for col in _BOOL})
+
+
+class LaszyStore:
+
+    """
+    Columnar store of Laszy summaries.
+
+    A parquet dataset (directory) holding one row per LAS/LAZ file, using
+    the _LaszyReportColumns schema, plus the full path of each file and
+    when it was summarized (the latest summary of a file is kept). Each
+    append writes a new fragment, so independent processes may append
+    concurrently without locking, and compact() merges all fragments into
+    a single file. The whole store is read back as one DataFrame, rather
+    than opening one JSON per file.
+    """
+
+    PATH = "path"
+    SUMMARIZED = "summarized"  # time of the append, in nanoseconds since the epoch
+    _COMPACT_NAME = "summaries.parquet"
+
+    def __init__(self, path: str):
+
+        """
+        Initialize LaszyStore object.
+
+        :param path: Directory of the parquet dataset (created on first append).
+        """
+
+        self.path = path
+
+    def append(self, summaries: list[dict], paths: list[str] = None):
+
+        """
+        Append Laszy summaries to the store as a new fragment.
+
+        The fragment of a single summary is named by a hash of the file's full path, so
+        summarizing the same file again replaces its fragment, and files with the same
+        basename in different directories don't.
+
+        :param summaries: List of dictionaries returned by Laszy.summarize().
+        :param paths: Paths of the summarized LAS/LAZ files (default=the filename of each summary).
+        """
+
+        if not bool(summaries):
+            return
+
+        paths = [os.path.abspath(path) for path in paths] if paths is not None else [s["filename"] for s in summaries]
+
+        os.makedirs(self.path, exist_ok=True)
+        name = hashlib.sha1(paths[0].encode()).hexdigest() if len(summaries) == 1 else uuid.uuid4().hex
+        df = self.__frame([self.record(summary, path) for summary, path in zip(summaries, paths)])
+        df[self.SUMMARIZED] = time.time_ns()
+        df.to_parquet(os.path.join(self.path, name + ".parquet"), index=False)
+
+    def read(self, columns: list[str] = None) -> pd.DataFrame:
+
+        """
+        Read the store as a single DataFrame.
+
+        Values are returned as they would be read from a LaszyReport csv
+        (missing and empty values as NaN), so the same checks apply to both.
+
+        :param columns: Subset of columns to read (default=all columns).
+        :return: DataFrame with one row per LAS/LAZ file.
+        """
+
+        columns = columns or _LaszyReportColumns.COLUMNS
+        if not self.__fragments():
+            return pd.DataFrame(columns=columns)
+
+        df = pd.read_parquet(self.path, columns=list(dict.fromkeys([*columns, self.PATH, self.SUMMARIZED])))
+        df = self.latest(df)[columns]
+
+        df = df.astype(object).where(df.notna(), np.nan).replace("", np.nan)
+
+        return df.infer_objects().reset_index(drop=True)
+
+    def paths(self, with_points: bool = False) -> set[str]:
+
+        """
+        Get the full paths of the LAS/LAZ files summarized in the store.
+
+        :param with_points: When True, only files whose summary includes the point record fields.
+        :return: Set of absolute file paths.
+        """
+
+        df = self.read([self.PATH, "classes"])
+        if with_points:
+            df = df[df["classes"].notna()]
+
+        return set(df[self.PATH].dropna())
+
+    def compact(self):
+
+        """
+        Merge all fragments of the store into a single parquet file.
+        """
+
+        fragments = self.__fragments()
+        if len(fragments) < 2:
+            return
+
+        df = self.latest(pd.read_parquet(self.path))
+
+        # write to a temporary file outside the dataset, so it's never read as a fragment, then move
+        # it into place before removing the old fragments; duplicates left by an interruption are
+        # dropped on read
+        compacted = os.path.join(self.path, self._COMPACT_NAME)
+        tmp = os.path.join(os.path.dirname(os.path.abspath(self.path)), f".{uuid.uuid4().hex}.parquet.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, compacted)
+        for fragment in fragments:
+            if os.path.abspath(fragment) != os.path.abspath(compacted):
+                os.remove(fragment)
+
+    @staticmethod
+    def latest(df: pd.DataFrame) -> pd.DataFrame:
+
+        """
+        Keep only the latest summary of each file in rows read from the store.
+
+        :param df: Rows of the store, including the PATH and SUMMARIZED columns.
+        :return: One row per file.
+        """
+
+        return df.sort_values(LaszyStore.SUMMARIZED, kind="stable").drop_duplicates(LaszyStore.PATH, keep="last")
+
+    @staticmethod
+    def record(summary: dict, path: str = "") -> dict:
+
+        """
+        Flatten a Laszy summary into a single row of the store.
+
+        :param summary: Dictionary returned by Laszy.summarize().
+        :param path: Full path of the summarized LAS/LAZ file (default=the filename of the summary).
+        :return: Dictionary keyed by _LaszyReportColumns.COLUMNS and LaszyStore.PATH.
+        """
+
+        pr = summary["point_records"] or {}
+        flags = pr.get("class_flags") or {}
+        phb = summary["public_header_block"]
+
+        record = {_LaszyReportColumns.FILENAME: summary["filename"]}
+        record.update({key: phb[key] for key in _LaszyReportColumns.PUB_HDR})
+        record.update({key: phb["global_encoding"][key] for key in _LaszyReportColumns.GLOBAL_ENCODING})
+        record.update({key: summary["crs"][key] for key in _LaszyReportColumns.CRS})
+        record.update({key: summary["vlrs"][key] for key in _LaszyReportColumns.VLR_HDR})
+        record.update({key: (str(pr[key]) if key == "classes" else pr[key]) if pr else None for key in _LaszyReportColumns.POINT_RECORDS})
+        record.update({key: flags.get(key) for key in _LaszyReportColumns.CLASS_FLAGS})
+        record.update({key: summary["evlrs"][key] for key in _LaszyReportColumns.EVLR_HDR})
+        record[_LaszyReportColumns.RGB_ENCODING] = summary["rgb_encoding"]
+        record[_LaszyReportColumns.WKT_BBOX] = summary["wkt_bbox"]
+
+        # version is stored as a number, as it is read from the csv report
+        record["version"] = float(record["version"]) if bool(record["version"]) else None
+        record[LaszyStore.PATH] = path or summary["filename"]
+
+        return record
+
+    def __fragments(self) -> list[str]:
+
+        """
+        Get the parquet files that make up the store.
+        """
+
+        return glob.glob(os.path.join(self.path, "*.parquet"))
+
+    @staticmethod
+    def __frame(records: list[dict]) -> pd.DataFrame:
+
+        """
+        Create a DataFrame with the store schema from a list of records.
+        """
+
+        df = pd.DataFrame.from_records(records, columns=[*_LaszyReportColumns.COLUMNS, LaszyStore.PATH, LaszyStore.SUMMARIZED])
+
+        return df.astype({**_LaszyReportColumns.DTYPES, LaszyStore.PATH: "string", LaszyStore.SUMMARIZED: "Int64"})
+
 
 class LaszyReport:
 
-    def __init__(self, file_list: list[str] = None, outdir: str = ".", las_to_json: bool = False, verbose: bool = False):
+    def __init__(self, file_list: list[str] = None, outdir: str = ".", las_to_json: bool = False, verbose: bool = False, read_points: bool = False, workers: int = 1, las_to_store: bool = False):
 
         """
         Initialize LaszyReport object.
@@ -832,10 +1101,18 @@ class LaszyReport:
         Note that an 'flist' containing both json and las/laz files will be partitioned
         into self.json_list, and self.lidar_list.
 
+        When las_to_store is True, LAS/LAZ files already summarized in the LaszyStore at
+        '{outdir}/laszy_store' (matched on their full path) are not re-read; their rows are
+        taken from the store in a single read. With read_points, only rows that include the
+        point record fields are reused.
+
         :param file_list: A list containing input files.
         :param outdir: Out directory for tabular dataset (default=".")
         :param las_to_json: When 'True', will write a json summary file for input LAS/LAZ files.
         :param verbose: When 'True', display information about progress to the user.
+        :param read_points: When 'True', include fields derived from the point records (classes, GPS times, flags, etc.).
+        :param workers: Number of processes used to summarize LAS/LAZ files (default=1).
+        :param las_to_store: When 'True', will append summaries of input LAS/LAZ files to a LaszyStore, and validate from it.
         """
 
         self._path = ""
@@ -846,6 +1123,11 @@ class LaszyReport:
         self._lidar_completed = []
         self.file_list = file_list
         self.las_to_json = las_to_json
+        self.read_points = read_points
+        self.workers = max(1, int(workers))
+        self.las_to_store = las_to_store
+        self.store = os.path.join(outdir, "laszy_store")
+        self.store_list = []
         self._DEFAULT_NAME = "laszy_report.csv"
         self._JSON_LOG_NAME = "json_completed.log"
         self._LIDAR_LOG_NAME = "lidar_completed.log"
@@ -867,6 +1149,15 @@ class LaszyReport:
             if lidar_json in laszy_json_bases:
                 self.lidar_list.remove(lidar_file)
 
+        if not (self.las_to_store and os.path.exists(self.store)):
+            return
+
+        store_paths = LaszyStore(self.store).paths(with_points=self.read_points)
+        for lidar_file in self.lidar_list.copy():
+            if os.path.abspath(lidar_file) in store_paths:
+                self.lidar_list.remove(lidar_file)
+                self.store_list.append(lidar_file)
+
     def write(self, name: str = "", validate=False, check_logs: bool = True):
 
         """
@@ -875,6 +1166,10 @@ class LaszyReport:
         Static method that accepts a list of LAS/LAZ files and writes
         their respective summaries to rows in a csv file.
 
+        Rows are written in input order. Each file is appended to the
+        completed log as soon as its row is written, so an interrupted
+        run resumes from the first unwritten file when check_logs=True.
+
         :param validate: When True, function will call validate_report() to output lidar error reports.
         :param check_logs: Check for existing completed logs to ignore previously processed files.
         :param name: Output filename (default='laszy_report.csv')
@@ -890,40 +1185,54 @@ class LaszyReport:
         self._path = os.path.join(self.outdir, name)
         if check_logs:
             existing_data = self.__check_logs(existing_data, self._path)
+        else:
+            self.__clear_logs()
 
         with open(self._path, "w") as csv:
             self.__write_report(csv, existing_data)
 
-        if validate:
-            self.validate_report()
+        if self.las_to_store:
+            LaszyStore(self.store).compact()
 
-        for is_lidar in [True, False]:
-            self.__log_completed(lidar=is_lidar)
+        if validate:
+            if self.las_to_store:
+                self.validate_report(self.store, name=name)
+            else:
+                self.validate_report()
 
         self.__write_err(self._path)
 
-    def validate_report(self, path: str = "", outdir=""):
+    def validate_report(self, path: str = "", outdir="", name: str = "", rules: list[ValidationRule] = None):
+
+        """
+        Check a LaszyReport csv, or a LaszyStore, for issues and write error reports.
+
+        All rules are evaluated as vectorized column checks over the whole report.
+        Writes '<name>_errors.csv' with the offending values of every failing rule, and
+        '<name>_errors_summary.json' with the count and severity of each failing rule.
+
+        :param path: LaszyReport csv or LaszyStore directory (default=the csv written by write())
+        :param outdir: Out directory for error reports (default=directory of 'path')
+        :param name: Base name for error reports (default=basename of 'path')
+        :param rules: Additional ValidationRule to check after the default rules.
+        """
 
         if not bool(path):
             path = self._path
 
         if os.path.exists(path):
             issues = {}
-            df = pd.read_csv(path)
+            df = LaszyStore(path).read() if os.path.isdir(path) else pd.read_csv(path)
 
             df = df.drop(LASZY_REPORT_DROP_COLUMNS, axis=1)
+            if df["classes"].isna().all():  # header-only report
+                df = df.drop(self.__point_record_check_columns(df), axis=1)
 
-            df = self.__public_header_check(df, issues)
-            df = self.__xyx_scale_check(df, issues)
-            df = self.__xyz_offset_check(df, issues)
-            df = self.__global_encoding_check(df, issues)
-            df = self.__crs_check(df, issues)
-            df = self.__point_records_check(df, issues)
+            df = self.__apply_rules(df, [*self.__validation_rules(), *(rules or [])], issues)
 
             if bool(issues):
-                issues = {key: int(issues[key]) for key, value in issues.items()}
                 _outdir = os.path.dirname(path) if not bool(outdir) else outdir
-                name = os.path.basename(path)
+                name = os.path.basename(path) if not bool(name) else name
                 name_no_ext = name.split(".")[0]
 
                 # write the json summary
@@ -950,6 +1259,7 @@ class LaszyReport:
             csv.write(existing_data)
         else:
             csv.write(",".join(_LaszyReportColumns.COLUMNS) + "\n")
+        self.__from_store(csv)
         self.__from_lidar_list(csv)
         self.__from_json_list(csv)
 
@@ -969,21 +1279,32 @@ class LaszyReport:
                 existing_data = f.read()
         return existing_data
 
-    def __log_completed(self, lidar: bool = False):
+    def __clear_logs(self):
+
+        """
+        Remove completed logs from previous reports, since their rows will not be inherited.
+        """
+
+        for log_name in [self._LIDAR_LOG_NAME, self._JSON_LOG_NAME]:
+            log = os.path.join(self.outdir, log_name)
+            if os.path.exists(log):
+                os.remove(log)
+
+    def __log_completed(self, file: str, lidar: bool = False):
 
         """
-        Write a list of processed files to a log file.
+        Append a processed file to a log file.
 
+        :param file: Processed file.
         :param lidar: When True, will write LiDAR log, otherwise, will write JSON log.
         """
 
         completed = self._lidar_completed if lidar else self._json_completed
         out_name = self._LIDAR_LOG_NAME if lidar else self._JSON_LOG_NAME
 
-        if bool(completed):
-            with open(os.path.join(self.outdir, out_name), "w") as f:
-                for file in completed:
-                    f.write(file + "\n")
+        completed.append(file)
+        with open(os.path.join(self.outdir, out_name), "a") as f:
+            f.write(file + "\n")
 
     def __write_err(self, out):
 
@@ -1005,25 +1326,89 @@ class LaszyReport:
         """
         Write rows ro open CSV file from list of lidar files (LAS/LAZ).
 
+        Files are summarized in a process pool when self.workers > 1.
+
         :param csv: Open file pointer to CSV file object.
         """
 
         if bool(self.lidar_list):
             json_outdir = os.path.join(self.outdir, "laszy_json") if self.las_to_json else ""
-            files = tqdm.tqdm(self.lidar_list, desc="Processing LAS/LAZ files...") if self.verbose else self.lidar_list
-            for file in files:
-                las = Laszy(file)
-                try:
-                    s = las.summarize(outdir=json_outdir)
-                    row = self.__get_row(s)
-                    csv.write(",".join(row) + "\n")
-                    self._lidar_completed.append(file)
+            summarize = partial(
+                LaszyReport._summary_row, outdir=json_outdir, header_only=(not self.read_points),
+                store=(self.store if self.las_to_store else "")
+            )
 
-                except Exception as e:
-                    is_possibly_corrupt = (not bool(las.public_header_block))
-                    self._errors.append(
-                        (file, (CORRUPT_FILE_MSG if is_possibly_corrupt else e) + "\n")
-                    )
+            if self.workers > 1:
+                with concurrent.futures.ProcessPoolExecutor(self.workers) as executor:
+                    self.__write_rows(csv, executor.map(summarize, self.lidar_list))
+            else:
+                self.__write_rows(csv, map(summarize, self.lidar_list))
+
+    def __write_rows(self, csv, results):
+
+        """
+        Write summary rows to CSV file in input order, logging each completed file.
+
+        :param csv: Open file pointer to CSV file object.
+        :param results: Iterable of (file, row, error) tuples (see _summary_row()).
+        """
+
+        if self.verbose:
+            results = tqdm.tqdm(results, total=len(self.lidar_list), desc="Processing LAS/LAZ files...")
+
+        for file, row, err in results:
+            if err is not None:
+                self._errors.append((file, err))
+                continue
+
+            csv.write(",".join(row) + "\n")
+            csv.flush()
+            self.__log_completed(file, lidar=True)
+
+    @staticmethod
+    def _summary_row(file: str, outdir: str = "", header_only: bool = True, store: str = "") -> tuple:
+
+        """
+        Summarize a single LAS/LAZ file into a CSV row.
+
+        Runs in worker processes, so exceptions are returned as strings
+        rather than raised.
+
+        :param file: LAS/LAZ file.
+        :param outdir: Out directory for the json summary ("" to skip writing).
+        :param header_only: Passed to Laszy.summarize().
+        :param store: LaszyStore directory ("" to skip appending).
+        :return: tuple -> (file, row, error) where exactly one of row or error is None.
+        """
+
+        las = None
+        try:
+            # point records are streamed by summarize() when requested, never read in full
+            las = Laszy(file, read_points=False)
+            s = las.summarize(header_only=header_only, outdir=outdir, store=store)
+            return file, LaszyReport.__get_row(s), None
+
+        except Exception as e:
+            is_possibly_corrupt = (las is not None) and (not bool(las.public_header_block))
+            return file, None, (CORRUPT_FILE_MSG if is_possibly_corrupt else str(e)) + "\n"
+
+    def __from_store(self, csv):
+
+        """
+        Write rows to CSV file for LAS/LAZ files already summarized in the LaszyStore.
+
+        :param csv: Open file pointer to CSV file object.
+        """
+
+        if bool(self.store_list):
+            df = LaszyStore.latest(pd.read_parquet(self.store))
+            records = df.set_index(LaszyStore.PATH)
+            for file in self.store_list:
+                record = records.loc[os.path.abspath(file)]
+                row = [("N/A" if pd.isna(record[key]) else str(record[key])) for key in _LaszyReportColumns.COLUMNS]
+                csv.write(",".join(self.__quote_row(row)) + "\n")
+                csv.flush()
+                self.__log_completed(file, lidar=True)
 
     def __from_json_list(self, csv):
 
@@ -1041,7 +1426,8 @@ class LaszyReport:
                         summary = json.load(f)
                         row = self.__get_row(summary)
                         csv.write(",".join(row) + "\n")
-                    self._json_completed.append(file)
+                        csv.flush()
+                    self.__log_completed(file, lidar=False)
 
                 except Exception as e:
                     self._errors.append((file, e))
@@ -1073,12 +1459,13 @@ class LaszyReport:
                 contents = f.read()
                 ignore_list = contents.split("\n")
 
+            # preserve input order so rows are written in the same order on resume
             set_ignore = set(ignore_list)
-            set_file_list = set(file_list)
-            file_list_ = list(set_file_list.difference(set_ignore))
+            file_list_ = [f for f in file_list if f not in set_ignore]
 
             if lidar:
                 self.lidar_list = file_list_
+                self.store_list = [f for f in self.store_list if f not in set_ignore]
             else:
                 self.json_list = file_list_
 
@@ -1102,11 +1489,15 @@ class LaszyReport:
         ge_vals = [str(phb["global_encoding"][key]) for key in _LaszyReportColumns.GLOBAL_ENCODING]
         crs_vals = [str(summary["crs"][key]) for key in _LaszyReportColumns.CRS]
         vlr_vals = [str(summary["vlrs"][key]) for key in _LaszyReportColumns.VLR_HDR]
-        point_vals = [str(pr[key]) for key in _LaszyReportColumns.POINT_RECORDS]
         evlr_vals = [str(summary["evlrs"][key]) for key in _LaszyReportColumns.EVLR_HDR]
 
+        # point record fields are absent from header-only summaries
+        point_vals = [
+            (str(pr[key]) if bool(pr) else "N/A")
+            for key in _LaszyReportColumns.POINT_RECORDS
+        ]
         flag_vals = [
-            (str(pr["class_flags"][key]) if bool(pr["class_flags"]) else "N/A")
+            (str(pr["class_flags"][key]) if (bool(pr) and bool(pr["class_flags"])) else "N/A")
             for key in _LaszyReportColumns.CLASS_FLAGS
         ]
 
@@ -1115,457 +1506,211 @@ class LaszyReport:
             *vlr_vals, *point_vals, *flag_vals, *evlr_vals, str(summary["rgb_encoding"]), summary["wkt_bbox"]
         ]
 
-        # make sure to wrap each row item in quotes
-        # if the item contains a csv seperator in it
-        for i in range(len(row)):
-            if row[i].find(",") >= 0:
-                row[i] = f"\"{row[i]}\""
-
-        return row
-
-    @staticmethod
-    def __global_encoding_check(df, issues):
-
-        """Check global encoding value for issues"""
-
-        df['global_encoding'] = df['global_encoding'].apply(LaszyReport.__is_globalencoding_invalid)
-        col = df["global_encoding"] != ""
-        if col.sum() > 0:
-            issues.update({"global_encoding_value": col.sum()})
-        else:
-            df = df.drop("global_encoding", axis=1)
-
-        df['wkt_crs'] = df['wkt_crs'].apply(LaszyReport.__is_wktflag_invalid)
-        col = df["wkt_crs"] != ""
-        if col.sum() > 0:
-            issues.update({"wkt_crs_flag": col.sum()})
-        else:
-            df = df.drop("wkt_crs", axis=1)
-
-        df['gps_standard_time'] = df['gps_standard_time'].apply(LaszyReport.__is_gpstimeflag_invalid)
-        col = df["gps_standard_time"] != ""
-        if col.sum() > 0:
-            issues.update({"gps_time_flag": col.sum()})
-        else:
-            df = df.drop("gps_standard_time", axis=1)
-        # guid contract number check
-        df['synthetic_returns'] = df['synthetic_returns'].apply(LaszyReport.__is_syntheticflag_invalid)
-        col = df["synthetic_returns"] != ""
-        if col.sum() > 0:
-            issues.update({"synthetic_returns_flag": col.sum()})
-        else:
-            df = df.drop("synthetic_returns", axis=1)
-
-        return df
+        return LaszyReport.__quote_row(row)
 
     @staticmethod
-    def __xyz_offset_check(df, issues):
+    def __quote_row(row: list[str]) -> list[str]:
 
-        """Check XYZ offset for issues."""
-
-        df['x_offset'] = df['x_offset'].apply(LaszyReport.__is_xoffset_invalid)
-        col = df["x_offset"] != ""
-        if col.sum() > 0:
-            issues.update({"x_offset": col.sum()})
-        else:
-            df = df.drop("x_offset", axis=1)
+        """
+        Wrap each row item in quotes if the item contains a csv seperator in it.
 
-        df['y_offset'] = df['y_offset'].apply(LaszyReport.__is_yoffset_invalid)
-        col = df["y_offset"] != ""
-        if col.sum() > 0:
-            issues.update({"y_offset": col.sum()})
-        else:
-            df = df.drop("y_offset", axis=1)
+        :param row: List of strings for a single csv row.
+        :return: List of strings safe to join with a csv seperator.
+        """
 
-        df['z_offset'] = df['z_offset'].apply(LaszyReport.__is_zoffset_invalid)
-        col = df["z_offset"] != ""
-        if col.sum() > 0:
-            issues.update({"z_offset": col.sum()})
-        else:
-            df = df.drop("z_offset", axis=1)
+        for i in range(len(row)):
+            if row[i].find(",") >= 0:
+                row[i] = f"\"{row[i]}\""
 
-        return df
+        return row
 
     @staticmethod
-    def __xyx_scale_check(df, issues):
+    def __point_record_check_columns(df) -> list[str]:
 
-        """Check XYZ scaling for issues."""
-
-        # guid contract number check
-        df['x_scale'] = df['x_scale'].apply(LaszyReport.__is_xscale_invalid)
-        col = df["x_scale"] != ""
-        if col.sum() > 0:
-            issues.update({"x_scale": col.sum()})
-        else:
-            df = df.drop("x_scale", axis=1)
-
-        # guid contract number check
-        df['y_scale'] = df['y_scale'].apply(LaszyReport.__is_yscale_invalid)
-        col = df["y_scale"] != ""
-        if col.sum() > 0:
-            issues.update({"y_scale": col.sum()})
-        else:
-            df = df.drop("y_scale", axis=1)
+        """Get the point record columns remaining in the frame to be checked."""
 
-        # guid contract number check
-        df['z_scale'] = df['z_scale'].apply(LaszyReport.__is_zscale_invalid)
-        col = df["z_scale"] != ""
-        if col.sum() > 0:
-            issues.update({"z_scale": col.sum()})
-        else:
-            df = df.drop("z_scale", axis=1)
+        columns = [*_LaszyReportColumns.POINT_RECORDS, *_LaszyReportColumns.CLASS_FLAGS]
 
-        return df
+        return [col for col in columns if col in df.columns]
 
     @staticmethod
-    def __point_records_check(df, issues):
-
-        """Check point record fields for any issues with data."""
-
-        # check for class code 0
-        df['classes'] = df['classes'].apply(LaszyReport.__is_neverclassified_points)
-        col = df["classes"] != ""
-        if col.sum() > 0:
-            issues.update({"points_in_never_classified": col.sum()})
-        else:
-            df = df.drop("classes", axis=1)
-
-        # check for invalid flightline numbers
-        df['flightline_start'] = df['flightline_start'].apply(LaszyReport.__is_flightlines_invalid)
-        col = df["flightline_start"] != ""
-        if col.sum() > 0:
-            issues.update({"invalid_flightline_numbers": col.sum()})
-        else:
-            df = df.drop(["flightline_start", "flightline_end"], axis=1)
-
-        # check for invalid gps times
-        df['gps_time_min'] = df['gps_time_min'].apply(LaszyReport.__is_gpsweektime_present)
-        col = df["gps_time_min"] != ""
-        if col.sum() > 0:
-            df = df.drop("gps_time_max", axis=1)
-            issues.update({"gps_week_time_found": col.sum()})
-        else:
-            df = df.drop(["gps_time_min", "gps_time_max"], axis=1)
-
-        # check for synthetic flags
-        df['has_synthetic'] = df['has_synthetic'].apply(LaszyReport.__is_syntheticclassflag_invalid)
-        col = df["has_synthetic"] != ""
-        if col.sum() > 0:
-            issues.update({"synthetic_class_flags": col.sum()})
-        else:
-            df = df.drop("has_synthetic", axis=1)
+    def __validation_rules() -> list[ValidationRule]:
+
+        """
+        Get the rule table used to validate a LaszyReport.
+
+        Each rule is a vectorized check over the whole report frame. Rules
+        are evaluated in this order, which is also the order of the issues
+        written to the errors summary json.
+
+        :return: List of ValidationRule.
+        """
+
+        ne = LaszyReport.__not_equal
+        no_match = LaszyReport.__not_matching
+        fractional = LaszyReport.__is_fractional
+        missing_as = LaszyReport.__missing_as
+
+        rules = [
+            # public header block
+            ValidationRule(
+                "guid_contract_number", ("guid_asc",), RULE_SEVERITY.ERROR,
+                lambda df: no_match(df["guid_asc"], RegexLidar.CONTRACT_NUMBER),
+                lambda df: missing_as(df["guid_asc"], "No GUID found")
+            ),
+            ValidationRule(
+                "system_id_format", ("system_id",), RULE_SEVERITY.WARNING,
+                lambda df: no_match(df["system_id"], RegexLidar.SYSTEM_ID_PRODUCTION),
+                lambda df: missing_as(df["system_id"], "No System ID found")
+            ),
+            ValidationRule("version", ("version",), RULE_SEVERITY.ERROR, lambda df: ne(df["version"], 1.4)),
+            ValidationRule("point_data_format", ("point_data_format",), RULE_SEVERITY.ERROR, lambda df: ne(df["point_data_format"], 6)),
+            ValidationRule("x_scale", ("x_scale",), RULE_SEVERITY.ERROR, lambda df: ne(df["x_scale"], 0.01)),
+            ValidationRule("y_scale", ("y_scale",), RULE_SEVERITY.ERROR, lambda df: ne(df["y_scale"], 0.01)),
+            ValidationRule("z_scale", ("z_scale",), RULE_SEVERITY.ERROR, lambda df: ne(df["z_scale"], 0.01)),
+            ValidationRule("x_offset", ("x_offset",), RULE_SEVERITY.ERROR, lambda df: fractional(df["x_offset"])),
+            ValidationRule("y_offset", ("y_offset",), RULE_SEVERITY.ERROR, lambda df: fractional(df["y_offset"])),
+            ValidationRule("z_offset", ("z_offset",), RULE_SEVERITY.ERROR, lambda df: fractional(df["z_offset"])),
+
+            # global encoding
+            ValidationRule("global_encoding_value", ("global_encoding",), RULE_SEVERITY.ERROR, lambda df: ne(df["global_encoding"], 17)),
+            ValidationRule("wkt_crs_flag", ("wkt_crs",), RULE_SEVERITY.ERROR, lambda df: ne(df["wkt_crs"], True)),
+            ValidationRule("gps_time_flag", ("gps_standard_time",), RULE_SEVERITY.ERROR, lambda df: ne(df["gps_standard_time"], True)),
+            ValidationRule("synthetic_returns_flag", ("synthetic_returns",), RULE_SEVERITY.WARNING, lambda df: ne(df["synthetic_returns"], False)),
+
+            # crs
+            ValidationRule(
+                "compd_cs", ("compd_cs",), RULE_SEVERITY.ERROR,
+                lambda df: LaszyReport.__is_missing(df["compd_cs"]),
+                lambda df: pd.Series("No compound projection", index=df.index)
+            ),
+            ValidationRule("vert_datum", ("vert_datum",), RULE_SEVERITY.ERROR, lambda df: ne(df["vert_datum"], "Canadian Geodetic Vertical Datum of 2013")),
+            ValidationRule("hz_datum", ("hz_datum",), RULE_SEVERITY.ERROR, lambda df: ne(df["hz_datum"], "NAD83_Canadian_Spatial_Reference_System")),
+            ValidationRule(
+                "vlr_has_wkt_crs", ("vlr_has_wkt_crs", "evlr_has_wkt_crs"), RULE_SEVERITY.ERROR,
+                lambda df: ne(df["vlr_has_wkt_crs"], True) & ne(df["evlr_has_wkt_crs"], True),
+                flag="no_wkt_found"
+            ),
+
+            # point records (absent from header-only reports)
+            ValidationRule(
+                "points_in_never_classified", ("classes",), RULE_SEVERITY.ERROR,
+                lambda df: df["classes"].astype("string").str.contains(r"[\[,]\s*0\s*[,\]]").fillna(False).astype(bool)
+            ),
+            ValidationRule(
+                "invalid_flightline_numbers", ("flightline_start", "flightline_end"), RULE_SEVERITY.WARNING,
+                lambda df: pd.to_numeric(df["flightline_start"], errors="coerce") < 1
+            ),
+            ValidationRule(
+                "gps_week_time_found", ("gps_time_min",), RULE_SEVERITY.ERROR,
+                lambda df: pd.to_numeric(df["gps_time_min"], errors="coerce") <= GPS_WEEK_SECONDS
+            ),
+            ValidationRule(
+                "synthetic_class_flags", ("has_synthetic",), RULE_SEVERITY.WARNING,
+                lambda df: df["has_synthetic"].notna() & ne(df["has_synthetic"], False)
+            ),
+            ValidationRule(
+                "invalid_dates_found", ("date_end",), RULE_SEVERITY.ERROR,
+                lambda df: LaszyReport.__is_date_from_future(df["date_end"]),
+                flag="invalid_dates"
+            ),
+        ]
 
-        # check if no wkt crs is present at all
-        df['date_end'] = df['date_end'].apply(LaszyReport.__is_date_from_future)
-        col = df["date_end"] != ""
-        if col.sum() > 0:
-            df["invalid_dates"] = col
-            issues.update({"invalid_dates_found": col.sum()})
-        df = df.drop('date_end', axis=1)
+        if ACQUISITON:
+            rules.append(ValidationRule(
+                "filename_has_correct_source_id", (), RULE_SEVERITY.ERROR,
+                lambda df: df["filename"].astype(str).str.split("_").str[0] != df["file_source_id"].astype(str),
+                flag="filename_has_correct_source_id"
+            ))
 
-        return df
+        return rules
 
     @staticmethod
-    def __crs_check(df, issues):
+    def __apply_rules(df: pd.DataFrame, rules: list, issues: dict) -> pd.DataFrame:
 
-        """Check CRS for any issues."""
-
-        # check for existence of compound crs
-        df['compd_cs'] = df['compd_cs'].apply(LaszyReport.__is_compdcs_invalid)
-        col = df["compd_cs"] != ""
-        if col.sum() > 0:
-            issues.update({"compd_cs": col.sum()})
-        else:
-            df = df.drop('compd_cs', axis=1)
-
-        # check the vertical datum
-        df['vert_datum'] = df['vert_datum'].apply(LaszyReport.__is_vertdatum_invalid)
-        col = df["vert_datum"] != ""
-        if col.sum() > 0:
-            issues.update({"vert_datum": col.sum()})
-        else:
-            df = df.drop('vert_datum', axis=1)
-
-        # check the horizontal datum
-        df['hz_datum'] = df['hz_datum'].apply(LaszyReport.__is_hzdatum_invalid)
-        col = df["hz_datum"] != ""
-        if col.sum() > 0:
-            issues.update({"hz_datum": col.sum()})
-        else:
-            df = df.drop('hz_datum', axis=1)
-
-        # check if no wkt crs is present at all
-        df['vlr_has_wkt_crs'] = df['vlr_has_wkt_crs'].apply(LaszyReport.__is_vlrwkt_empty)
-        df['evlr_has_wkt_crs'] = df['evlr_has_wkt_crs'].apply(LaszyReport.__is_vlrwkt_empty)
-        col_vlr = df["vlr_has_wkt_crs"] != ""
-        col_evlr = df["evlr_has_wkt_crs"] != ""
-        col = col_vlr & col_evlr
-        if ~col.sum() > 0:
-            df["no_wkt_found"] = col
-            issues.update({"vlr_has_wkt_crs": col.sum()})
-        df = df.drop(['vlr_has_wkt_crs', 'evlr_has_wkt_crs'], axis=1)
-
-        return df
+        """
+        Evaluate validation rules against a report frame.
 
-    @staticmethod
-    def __public_header_check(df, issues):
+        A failing rule keeps its columns, showing the offending value for
+        each failing file and an empty string for the others (flag rules
+        instead add a single boolean column). Columns of passing rules are
+        dropped, so the errors csv only contains columns with issues.
 
-        # guid contract number check
-        df['guid_asc'] = df['guid_asc'].apply(LaszyReport.__is_contract_invalid)
-        col = df["guid_asc"] != ""
-        if col.sum() > 0:
-            issues.update({"guid_contract_number": col.sum()})
-        else:
-            df = df.drop("guid_asc", axis=1)
+        :param df: LaszyReport DataFrame.
+        :param rules: List of ValidationRule.
+        :param issues: Dictionary updated with the count and severity of each failing rule.
+        :return: DataFrame of issues found.
+        """
 
-        # System ID format check
-        df['system_id'] = df['system_id'].apply(LaszyReport.__is_systemid_invalid)
-        col = df["system_id"] != ""
-        if col.sum() > 0:
-            issues.update({"system_id_format": col.sum()})
-        else:
-            df = df.drop("system_id", axis=1)
+        out = df.copy()
+        drop, flags = [], {}
+        for rule in rules:
+            if not set(rule.columns).issubset(df.columns):
+                continue
 
-        # version check
-        df['version'] = df['version'].apply(LaszyReport.__is_lasversion_invalid)
-        col = df["version"] != ""
-        if col.sum() > 0:
-            issues.update({"version": col.sum()})
-        else:
-            df = df.drop("version", axis=1)
+            mask = rule.check(df).astype(bool)
+            count = int(mask.sum())
+            if count > 0:
+                issues[rule.name] = {"count": count, "severity": rule.severity}
 
-        # Point data record format check
-        df['point_data_format'] = df['point_data_format'].apply(LaszyReport.__is_pointformat_invalid)
-        col = df["point_data_format"] != ""
-        if col.sum() > 0:
-            issues.update({"point_data_format": col.sum()})
-        else:
-            df = df.drop("point_data_format", axis=1)
-
-        if ACQUISITON:
-            # File source id vs filename number check
-            df['filename_has_correct_source_id'] = df.apply(LaszyReport.__is_sourceid_valid, axis=1)
-            col = df['filename_has_correct_source_id'] != ""
-            if col.sum() > 0:
-                issues.update({"filename_has_correct_source_id": col.sum()})
+            if bool(rule.flag):
+                drop.extend(rule.columns)
+                if count > 0:
+                    flags[rule.flag] = mask
+            elif count > 0:
+                column = rule.columns[0]
+                values = rule.display(df) if rule.display is not None else df[column]
+                out[column] = values.astype(object).where(mask, "")
             else:
-                df = df.drop("filename_has_correct_source_id", axis=1)
-
-        return df
-
-    @staticmethod
-    def __is_sourceid_valid(row):
-        numb5 = str(row["filename"]).split("_")[0]
-        fsid = str(row["file_source_id"])
-        return "Correct" if fsid == numb5 else "Filename does not contain File Source ID"
-
-    @staticmethod
-    def __is_syntheticclassflag_invalid(synthetic_class_flag: bool):
-        expected = False
-        if not math.isnan(synthetic_class_flag) and synthetic_class_flag != expected:
-            return synthetic_class_flag
-        else:
-            return ""
-
-    @staticmethod
-    def __is_gpsweektime_present(gps_min_time: int):
-        max_gps_week_time = 604800
-        if max_gps_week_time >= gps_min_time:
-            return str(gps_min_time)
-        else:
-            return ""
+                drop.extend(rule.columns)
 
-    @staticmethod
-    def __is_flightlines_invalid(point_source_id: int):
-        min_valid_fl = 1
-        if point_source_id < min_valid_fl:
-            return str(point_source_id)
-        else:
-            return ""
-
-    @staticmethod
-    def __is_neverclassified_points(classes: str):
-        expected = 0
-        classes = classes.replace("[", "").replace("]", "")
-        classes = [int(val) for val in classes.split(",")]
-        if expected in classes:
-            return str(classes)
-        else:
-            return ""
+        return out.drop(drop, axis=1).assign(**flags)
 
     @staticmethod
-    def __is_vlrwkt_empty(vlr_has_wkt: bool):
-        expected = True
-        if vlr_has_wkt != expected:
-            return vlr_has_wkt
-        else:
-            return ""
+    def __not_equal(values: pd.Series, expected) -> pd.Series:
 
-    @staticmethod
-    def __is_hzdatum_invalid(hz_datum: str):
-        expected = "NAD83_Canadian_Spatial_Reference_System"
-        if hz_datum != expected:
-            return hz_datum
-        else:
-            return ""
+        """Get mask of values not equal to expected (missing values are not equal)."""
 
-    @staticmethod
-    def __is_vertdatum_invalid(vert_datum: str):
-        expected = "Canadian Geodetic Vertical Datum of 2013"
-        if vert_datum != expected:
-            return vert_datum
-        else:
-            return ""
+        return values.ne(expected).fillna(True).astype(bool)
 
     @staticmethod
-    def __is_compdcs_invalid(compdcs: str):
-        expected = bool(compdcs)
-        if not expected:
-            return "No compound projection"
-        else:
-            return ""
+    def __not_matching(values: pd.Series, pattern: str) -> pd.Series:
 
-    @staticmethod
-    def __is_contract_invalid(guid: str):
-        expected = re.compile(RegexLidar.CONTRACT_NUMBER)
-        if bool(guid):
-            if (not isinstance(guid, str)) and (not isinstance(guid, bytes)):
-                return "unknown format"
-            elif not bool(expected.search(guid)):
-                return guid
-            else:
-                return ""
-        return "No GUID found"
+        """Get mask of values not matching a regex pattern (missing values do not match)."""
 
-    @staticmethod
-    def __is_systemid_invalid(system_id: str):
-        expected = re.compile(RegexLidar.SYSTEM_ID_PRODUCTION)
-        if bool(system_id):
-            if (not isinstance(system_id, str)) and (not isinstance(system_id, bytes)):
-                return "unknown format"
-            elif not bool(expected.search(system_id)):
-                return system_id
-            else:
-                return ""
-        return "No System ID found"
+        return values.astype("string").str.count(pattern).eq(0).fillna(True).astype(bool)
 
     @staticmethod
-    def __is_lasversion_invalid(lasversion: float):
-        expected = 1.4
-        if lasversion != expected:
-            return str(lasversion)
-        else:
-            return ""
+    def __is_missing(values: pd.Series) -> pd.Series:
 
-    @staticmethod
-    def __is_pointformat_invalid(pointformat: int):
-        expected = 6
-        if pointformat != expected:
-            return str(pointformat)
-        else:
-            return ""
+        """Get mask of missing or empty values."""
 
-    @staticmethod
-    def __is_xscale_invalid(xscale: float):
-        expected = 0.01
-        if xscale != expected:
-            return str(xscale)
-        else:
-            return ""
+        return (values.isna() | values.astype("string").eq("")).fillna(True).astype(bool)
 
     @staticmethod
-    def __is_yscale_invalid(yscale: float):
-        expected = 0.01
-        if yscale != expected:
-            return str(yscale)
-        else:
-            return ""
+    def __missing_as(values: pd.Series, text: str) -> pd.Series:
 
-    @staticmethod
-    def __is_zscale_invalid(zscale: float):
-        expected = 0.01
-        if zscale != expected:
-            return str(zscale)
-        else:
-            return ""
+        """Replace missing or empty values with text."""
 
-    @staticmethod
-    def __is_xoffset_invalid(xoffset: float):
-        expected = 0
-        modulo = float(xoffset) % 1
-        if modulo != expected:
-            return str(xoffset)
-        else:
-            return ""
+        return values.astype(object).mask(LaszyReport.__is_missing(values), text)
 
     @staticmethod
-    def __is_yoffset_invalid(yoffset: float):
-        expected = 0
-        modulo = float(yoffset) % 1
-        if modulo != expected:
-            return str(yoffset)
-        else:
-            return ""
+    def __is_fractional(values: pd.Series) -> pd.Series:
 
-    @staticmethod
-    def __is_zoffset_invalid(zoffset: float):
-        expected = 0
-        modulo = float(zoffset) % 1
-        if modulo != expected:
-            return str(zoffset)
-        else:
-            return ""
+        """Get mask of values that are not whole numbers (missing values are not whole)."""
 
-    @staticmethod
-    def __is_globalencoding_invalid(value: int):
-        expected = 17
-        if value != expected:
-            return str(value)
-        else:
-            return ""
+        return (pd.to_numeric(values, errors="coerce") % 1).ne(0)
 
     @staticmethod
-    def __is_wktflag_invalid(flag: bool):
-        expected = True
-        if flag != expected:
-            return flag
-        else:
-            return ""
+    def __is_date_from_future(dates: pd.Series) -> pd.Series:
 
-    @staticmethod
-    def __is_gpstimeflag_invalid(flag: bool):
-        expected = True
-        if flag != expected:
-            return flag
-        else:
-            return ""
+        """Get mask of dates after today, or that failed GPS time conversion."""
 
-    @staticmethod
-    def __is_syntheticflag_invalid(flag: bool):
-        expected = False
-        if flag != expected:
-            return flag
-        else:
-            return ""
+        dates = dates.astype("string")
+        days = pd.to_datetime(dates.str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+        is_future = days > pd.Timestamp(datetime.date.today())
 
-    @staticmethod
-    def __is_date_from_future(date: str):
-        today = datetime.datetime.today()
-        in_date = date.split(" ")[0]
-        ymd = in_date.split("-")
-
-        # first check if GpsWeekTimeError string is present
-        is_invalid_date = date == GPS_WEEK_TIME_ERR_STR
-        if not is_invalid_date:  # now check the actual date
-            year, month, day = int(ymd[0]), int(ymd[1]), int(ymd[2])
-            invalid_year = today.year < year
-            invalid_month = (today.year == year) and (today.month < month)
-            invalid_day = (today.year == year) and (today.month == month) and (today.day < day)
-            is_invalid_date = invalid_day or invalid_month or invalid_year
-        if is_invalid_date:
-            return date
-        else:
-            return ""
+        return (dates.eq(GPS_WEEK_TIME_ERR_STR).fillna(False) | is_future).astype(bool)
 
 
 class NotLidarFileError(Exception):
@@ -0,0 +1,36 @@
+from collections import deque
+from typing import Callable, Iterable, Iterator
+import concurrent.futures
+
+
+def bounded_submit(submit: Callable[..., concurrent.futures.Future], items: Iterable, max_in_flight: int) -> Iterator[concurrent.futures.Future]:
+
+    """
+    Submit items to an executor, keeping at most 'max_in_flight' submitted but not yet yielded.
+
+    Submitting every item up front queues all of their arguments (and, as they finish, all of
+    their results) at once. Here the next item is only submitted once the oldest one is done,
+    so memory is bounded by 'max_in_flight' while the pool stays busy.
+
+    :param submit: Function submitting an item to the executor, returning its future
+        (e.g. lambda item: executor.submit(func, item)).
+    :param items: Items to submit, in order.
+    :param max_in_flight: Maximum number of items submitted at once.
+    :return: Generator of the futures (done), in the order of 'items'.
+    """
+
+    pending = deque()
+    items = iter(items)
+    for item in items:
+        pending.append(submit(item))
+        if len(pending) >= max_in_flight:
+            break
+
+    while pending:
+        future = pending.popleft()
+        # Wait for the oldest item before submitting the next one
+        concurrent.futures.wait([future])
+        for item in items:
+            pending.append(submit(item))
+            break
+        yield future